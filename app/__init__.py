@@ -1,6 +1,17 @@
 from flask import Flask, jsonify
+from app.commands import init_commands
 from app.config.env import init_env
 from app.extensions import db, jwt, s3
+from app.utils.admission import init_admission
+from app.utils.compression import init_compression
+from app.utils.json_provider import init_json
+from app.utils.metrics import init_metrics
+from app.utils.pool_monitor import init_pool_monitor
+from app.utils.query_limits import init_query_limits
+from app.utils.response_cache import init_response_cache
+from app.utils.slow_queries import init_slow_query_log
+from app.utils.sql_stats import init_sql_stats
+from app.utils.workloads import init_workloads
 from app.controllers.auth_controller import auth_bp
 from app.controllers.admin_tools_controller import admin_tools_bp
 from app.controllers.protected_controller import protected_bp
@@ -28,11 +39,22 @@ def create_app():
     from app.config.config import Config
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_json(app)
 
     # Initialize extensions AFTER app creation
     db.init_app(app)
     jwt.init_app(app)
     s3.init_app(app)
+    init_compression(app)
+    init_workloads(app)
+    init_sql_stats(app)
+    init_slow_query_log(app)
+    init_metrics(app)
+    init_admission(app)
+    init_pool_monitor(app)
+    init_query_limits(app)
+    init_response_cache(app)
+    init_commands(app)
 
     origins = [
         "https://crm-mp78-frontend.vercel.app",  # Your production Vercel URL
@@ -46,7 +68,7 @@ def create_app():
             "origins": "*",
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"],
-            "expose_headers": ["Content-Disposition", "Content-Type"],
+            "expose_headers": ["Content-Disposition", "Content-Type", "Server-Timing", "X-Cache", "X-DB-Queries"],
             "supports_credentials": True
         }
     })
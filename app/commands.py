@@ -0,0 +1,67 @@
+import os
+import re
+import subprocess
+import sys
+
+import click
+from flask import current_app
+
+# Only needed by upload, export and PDF routes; none of these should load at worker boot
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'fpdf', 'reportlab', 'boto3', 'botocore')
+BOOT_SNIPPET = 'from app import create_app; create_app()'
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def _measure_boot_imports():
+    """Boots the app in a fresh interpreter under ``-X importtime`` and parses its report."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SNIPPET],
+        cwd=os.path.dirname(current_app.root_path),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"App failed to start:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append({
+                'module': module,
+                'depth': (len(indent) - 1) // 2,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+            })
+    return imports
+
+
+def init_commands(app):
+    @app.cli.command('importtime')
+    @click.option('--top', default=15, show_default=True, help='Slowest imports to list.')
+    @click.option('--budget-ms', type=float, default=None, help='Fail when boot imports take longer than this.')
+    def importtime_command(top, budget_ms):
+        """
+        Reports what a worker imports before serving its first request and
+        fails when a heavy module is loaded at boot or the budget is exceeded.
+        """
+        imports = _measure_boot_imports()
+        total_ms = sum(entry['cumulative_ms'] for entry in imports if entry['depth'] == 0)
+        heavy = sorted({entry['module'] for entry in imports if entry['module'] in HEAVY_MODULES})
+
+        click.echo(f"Boot imports: {total_ms:.0f} ms across {len(imports)} modules")
+        click.echo(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for entry in sorted(imports, key=lambda item: item['cumulative_ms'], reverse=True)[:top]:
+            click.echo(
+                f"{entry['cumulative_ms']:>14.1f} {entry['self_ms']:>9.1f}  "
+                f"{'  ' * entry['depth']}{entry['module']}"
+            )
+
+        failures = []
+        if heavy:
+            failures.append(f"heavy modules imported at boot: {', '.join(heavy)}")
+        if budget_ms is not None and total_ms > budget_ms:
+            failures.append(f"boot imports took {total_ms:.0f} ms, budget is {budget_ms:.0f} ms")
+        if failures:
+            raise click.ClickException('; '.join(failures))
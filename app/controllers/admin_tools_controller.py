@@ -1,12 +1,19 @@
+import os
 from collections import defaultdict
 from pathlib import Path
 
-import pandas as pd
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.extensions import db
-from app.models.outlet import Outlet
+from app.models.outlet import Outlet, shopee_store_id_suffixes
+from app.utils.lazy_import import lazy_import
+from app.utils.metrics import worker_pool_gauges
+from app.utils.pool_monitor import pool_usage, postgres_max_connections
+from app.utils.response_cache import invalidate_tags
+from app.utils.slow_queries import top_slow_queries
+
+pd = lazy_import('pandas')
 
 admin_tools_bp = Blueprint("admin_tools", __name__, url_prefix="/admin/tools")
 
@@ -90,3 +97,75 @@ def apply_outlet_codes_from_excel():
 
     stats["status"] = "ok"
     return jsonify(stats)
+
+
+@admin_tools_bp.route("/backfill_shopee_store_id_suffixes", methods=["POST"])
+def backfill_shopee_store_id_suffixes():
+    stats = {"total_outlets": 0, "updated_outlets": 0}
+
+    outlets = Outlet.query.filter(Outlet.store_id_shopee.isnot(None)).all()
+    for outlet in outlets:
+        stats["total_outlets"] += 1
+        suffixes = shopee_store_id_suffixes(outlet.store_id_shopee)
+        if (outlet.store_id_shopee_suffix4, outlet.store_id_shopee_suffix5) == suffixes:
+            continue
+        outlet.store_id_shopee_suffix4, outlet.store_id_shopee_suffix5 = suffixes
+        stats["updated_outlets"] += 1
+
+    try:
+        db.session.commit()
+    except SQLAlchemyError as exc:
+        db.session.rollback()
+        current_app.logger.exception("Failed to backfill Shopee store id suffixes.")
+        return jsonify({"status": "error", "message": str(exc)}), 500
+
+    stats["status"] = "ok"
+    return jsonify(stats)
+
+
+@admin_tools_bp.route("/pools", methods=["GET"])
+def get_pool_usage():
+    """
+    Connection pool usage of the worker serving this request, plus checked-out
+    counts for every live gunicorn worker when metrics run in multiprocess mode.
+    """
+    this_worker = pool_usage()
+    workers = worker_pool_gauges()
+    per_worker_max = sum(pool["max_connections"] for pool in this_worker)
+    live_workers = len(workers) if workers else 1
+
+    return jsonify({
+        "status": "ok",
+        "worker_pid": os.getpid(),
+        "this_worker": this_worker,
+        "workers": workers,
+        "connection_budget": {
+            "per_worker_max": per_worker_max,
+            "live_workers": live_workers,
+            "total_max": per_worker_max * live_workers,
+            "postgres_max_connections": postgres_max_connections(),
+        },
+    })
+
+
+@admin_tools_bp.route("/slow-queries", methods=["GET"])
+def get_slow_queries():
+    """Slow statement shapes recorded by all workers, by total time spent."""
+    limit = request.args.get("limit", default=20, type=int)
+    include_plans = request.args.get("include_plans", "").lower() in ("1", "true", "yes")
+    offenders = top_slow_queries(limit=max(limit, 1), include_plans=include_plans)
+    return jsonify({
+        "status": "ok",
+        "threshold_ms": current_app.config["SLOW_QUERY_THRESHOLD_MS"],
+        "offenders": offenders,
+    })
+
+
+@admin_tools_bp.route("/response-cache/invalidate", methods=["POST"])
+def invalidate_response_cache():
+    """Drops cached report responses after data changed outside the API, e.g. {"tags": ["month:2025-01"]}."""
+    tags = (request.get_json(silent=True) or {}).get("tags")
+    if not tags or not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return jsonify({"error": "tags must be a non-empty list of strings"}), 400
+    invalidate_tags(tags)
+    return jsonify({"status": "ok", "invalidated": sorted(tags)})
@@ -1,11 +1,15 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 from app.extensions import db
+from app.extensions.database import prefer_replica
+from app.utils.response_cache import REPORT_PLATFORMS, cached_response, month_tags, platform_tags, scoped_tag
 from app.models.daily_merchant_totals import DailyMerchantTotal
 from app.models.outlet import Outlet
 from collections import defaultdict
 
 bi_bp = Blueprint('bi', __name__, url_prefix='/bi')
+# Read-only analytics; served from the replica when one is configured
+bi_bp.before_request(prefer_replica)
 
 def _parse_opening_day(closing_date_str: str) -> int | None:
     """Parses an opening day from a string like '12-11'."""
@@ -17,7 +21,23 @@ def _parse_opening_day(closing_date_str: str) -> int | None:
     except (ValueError, TypeError, IndexError):
         return None
 
+def _brand_performance_tags():
+    payload = request.get_json(silent=True) or {}
+    year = payload.get('year', datetime.now().year)
+    if isinstance(year, int):
+        # Financial months reach into January of the following year
+        months = month_tags(f"{year}-01-01", f"{year + 1}-01-31")
+    else:
+        months = month_tags(None, None)
+    return [
+        *platform_tags(REPORT_PLATFORMS),
+        scoped_tag('outlet', None),
+        scoped_tag('brand', payload.get('brand_name')),
+        *months,
+    ]
+
 @bi_bp.route('/brand-performance', methods=['POST'])
+@cached_response(_brand_performance_tags)
 def get_brand_performance_by_partner():
     """
     Provides aggregated monthly net income for a brand, nested by partner and outlet.
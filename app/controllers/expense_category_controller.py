@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.expense_category import ExpenseCategory
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
 
 expense_category_bp = Blueprint("expense_category_bp", __name__, url_prefix="/expense_categories")
 
@@ -23,6 +24,7 @@ def create_expense_category():
 
 # Get all expense categories
 @expense_category_bp.route("", methods=["GET"])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_expense_categories():
     categories = ExpenseCategory.query.all()
     return jsonify([category.to_dict() for category in categories])
@@ -1,13 +1,24 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, current_app, request, jsonify, send_file, Response, stream_with_context, url_for
 from flask_cors import cross_origin
 from datetime import datetime
-from app.services.excel_export.generator import ExcelReportGenerator
+from itsdangerous import BadSignature, SignatureExpired
 from app.models.outlet import Outlet
+from app.extensions.database import prefer_replica
+from app.utils.admission import AdmissionRejected
+from app.utils.lazy_import import lazy_import
+
+# openpyxl and the sheet classes load on the first export, not at worker boot
+export_cache = lazy_import('app.services.excel_export.export_cache')
+bulk_export = lazy_import('app.services.excel_export.bulk_export')
+preview_cache = lazy_import('app.services.excel_export.preview_cache')
+export_jobs = lazy_import('app.services.excel_export.export_jobs')
 
 export_bp = Blueprint('export', __name__, url_prefix="/export")
+# Exports only read report data; served from the replica when one is configured
+export_bp.before_request(prefer_replica)
 
 @export_bp.route('', methods=['POST', 'OPTIONS'])
-@cross_origin(expose_headers=["Content-Disposition"])
+@cross_origin(expose_headers=["Content-Disposition", "X-Cache", "X-Generation-Time"])
 def export_reports():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'OK'}), 200
@@ -25,29 +36,27 @@ def export_reports():
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
 
-        # Instantiate the report generator
-        generator = ExcelReportGenerator(
-            outlet_code=outlet_code,
-            start_date=start_date,
-            end_date=end_date,
-            user_role=user_role
+        # Generate the report, or reuse the stored artifact if its data is unchanged
+        excel_file, cache_status, generation_seconds = export_cache.get_or_generate_report(
+            outlet_code, start_date, end_date, user_role
         )
-        
-        # Generate the report
-        excel_file = generator.generate_report()
 
         # Generate a safe filename
         outlet = Outlet.query.filter_by(outlet_code=outlet_code).first()
-        safe_outlet_name = outlet.outlet_name_gojek.replace('/', '_').replace('\\', '_').replace(' ', '_')
-        filename = f"Report_{safe_outlet_name}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
+        filename = bulk_export.report_filename(outlet.outlet_name_gojek, start_date, end_date)
 
-        return send_file(
+        response = send_file(
             excel_file,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
             download_name=filename
         )
+        response.headers['X-Cache'] = cache_status
+        response.headers['X-Generation-Time'] = str(generation_seconds)
+        return response
 
+    except AdmissionRejected:
+        raise
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 404
     except Exception as e:
@@ -59,8 +68,116 @@ def export_reports():
             "type": type(e).__name__
         }), 500
 
-@export_bp.route('/preview', methods=['POST', 'OPTIONS'])
+@export_bp.route('/bulk', methods=['POST', 'OPTIONS'])
+@cross_origin(expose_headers=["Content-Disposition"])
+def export_reports_bulk():
+    """
+    Exports every requested outlet as one ZIP. Accepts either a brand (all
+    active outlets of that brand) or an explicit outlet_codes list.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'OK'}), 200
+
+    data = request.get_json() or {}
+    brand = data.get('brand')
+    outlet_codes = data.get('outlet_codes')
+    start_date_str = data.get('start_date')
+    end_date_str = data.get('end_date')
+    user_role = data.get('user_role')
+
+    if not brand and not outlet_codes:
+        return jsonify({"error": "brand or outlet_codes is required"}), 400
+    if outlet_codes is not None and not isinstance(outlet_codes, list):
+        return jsonify({"error": "outlet_codes must be a list"}), 400
+    if not start_date_str or not end_date_str:
+        return jsonify({"error": "start_date and end_date are required"}), 400
+
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    if end_date < start_date:
+        return jsonify({"error": "end_date must be greater than or equal to start_date"}), 400
+
+    query = Outlet.query.with_entities(Outlet.outlet_code, Outlet.outlet_name_gojek)
+    if outlet_codes:
+        query = query.filter(Outlet.outlet_code.in_(outlet_codes))
+    else:
+        query = query.filter(Outlet.brand == brand, Outlet.status == "Active")
+    outlets = [(row.outlet_code, row.outlet_name_gojek) for row in query.order_by(Outlet.outlet_code).all()]
+
+    if not outlets:
+        return jsonify({"error": "No outlets found"}), 404
+
+    label = (brand or 'outlets').replace('/', '_').replace('\\', '_').replace(' ', '_')
+    filename = f"Reports_{label}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.zip"
+
+    return Response(
+        stream_with_context(bulk_export.iter_bulk_export_zip(outlets, start_date, end_date, user_role)),
+        mimetype='application/zip',
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@export_bp.route('/jobs', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def create_export_job():
+    """
+    Queues an export in the background and returns its job id right away.
+    ``report`` is one of outlet, monthly-income, monthly-mpr-commission or
+    monthly-management-commission; the other fields match the synchronous
+    endpoint, with start_date/end_date in the body.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'OK'}), 200
+
+    data = request.get_json(silent=True) or {}
+    try:
+        job = export_jobs.submit_export_job(data.get('report', 'outlet'), data)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        print(f"Error submitting export job: {e}")
+        return jsonify({"error": "Failed to submit export job", "details": str(e)}), 500
+
+    return jsonify({
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': url_for('export.get_export_job_status', job_id=job['job_id'], _external=True),
+    }), 202
+
+@export_bp.route('/jobs/<job_id>', methods=['GET'])
 @cross_origin()
+def get_export_job_status(job_id):
+    if not export_jobs.is_valid_job_id(job_id):
+        return jsonify({"error": "Export job not found"}), 404
+
+    job = export_jobs.get_export_job(job_id)
+    if job is None:
+        return jsonify({"error": "Export job not found"}), 404
+    return jsonify(job), 200
+
+@export_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@cross_origin(expose_headers=["Content-Disposition"])
+def download_export_job(job_id):
+    """Serves a finished job's workbook from local disk for a valid download token."""
+    if not export_jobs.is_valid_job_id(job_id):
+        return jsonify({"error": "Export job not found"}), 404
+
+    try:
+        path, filename = export_jobs.resolve_download_token(job_id, request.args.get('token', ''))
+    except SignatureExpired:
+        return jsonify({"error": "Download link has expired"}), 410
+    except BadSignature:
+        return jsonify({"error": "Invalid download link"}), 403
+
+    if path is None:
+        return jsonify({"error": "Export file not found"}), 404
+    return send_file(path, mimetype=export_jobs.XLSX_MIMETYPE, as_attachment=True, download_name=filename)
+
+@export_bp.route('/preview', methods=['POST', 'OPTIONS'])
+@cross_origin(expose_headers=["X-Cache"])
 def preview_daily_report():
     if request.method == 'OPTIONS':
         return jsonify({'status': 'OK'}), 200
@@ -93,22 +210,36 @@ def preview_daily_report():
     if end_date < start_date:
         return jsonify({"error": "end_date must be greater than or equal to start_date"}), 400
 
-    # Preview is intentionally Daily-sheet-only and limited to 31 days.
+    page = data.get('page')
+    if page is not None:
+        if not isinstance(page, int) or isinstance(page, bool):
+            return jsonify({"error": "page must be an integer"}), 400
+        max_days = current_app.config['PREVIEW_MAX_RANGE_DAYS']
+    else:
+        max_days = preview_cache.PREVIEW_WINDOW_DAYS
+
+    # Preview is intentionally Daily-sheet-only. Unpaged previews are limited to
+    # 31 days; paged previews serve longer ranges one 31-day window per page.
     # Full reporting for longer periods should use the Excel export endpoint.
-    if (end_date.date() - start_date.date()).days + 1 > 31:
+    if (end_date.date() - start_date.date()).days + 1 > max_days:
         return jsonify({
             "error": "Preview range is too large",
-            "message": "Daily preview is limited to a maximum of 31 days. Please use Excel export for longer periods."
+            "message": (
+                f"Daily preview is limited to a maximum of {max_days} days. "
+                + ("Please use Excel export for longer periods." if page is not None
+                   else "Pass a page to preview longer ranges, or use Excel export.")
+            )
         }), 400
 
     try:
-        generator = ExcelReportGenerator(
-            outlet_code=outlet_code,
-            start_date=start_date,
-            end_date=end_date,
-            user_role=user_role
-        )
-        return jsonify(generator.generate_daily_preview()), 200
+        preview, cache_status = preview_cache.get_daily_preview(outlet_code, start_date, end_date, user_role, page=page)
+        response = jsonify(preview)
+        response.headers['X-Cache'] = cache_status
+        return response, 200
+    except AdmissionRejected:
+        raise
+    except IndexError as ie:
+        return jsonify({"error": str(ie)}), 400
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 404
     except Exception as e:
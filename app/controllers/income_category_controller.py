@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.income_category import IncomeCategory
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
 
 income_category_bp = Blueprint("income_category_bp", __name__, url_prefix="/income_categories")
 
@@ -23,6 +24,7 @@ def create_income_category():
 
 # Get all income categories
 @income_category_bp.route("", methods=["GET"])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_income_categories():
     categories = IncomeCategory.query.all()
     return jsonify([category.to_dict() for category in categories])
@@ -10,6 +10,7 @@ from app.services.manual_entry_import_service import (
     import_manual_entries_from_adm_csv_content,
     parse_uploaded_date,
 )
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
 
 manual_entries_bp = Blueprint('manual_entries', __name__, url_prefix='/manual-entries')
 
@@ -109,6 +110,7 @@ def create_entry():
         return jsonify({'error': str(e)}), 500
 
 @manual_entries_bp.route('/', methods=['GET'])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_entries():
     outlet_code = request.args.get('outlet_code')
     entry_type = request.args.get('entry_type')
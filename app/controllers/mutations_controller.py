@@ -10,9 +10,11 @@ from app.models.manual_entry import ManualEntry
 from app.models.outlet import Outlet
 from datetime import datetime, timedelta
 from sqlalchemy import func, cast, Date, distinct
-from app.utils.transaction_matcher import TransactionMatcher
+from app.utils.transaction_matcher import TransactionMatcher, rebuild_matches_batched
 from app.models.income_category import IncomeCategory
 from app.models.expense_category import ExpenseCategory
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
+from app.utils.response_cache import MATCH_PLATFORMS, cached_response, month_tags, platform_tags, scoped_tag
 mutations_bp = Blueprint('mutations', __name__)
 
 UNASSIGNED_PLATFORM_CODE_EXCLUDED_PLATFORMS = ('PKB', 'Grab', 'Gojek', 'Shopee', 'ShopeeFood')
@@ -30,14 +32,14 @@ def serialize_bank_mutation(mutation):
     return {
         'id': mutation.id,
         'rekening_number': mutation.rekening_number,
-        'tanggal': mutation.tanggal.isoformat() if mutation.tanggal else None,
+        'tanggal': mutation.tanggal,
         'transaksi': mutation.transaksi,
         'transaction_type': mutation.transaction_type,
         'transaction_id': mutation.transaction_id,
-        'transaction_amount': float(mutation.transaction_amount) if mutation.transaction_amount is not None else None,
+        'transaction_amount': mutation.transaction_amount,
         'platform_code': mutation.platform_code,
         'platform_name': mutation.platform_name,
-        'created_at': mutation.created_at.isoformat() if mutation.created_at else None,
+        'created_at': mutation.created_at,
     }
 
 
@@ -63,6 +65,7 @@ def build_unassigned_platform_code_mutations_query(options):
 
 
 @mutations_bp.route('/mutations/unassigned', methods=['GET'])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_mutations():
     try:
         options = get_mutation_query_options()
@@ -86,8 +89,8 @@ def get_mutations():
         return jsonify({
             'data': [serialize_bank_mutation(mutation) for mutation in mutations],
             'filters': {
-                'start_date': options['start_date'].isoformat(),
-                'end_date': options['end_date'].isoformat(),
+                'start_date': options['start_date'],
+                'end_date': options['end_date'],
                 'platform_code': None,
                 'excluded_platform_names': list(UNASSIGNED_PLATFORM_CODE_EXCLUDED_PLATFORMS),
             },
@@ -122,7 +125,7 @@ def create_standardized_mutation(mutation):
     """Helper function to create standardized mutation structure"""
     return {
         'transaction_id': mutation.transaction_id,
-        'transaction_amount': float(mutation.transaction_amount) if mutation.transaction_amount is not None else 0.0,
+        'transaction_amount': mutation.transaction_amount if mutation.transaction_amount is not None else 0.0,
         'rekening_number': mutation.rekening_number,
         'transaction_date': mutation.tanggal,
         'platform_code': getattr(mutation, 'platform_code', None)
@@ -172,7 +175,7 @@ def build_match_response(platform, platform_label, start_date, end_date, page, p
             'transaction_id': m.transaction_id,
             'platform_code': m.platform_code,
             'transaction_date': m.tanggal,
-            'transaction_amount': float(m.transaction_amount or 0.0)
+            'transaction_amount': m.transaction_amount if m.transaction_amount is not None else 0.0
         }
         for m in batch_result['mutations']
         if (m.platform_code, m.tanggal) not in batch_result['matched_mutation_keys']
@@ -193,6 +196,11 @@ def build_match_response(platform, platform_label, start_date, end_date, page, p
     }
 
 @mutations_bp.route('/match/summary', methods=['GET'])
+@cached_response(lambda: [
+    *platform_tags(MATCH_PLATFORMS),
+    scoped_tag('outlet', None),
+    *month_tags(request.args.get('start_date'), request.args.get('end_date')),
+])
 def match_summary():
     """Summary route for transaction matching statistics across platforms"""
     try:
@@ -211,22 +219,22 @@ def match_summary():
         
         # Process each platform or just the requested one
         platforms_to_process = [platform] if platform else valid_platforms
+
+        # Skip platform_code for Grab as it doesn't use it
+        platform_codes = {
+            current_platform: None if current_platform == 'grab' else platform_code
+            for current_platform in platforms_to_process
+        }
+        rebuild_result = rebuild_matches_batched(platforms_to_process, start_date, end_date, platform_codes)
         
         for current_platform in platforms_to_process:
-            # Skip platform_code for Grab as it doesn't use it
-            current_platform_code = None if current_platform == 'grab' else platform_code
-            
-            matcher = TransactionMatcher(current_platform)
-            batch_result = matcher.safe_rebuild_matches(start_date, end_date, current_platform_code)
+            batch_result = rebuild_result['results'][current_platform]
             
             # Calculate statistics
             total_merchants = len(batch_result['daily_totals'])
             total_matched = sum(1 for result in batch_result['results'] if result['mutation_data'])
             total_unmatched_merchants = total_merchants - total_matched
-            total_unmatched_mutations = sum(
-                1 for mutation in batch_result['mutations']
-                if (mutation.platform_code, mutation.tanggal) not in batch_result['matched_mutation_keys']
-            )
+            total_unmatched_mutations = batch_result['unmatched_mutation_count']
             
             # Calculate matching percentage
             matching_percentage = (total_matched / total_merchants * 100) if total_merchants > 0 else 0
@@ -237,7 +245,8 @@ def match_summary():
                 'total_matched': total_matched,
                 'total_unmatched_merchants': total_unmatched_merchants,
                 'total_unmatched_mutations': total_unmatched_mutations,
-                'matching_percentage': round(matching_percentage, 2)
+                'matching_percentage': round(matching_percentage, 2),
+                'timings': batch_result['timings'],
             }
         
         # Calculate overall statistics if multiple platforms were processed
@@ -259,6 +268,7 @@ def match_summary():
         
         return jsonify({
             'summary': results,
+            'timings': rebuild_result['timings'],
             'date_range': {
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d')
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
-from app.models.outlet import Outlet
+from app.models.outlet import SEARCH_FIELDS, Outlet
 from app.models.rekening import Rekening
 from app.services.closing_platforms import (
     available_platforms_payload,
@@ -8,6 +8,10 @@ from app.services.closing_platforms import (
     normalize_platform,
     normalize_platforms,
 )
+from app.services.outlet_listing import outlet_fragment_batches, outlet_fragments, parse_fields
+from app.utils.json_provider import encoded_json_array, stream_encoded_json_array
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
+from app.utils.response_cache import cached_response, scoped_tag
 from datetime import datetime
 
 outlet_bp = Blueprint("outlet_bp", __name__, url_prefix="/outlets")
@@ -110,11 +114,20 @@ def create_outlet():
 
 # Get all outlets
 @outlet_bp.route("", methods=["GET"])
+@cached_response(lambda: [scoped_tag('outlet', None), scoped_tag('brand', request.args.get('brand'))])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_outlets():
     # Get query parameters for filtering
     search_term = request.args.get('search', '')
     brand = request.args.get('brand', '')
     missing_store_ids = request.args.get('missing_store_ids', '').lower() == 'true'
+    fields, unknown_fields = parse_fields(request.args.get('fields'))
+    if unknown_fields:
+        return jsonify({
+            "error": "Unknown fields",
+            "unknown_fields": unknown_fields,
+            "allowed_fields": list(Outlet.SERIALIZED_FIELDS)
+        }), 400
     
     # Get pagination parameters
     page = request.args.get('page', None, type=int)
@@ -123,15 +136,10 @@ def get_outlets():
     # Start with base query
     query = Outlet.query.filter(Outlet.status == 'Active').order_by(Outlet.outlet_name_gojek)
     
-    # Apply filters if provided
+    # Apply filters if provided; the search is served by the trigram index on SEARCH_FIELDS
     if search_term:
         query = query.filter(
-            (Outlet.outlet_code.ilike(f'%{search_term}%')) |
-            (Outlet.outlet_name_gojek.ilike(f'%{search_term}%')) |
-            (Outlet.outlet_name_grab.ilike(f'%{search_term}%')) |
-            (Outlet.store_id_gojek.ilike(f'%{search_term}%')) |
-            (Outlet.store_id_grab.ilike(f'%{search_term}%')) |
-            (Outlet.store_id_shopee.ilike(f'%{search_term}%'))
+            db.or_(*[getattr(Outlet, field).ilike(f'%{search_term}%') for field in SEARCH_FIELDS])
         )
     
     if brand:
@@ -148,6 +156,9 @@ def get_outlets():
             (Outlet.store_id_shopee == '')
         )
     
+    # Outlets are then read from cached fragments, loading only the stale ones
+    query = query.with_entities(Outlet.id, Outlet.updated_at)
+
     # Determine if pagination is requested
     if page or per_page:
         # Use default page/per_page if not specified
@@ -155,9 +166,10 @@ def get_outlets():
         per_page = per_page or 10
         paginated_outlets = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        response = {
-            'outlets': [outlet.to_dict() for outlet in paginated_outlets.items],
-            'pagination': {
+        return encoded_json_array(
+            'outlets',
+            outlet_fragments(paginated_outlets.items, fields),
+            pagination={
                 'total_items': paginated_outlets.total,
                 'total_pages': paginated_outlets.pages,
                 'current_page': page,
@@ -165,15 +177,10 @@ def get_outlets():
                 'has_next': paginated_outlets.has_next,
                 'has_prev': paginated_outlets.has_prev
             }
-        }
+        )
     else:
-        # Return all results without pagination
-        all_outlets = query.all()
-        response = {
-            'outlets': [outlet.to_dict() for outlet in all_outlets]
-        }
-    
-    return jsonify(response)
+        # Return all results without pagination, streamed from a server-side cursor
+        return stream_encoded_json_array('outlets', outlet_fragment_batches(query, fields))
 
 # Get a single outlet by ID
 @outlet_bp.route("/<int:outlet_id>", methods=["GET"])
@@ -186,6 +193,7 @@ def get_outlet(outlet_id):
 
 # Get outlets by rekening ID
 @outlet_bp.route("/rekening/<int:rekening_id>", methods=["GET"])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_outlets_by_rekening_id(rekening_id):
     rekening = Rekening.query.get(rekening_id)
     if not rekening:
@@ -367,6 +375,9 @@ def update_outlet(outlet_id):
 
         # Update fields
         for field in data:
+            if field in Outlet.DERIVED_FIELDS:
+                # Maintained from store_id_shopee by the model
+                continue
             if hasattr(outlet, field):
                 # Special handling for closing_date
                 if field == 'closing_date' and data[field]:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.partner import Partner
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
 
 partner_bp = Blueprint("partner_bp", __name__, url_prefix="/partners")
 
@@ -25,6 +26,7 @@ def create_partner():
 
 # Get all partners
 @partner_bp.route("", methods=["GET"])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_partners():
     partners = Partner.query.all()
     return jsonify([partner.to_dict() for partner in partners])
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.product import Product
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
 
 product_bp = Blueprint("product_bp", __name__, url_prefix="/products")
 
@@ -25,6 +26,7 @@ def create_product():
 from sqlalchemy import case
 
 @product_bp.route("", methods=["GET"])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_products():
     # 1. List of products to show at the top
     priority_names = ["MP78","Pukis & Martabak Kota Baru"]
@@ -4,6 +4,7 @@ from sqlalchemy.exc import IntegrityError
 from app.extensions import db
 from app.models.outlet import Outlet
 from app.models.rekening import Rekening
+from app.utils.query_limits import LISTING_STATEMENT_TIMEOUT_SECONDS, statement_timeout
 
 rekening_bp = Blueprint("rekening_bp", __name__, url_prefix="/rekenings")
 
@@ -51,6 +52,7 @@ def create_rekening():
 
 
 @rekening_bp.route("", methods=["GET"])
+@statement_timeout(LISTING_STATEMENT_TIMEOUT_SECONDS)
 def get_rekenings():
     rekenings = Rekening.query.order_by(Rekening.id.asc()).all()
     return jsonify([_to_dict(rekening) for rekening in rekenings]), 200
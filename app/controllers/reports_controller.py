@@ -1,5 +1,4 @@
 from io import BytesIO
-from fpdf import FPDF
 from flask import Blueprint, jsonify, request, Response, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.gojek_reports import GojekReport
@@ -18,6 +17,17 @@ from app.models.outlet_count_pkb import OutletCountPKB
 from app.models.ultra_voucher import VoucherReport
 from app.models.webshop_report import WebshopReport
 from app.extensions import db
+from app.extensions.database import use_replica
+from app.utils.response_cache import (
+    REPORT_PLATFORMS,
+    cached_response,
+    month_tags,
+    platform_tags,
+    request_fingerprint,
+    scoped_tag,
+)
+from app.utils.admission import AdmissionRejected
+from app.utils.single_flight import coalesce
 import sys
 from app.services.consolidation_service import update_daily_total_for_outlet
 
@@ -158,17 +168,8 @@ from app.models.outlet import Outlet
 import io
 from datetime import datetime
 
-import openpyxl
 from flask import Blueprint, jsonify, request, send_file
-from openpyxl.workbook import Workbook
 
-from app.services.excel_export.sheets.monthly_income_sheet import MonthlyIncomeSheet
-from app.services.excel_export.sheets.monthly_management_commission_sheet import (
-    MonthlyManagementCommissionSheet,
-)
-from app.services.excel_export.sheets.monthly_mpr_commission_sheet import (
-    MonthlyMprCommissionSheet,
-)
 from app.services.reporting_service import (
     generate_monthly_management_commission_data_custom_range,
     generate_monthly_management_commission_data,
@@ -179,7 +180,17 @@ from app.services.mpr_totals_service import (
     calculate_mpr_totals,
     get_mpr_mapping_for_outlet,
 )
-from app.utils.report_generator import generate_daily_report
+from app.utils.lazy_import import lazy_import
+
+# Loaded on first use so workers boot without fpdf, openpyxl and the sheet classes
+fpdf = lazy_import('fpdf')
+openpyxl = lazy_import('openpyxl')
+monthly_income_sheet = lazy_import('app.services.excel_export.sheets.monthly_income_sheet')
+monthly_management_commission_sheet = lazy_import(
+    'app.services.excel_export.sheets.monthly_management_commission_sheet'
+)
+monthly_mpr_commission_sheet = lazy_import('app.services.excel_export.sheets.monthly_mpr_commission_sheet')
+
 # from app.services.excel_export.data_service import (
 #     get_kas_transactions, create_kas_transaction,
 #     update_kas_transaction, delete_kas_transaction
@@ -1779,6 +1790,13 @@ def upload_report_pkb():
 
 
 @reports_bp.route('/commission-totals', methods=['GET'])
+@cached_response(lambda: [
+    *platform_tags(['grab']),
+    scoped_tag('outlet', request.args.get('outlet_code')),
+    scoped_tag('brand', request.args.get('brand_name')),
+    *month_tags(request.args.get('start_date'), request.args.get('end_date')),
+])
+@use_replica
 def get_commission_totals():
     start_date_param = request.args.get('start_date')
     end_date_param = request.args.get('end_date')
@@ -1845,6 +1863,13 @@ def get_commission_totals():
 
 
 @reports_bp.route('/totals', methods=['GET'])
+@cached_response(lambda: [
+    *platform_tags(REPORT_PLATFORMS),
+    scoped_tag('outlet', request.args.get('outlet_code')),
+    scoped_tag('brand', request.args.get('brand_name')),
+    *month_tags(request.args.get('start_date'), request.args.get('end_date')),
+])
+@use_replica
 def get_reports_totals():
     start_date_param = request.args.get('start_date')
     end_date_param = request.args.get('end_date')
@@ -2027,6 +2052,7 @@ def get_reports_totals():
 
 
 @reports_bp.route('/failed-cancelled-transfers', methods=['GET'])
+@use_replica
 def get_failed_cancelled_transfers():
     start_date_param = request.args.get('start_date')
     end_date_param = request.args.get('end_date')
@@ -2092,11 +2118,11 @@ def get_failed_cancelled_transfers():
                 'brand_name': report.brand_name,
                 'outlet_code': report.outlet_code,
                 'nama_toko': report.nama_toko,
-                'tanggal_dibuat': report.tanggal_dibuat.isoformat() if report.tanggal_dibuat else None,
-                'tanggal_transfer': report.tanggal_transfer.isoformat() if report.tanggal_transfer else None,
+                'tanggal_dibuat': report.tanggal_dibuat,
+                'tanggal_transfer': report.tanggal_transfer,
                 'status': report.status,
-                'amount': float(report.amount or 0),
-                'total': float(report.total or 0),
+                'amount': report.amount or 0.0,
+                'total': report.total or 0.0,
             }
             for report in reports
         ]
@@ -2133,6 +2159,13 @@ def get_failed_cancelled_transfers():
         return jsonify({'error': str(e)}), 500
 
 @reports_bp.route('/top-outlets', methods=['GET'])
+@cached_response(lambda: [
+    *platform_tags(REPORT_PLATFORMS),
+    scoped_tag('outlet', None),
+    scoped_tag('brand', request.args.get('brand_name')),
+    *month_tags(request.args.get('start_date'), request.args.get('end_date')),
+])
+@use_replica
 def get_top_outlets():
     start_date_param = request.args.get('start_date')
     end_date_param = request.args.get('end_date')
@@ -2264,6 +2297,7 @@ def get_top_outlets():
         return jsonify({'error': str(e)}), 500
 
 @reports_bp.route('/top-outlets/pdf', methods=['GET'])
+@use_replica
 def get_top_outlets_pdf():
     start_date_param = request.args.get('start_date')
     end_date_param = request.args.get('end_date')
@@ -2373,7 +2407,7 @@ def get_top_outlets_pdf():
         table_rows.append((str(idx), outlet['outlet_name'], f"{outlet['running_total']:,.2f}"))
 
     # Paginate 20 per page
-    pdf = FPDF()
+    pdf = fpdf.FPDF()
     pdf.set_font("Times", size=12)
 
     brand_name_out = brand_name
@@ -2416,7 +2450,8 @@ def get_top_outlets_pdf():
 
 
 @reports_bp.route("/monthly-income", methods=["POST", "OPTIONS"])
-@cross_origin(expose_headers=["Content-Disposition"])
+@cross_origin(expose_headers=["Content-Disposition", "X-Single-Flight"])
+@use_replica
 def monthly_income_report():
     """
     Generates and returns an Excel report of monthly net income for a given brand.
@@ -2442,7 +2477,7 @@ def monthly_income_report():
     if date_range_error:
         return jsonify({"error": date_range_error}), 400
 
-    try:
+    def build_workbook():
         data = generate_monthly_net_income_data(
             brand_name,
             year,
@@ -2450,19 +2485,26 @@ def monthly_income_report():
             end_date=end_date,
         )
         if not data:
-            return jsonify({"error": "No data found for the given criteria"}), 404
+            return None, {}
 
         workbook = openpyxl.Workbook()
         # Remove the default sheet created by openpyxl
         if "Sheet" in workbook.sheetnames:
             workbook.remove(workbook["Sheet"])
 
-        sheet = MonthlyIncomeSheet(workbook, data)
+        sheet = monthly_income_sheet.MonthlyIncomeSheet(workbook, data)
         sheet.generate()
 
         output = io.BytesIO()
         workbook.save(output)
         output.seek(0)
+        return output, {}
+
+    try:
+        # Month-end rushes send the same request from several users at once
+        output, _, flight = coalesce(f"monthly-income:{request_fingerprint()}", build_workbook)
+        if output is None:
+            return jsonify({"error": "No data found for the given criteria"}), 404
 
         if start_date and end_date:
             download_name = (
@@ -2477,16 +2519,20 @@ def monthly_income_report():
             download_name=download_name,
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
+        response.headers['X-Single-Flight'] = flight
         # ensure the browser can see Content-Disposition and set a safe referrer policy
-        response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
+        response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition, X-Single-Flight'
         response.headers['Referrer-Policy'] = 'no-referrer-when-downgrade'
         return response
+    except AdmissionRejected:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @reports_bp.route("/monthly-mpr-commission", methods=["POST", "OPTIONS"])
 @cross_origin(expose_headers=["Content-Disposition"])
+@use_replica
 def monthly_mpr_commission_report():
     """
     Generates and returns an Excel report of monthly MPR commission totals.
@@ -2513,7 +2559,7 @@ def monthly_mpr_commission_report():
         if "Sheet" in workbook.sheetnames:
             workbook.remove(workbook["Sheet"])
 
-        sheet = MonthlyMprCommissionSheet(workbook, data)
+        sheet = monthly_mpr_commission_sheet.MonthlyMprCommissionSheet(workbook, data)
         sheet.generate()
 
         output = io.BytesIO()
@@ -2542,6 +2588,7 @@ def monthly_mpr_commission_report():
 
 @reports_bp.route("/monthly-management-commission", methods=["POST", "OPTIONS"])
 @cross_origin(expose_headers=["Content-Disposition"])
+@use_replica
 def monthly_management_commission_report():
     """
     Generates and returns an Excel report of monthly management commission totals.
@@ -2575,7 +2622,7 @@ def monthly_management_commission_report():
         if "Sheet" in workbook.sheetnames:
             workbook.remove(workbook["Sheet"])
 
-        sheet = MonthlyManagementCommissionSheet(workbook, data)
+        sheet = monthly_management_commission_sheet.MonthlyManagementCommissionSheet(workbook, data)
         sheet.generate()
 
         output = io.BytesIO()
@@ -2604,6 +2651,7 @@ def monthly_management_commission_report():
 
 @reports_bp.route("/monthly-management-commission-custom", methods=["POST", "OPTIONS"])
 @cross_origin(expose_headers=["Content-Disposition"])
+@use_replica
 def monthly_management_commission_report_custom():
     """
     Generates an Excel report of monthly management commission totals using the
@@ -2636,7 +2684,7 @@ def monthly_management_commission_report_custom():
         if "Sheet" in workbook.sheetnames:
             workbook.remove(workbook["Sheet"])
 
-        sheet = MonthlyManagementCommissionSheet(workbook, data)
+        sheet = monthly_management_commission_sheet.MonthlyManagementCommissionSheet(workbook, data)
         sheet.generate()
 
         output = io.BytesIO()
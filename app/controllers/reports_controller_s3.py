@@ -2,10 +2,12 @@ from flask import Blueprint, request, jsonify, current_app
 from app.models.grabfood_reports import GrabFoodReport
 from app.extensions import db
 from datetime import datetime
-import boto3
-import pandas as pd
 import io
 from sqlalchemy.exc import IntegrityError
+from app.utils.lazy_import import lazy_import
+
+boto3 = lazy_import('boto3')
+pd = lazy_import('pandas')
 
 reports_s3_bp = Blueprint('reports_s3', __name__,url_prefix='/reports-s3')
 
@@ -1,3 +1,144 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND_KEY = 'replica'
+
+# 0 when the replica has replayed everything it received; otherwise seconds since the last replayed commit.
+# A server that is not in recovery (e.g. a second local instance) reports no lag.
+REPLICA_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_replica_health = {'checked_at': 0.0, 'healthy': False, 'lag_seconds': None}
+_replica_health_lock = threading.Lock()
+
+
+def replica_health() -> dict:
+    """
+    Whether the replica is reachable and within REPLICA_MAX_LAG_SECONDS,
+    re-checked at most every REPLICA_HEALTH_CHECK_SECONDS per process.
+    """
+    config = current_app.config
+    with _replica_health_lock:
+        if time.monotonic() - _replica_health['checked_at'] < config['REPLICA_HEALTH_CHECK_SECONDS']:
+            return dict(_replica_health)
+
+        try:
+            with db.engines[REPLICA_BIND_KEY].connect() as connection:
+                lag_seconds = float(connection.execute(REPLICA_LAG_SQL).scalar() or 0)
+            healthy = lag_seconds <= config['REPLICA_MAX_LAG_SECONDS']
+            if not healthy:
+                print(f"Warning: replica lag {lag_seconds:.1f}s exceeds tolerance, reading from primary")
+        except Exception as e:
+            print(f"Warning: replica unavailable, reading from primary: {e}")
+            lag_seconds, healthy = None, False
+
+        _replica_health.update(checked_at=time.monotonic(), healthy=healthy, lag_seconds=lag_seconds)
+        return dict(_replica_health)
+
+
+def _workload_engine():
+    """The pool of the current request's workload; interactive work uses the default bind."""
+    if not has_app_context():
+        return None
+    workload = g.get('workload')
+    if workload is None or workload not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        return None
+    return db.engines[workload]
+
+
+def _replica_engine():
+    if not has_app_context() or not g.get('use_replica'):
+        return None
+    if REPLICA_BIND_KEY not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        return None
+    if not replica_health()['healthy']:
+        return None
+    return db.engines[REPLICA_BIND_KEY]
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs to the replica bind while the current request or app
+    context has opted in via use_replica / prefer_replica. Flushes, DML, raw
+    SQL and SELECT ... FOR UPDATE go to the primary, and once a session has
+    written, every later read in it stays on the primary so the request sees
+    its own writes. Primary work uses the pool of the request's workload
+    (see app/utils/workloads.py), so uploads and exports cannot exhaust the
+    connections interactive requests need.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['has_writes'] = True
+            elif (
+                getattr(clause, 'is_select', False)
+                and getattr(clause, '_for_update_arg', None) is None
+                and not self.info.get('has_writes')
+            ):
+                engine = _replica_engine()
+                if engine is not None:
+                    return engine
+            engine = _workload_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that notes on each connection record how long its checkout
+    waited for a free connection, for pool ``checkout`` event listeners, and
+    counts checkouts that gave up after pool_timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        record.info['checkout_wait_seconds'] = time.perf_counter() - started
+        return record
+
+
+def prefer_replica():
+    """
+    Routes the rest of this app context's reads to the replica. Register with
+    ``bp.before_request(prefer_replica)`` for a read-only blueprint, or call it
+    at the start of a read-only background task.
+    """
+    g.use_replica = True
+
+
+def use_replica(view):
+    """Marks a read-only view to read from the replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        prefer_replica()
+        return view(*args, **kwargs)
+
+    return wrapper
+
 
-db = SQLAlchemy()
+db = SQLAlchemy(
+    session_options={'class_': RoutingSession},
+    engine_options={'poolclass': TimedQueuePool},
+)
@@ -1,17 +1,29 @@
-import boto3
-from botocore.exceptions import ClientError
-
 class S3Client:
+    """
+    The boto3 client is created on first use; importing boto3 at worker boot
+    costs more than most requests that never touch S3.
+    """
+
     def __init__(self):
-        self.client = None
-        
+        self._client = None
+        self._config = None
+        self.bucket = None
+
     def init_app(self, app):
-        self.client = boto3.client(
-            's3',
-            aws_access_key_id=app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=app.config['AWS_REGION']
-        )
+        self._client = None
+        self._config = {
+            'aws_access_key_id': app.config['AWS_ACCESS_KEY_ID'],
+            'aws_secret_access_key': app.config['AWS_SECRET_ACCESS_KEY'],
+            'region_name': app.config['AWS_REGION'],
+        }
         self.bucket = app.config['S3_BUCKET']
 
-s3 = S3Client()
\ No newline at end of file
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client('s3', **self._config)
+        return self._client
+
+s3 = S3Client()
@@ -7,6 +7,8 @@ class GojekReport(db.Model):
     brand_name = db.Column(db.String, nullable=False)
     outlet_code = db.Column(db.String, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    # Only set when a row is edited in place; lets export caches notice the edit
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.now)
     transaction_id = db.Column(db.String, nullable=False)
     transaction_date = db.Column(db.Date, nullable=False)
     stan = db.Column(db.String, nullable=True)
@@ -34,6 +36,7 @@ class GojekReport(db.Model):
 
     __table_args__ = (
         db.PrimaryKeyConstraint('transaction_id', name='pk_transaction_id'),
+        db.Index('ix_gojek_reports_outlet_code_transaction_date', 'outlet_code', 'transaction_date'),
     )
 
     def __repr__(self):
@@ -10,6 +10,8 @@ class GrabFoodReport(db.Model):
     # nama_merchant = db.Column(db.String, nullable=True)
     # id_merchant = db.Column(db.String, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Only set when a row is edited in place; lets export caches notice the edit
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.utcnow)
     nama_toko = db.Column(db.String, nullable=True)
     id_toko = db.Column(db.String, nullable=False)
     diperbarui_pada = db.Column(db.DateTime, nullable=True)
@@ -77,5 +79,9 @@ class GrabFoodReport(db.Model):
     # link_untuk_banding = db.Column(db.String, nullable=True)
     # status_banding = db.Column(db.String, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_grabfood_reports_outlet_code_tanggal_dibuat', 'outlet_code', 'tanggal_dibuat'),
+    )
+
     def __repr__(self):
         return f"<GrabFoodReport {self.id_transaksi}, {self.tanggal_dibuat}>"
\ No newline at end of file
@@ -1,6 +1,24 @@
 from app.extensions import db
 from datetime import datetime
+from sqlalchemy import DDL, event
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import validates
+
+
+def shopee_store_id_suffixes(store_id):
+    """Return the last 4 and 5 characters of a Shopee store id, as used in mutation platform codes."""
+    store_id = (store_id or '').strip()
+    if not store_id:
+        return None, None
+    return store_id[-4:], store_id[-5:]
+
+
+# Columns matched by GET /outlets?search=, each served by ix_outlets_search_trgm
+SEARCH_FIELDS = (
+    'outlet_code', 'outlet_name_gojek', 'outlet_name_grab',
+    'store_id_gojek', 'store_id_grab', 'store_id_shopee',
+)
+
 
 class Outlet(db.Model):
     __tablename__ = "outlets"
@@ -24,6 +42,9 @@ class Outlet(db.Model):
     store_id_gojek = db.Column(db.String(50), nullable=True, unique=True)
     store_id_grab = db.Column(db.String(50), nullable=True, unique=True)
     store_id_shopee = db.Column(db.String(50), nullable=True, unique=True)
+    # Derived from store_id_shopee, kept in sync by _sync_store_id_shopee_suffixes
+    store_id_shopee_suffix4 = db.Column(db.String(4), nullable=True, index=True)
+    store_id_shopee_suffix5 = db.Column(db.String(5), nullable=True, index=True)
     outlet_code_tiktok_webshop = db.Column(db.String(100), nullable=True)
 
     mp78_code = db.Column(db.String(10), nullable=True, unique=True)
@@ -55,41 +76,55 @@ class Outlet(db.Model):
     shopee_admin_email = db.Column(db.String(255), nullable=True)
     shopee_admin_password = db.Column(db.String(255), nullable=True)
 
+    DERIVED_FIELDS = ('store_id_shopee_suffix4', 'store_id_shopee_suffix5')
+    # Keys of to_dict(), in order; GET /outlets?fields= selects a subset of these
+    SERIALIZED_FIELDS = (
+        'id', 'outlet_code', 'outlet_name_gojek', 'outlet_name_grab', 'outlet_name_webshop',
+        'outlet_phone', 'outlet_email', 'area', 'service_area', 'city_grouping', 'address',
+        'brand', 'rekening_id', 'store_id_gojek', 'store_id_grab', 'store_id_shopee',
+        'outlet_code_tiktok_webshop',
+        'gojek_admin_email', 'gojek_admin_password', 'grab_admin_email', 'grab_admin_password',
+        'shopee_admin_email', 'shopee_admin_password',
+        'partner_name', 'partner_phone', 'pic_partner_name', 'pic_phone', 'status',
+        'closing_date', 'disabled_closing_platforms', 'operating_hours', 'coordinator_avenger',
+        'created_at', 'updated_at',
+    )
+
+    # Needs the pg_trgm extension (created with the table below); lets the ILIKE '%term%' search filters use an index
+    __table_args__ = (
+        db.Index(
+            'ix_outlets_search_trgm', *SEARCH_FIELDS,
+            postgresql_using='gin',
+            postgresql_ops={field: 'gin_trgm_ops' for field in SEARCH_FIELDS},
+        ),
+    )
+
+    @validates('store_id_shopee')
+    def _sync_store_id_shopee_suffixes(self, key, value):
+        self.store_id_shopee_suffix4, self.store_id_shopee_suffix5 = shopee_store_id_suffixes(value)
+        return value
+
+    def shopee_platform_codes(self):
+        """Mutation platform codes (last 4 / 5 digits) that belong to this outlet's Shopee store id."""
+        if self.store_id_shopee_suffix4 or self.store_id_shopee_suffix5:
+            return self.store_id_shopee_suffix4, self.store_id_shopee_suffix5
+        # Rows not yet backfilled fall back to computing the suffixes
+        return shopee_store_id_suffixes(self.store_id_shopee)
+
+    @staticmethod
+    def serialize_values(values: dict) -> dict:
+        """Finishes a to_dict()-style mapping built from a subset of SERIALIZED_FIELDS."""
+        if 'disabled_closing_platforms' in values:
+            values['disabled_closing_platforms'] = values['disabled_closing_platforms'] or []
+        return values
+
     def to_dict(self):
-        return {
-            "id": self.id,
-            "outlet_code": self.outlet_code,
-            "outlet_name_gojek": self.outlet_name_gojek,
-            "outlet_name_grab": self.outlet_name_grab,
-            "outlet_name_webshop": self.outlet_name_webshop,
-            "outlet_phone": self.outlet_phone,
-            "outlet_email": self.outlet_email,
-            "area": self.area,
-            "service_area": self.service_area,
-            "city_grouping": self.city_grouping,
-            "address": self.address,
-            "brand": self.brand,
-            "rekening_id": self.rekening_id,
-            "store_id_gojek": self.store_id_gojek,
-            "store_id_grab": self.store_id_grab,
-            "store_id_shopee": self.store_id_shopee,
-            "outlet_code_tiktok_webshop": self.outlet_code_tiktok_webshop,
-            # Add admin credentials
-            "gojek_admin_email": self.gojek_admin_email,
-            "gojek_admin_password": self.gojek_admin_password,
-            "grab_admin_email": self.grab_admin_email,
-            "grab_admin_password": self.grab_admin_password,
-            "shopee_admin_email": self.shopee_admin_email,
-            "shopee_admin_password": self.shopee_admin_password,
-            "partner_name": self.partner_name,
-            "partner_phone": self.partner_phone,
-            "pic_partner_name": self.pic_partner_name,
-            "pic_phone": self.pic_phone,
-            "status": self.status,
-            "closing_date": self.closing_date,
-            "disabled_closing_platforms": self.disabled_closing_platforms or [],
-            "operating_hours": self.operating_hours,
-            "coordinator_avenger": self.coordinator_avenger,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
-        }
+        return self.serialize_values({field: getattr(self, field) for field in self.SERIALIZED_FIELDS})
+
+
+# gin_trgm_ops only exists once pg_trgm is installed, so create_all() adds it before the outlets table
+event.listen(
+    Outlet.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
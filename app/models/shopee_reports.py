@@ -8,6 +8,8 @@ class ShopeeReport(db.Model):
     brand_name = db.Column(db.String, nullable=True)
     outlet_code = db.Column(db.String, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    # Only set when a row is edited in place; lets export caches notice the edit
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.now)
     transaction_type = db.Column(db.String, nullable=False)
     order_id = db.Column(db.String, nullable=False)
     order_pick_up_id = db.Column(db.String, nullable=True)
@@ -29,5 +31,9 @@ class ShopeeReport(db.Model):
     order_status = db.Column(db.String, nullable=True)
     order_type = db.Column(db.String, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_shopee_reports_outlet_code_order_create_time', 'outlet_code', 'order_create_time'),
+    )
+
     def __repr__(self):
         return f"<ShopeeReport {self.order_id}, {self.order_create_time}>"
\ No newline at end of file
@@ -8,6 +8,8 @@ class ShopeepayReport(db.Model):
     brand_name = db.Column(db.String, nullable=True)
     outlet_code = db.Column(db.String, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    # Only set when a row is edited in place; lets export caches notice the edit
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.now)
     
     merchant_host = db.Column(db.String, nullable=True)
     partner_merchant_id = db.Column(db.String, nullable=True)
@@ -38,5 +40,9 @@ class ShopeepayReport(db.Model):
     fee_withdrawal = db.Column(db.Numeric, nullable=True)
     fee_handling = db.Column(db.Numeric, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_shopeepay_reports_outlet_code_create_time', 'outlet_code', 'create_time'),
+    )
+
     def __repr__(self):
         return f"<ShopeepayReport {self.transaction_id}, {self.create_time}>"
\ No newline at end of file
@@ -7,34 +7,34 @@ from app.models.gojek_reports import GojekReport
 from app.models.grabfood_reports import GrabFoodReport
 from app.models.shopee_reports import ShopeeReport
 from app.models.shopeepay_reports import ShopeepayReport
+from app.services.partition_manager import day_range_filters, grab_report_day_filters
+
+# Per-day filters are plain ranges on the partition column so Postgres can prune
 REPORT_CONFIG = {
     'gojek': {
         'model': GojekReport,
-        'date_col': GojekReport.transaction_date,
+        'day_filters': lambda day: [GojekReport.transaction_date == day],
         'gross_col': GojekReport.amount,
         'net_col': GojekReport.nett_amount,
         'filters': [],
     },
     'grab': {
         'model': GrabFoodReport,
-        'date_col': func.cast(
-            func.coalesce(GrabFoodReport.diperbarui_pada, GrabFoodReport.tanggal_dibuat),
-            db.Date,
-        ),
+        'day_filters': lambda day: grab_report_day_filters(day, day),
         'gross_col': GrabFoodReport.amount,
         'net_col': GrabFoodReport.total,
         'filters': [],
     },
     'shopee': {
         'model': ShopeeReport,
-        'date_col': func.cast(ShopeeReport.order_create_time, db.Date),
+        'day_filters': lambda day: day_range_filters(ShopeeReport.order_create_time, day, day),
         'gross_col': ShopeeReport.order_amount,
         'net_col': ShopeeReport.net_income,
         'filters': [ShopeeReport.order_status != "Cancelled"],
     },
     'shopeepay': {
         'model': ShopeepayReport,
-        'date_col': func.cast(ShopeepayReport.create_time, db.Date),
+        'day_filters': lambda day: day_range_filters(ShopeepayReport.create_time, day, day),
         'gross_col': ShopeepayReport.transaction_amount,
         'net_col': ShopeepayReport.settlement_amount,
         'filters': [ShopeepayReport.transaction_type != "Withdrawal"],
@@ -55,7 +55,7 @@ def update_daily_total_for_outlet(outlet_id: str, date: datetime.date, report_ty
 
     config = REPORT_CONFIG[report_type]
     model = config['model']
-    date_col = config['date_col']
+    day_filters = config['day_filters']
     gross_col = config['gross_col']
     net_col = config['net_col']
     filters = config['filters']
@@ -66,7 +66,7 @@ def update_daily_total_for_outlet(outlet_id: str, date: datetime.date, report_ty
         func.sum(net_col).label('total_net')
     ).filter(
         model.outlet_code == outlet_id,
-        date_col == date,
+        *day_filters(date),
         *filters
     )
 
@@ -14,4 +14,13 @@ class BaseSheet(ABC):
         An abstract method that must be implemented by all concrete sheet classes.
         This method is responsible for generating the content of the Excel sheet.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def flush_rows(self, max_row: int):
+        """
+        Streams finished rows when the sheet is backed by a StreamingWorkbook.
+        Regular worksheets keep every row in memory, so this is a no-op there.
+        """
+        flush_rows = getattr(self.ws, 'flush_rows', None)
+        if flush_rows is not None:
+            flush_rows(max_row)
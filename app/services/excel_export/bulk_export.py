@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import time
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from flask import current_app
+
+MANIFEST_FILENAME = 'manifest.json'
+# Shown in the downloaded manifest; the exception itself is only logged on the server
+OUTLET_FAILURE_MESSAGE = 'Report generation failed for this outlet'
+
+# Set in each pool process by _init_worker
+_worker_app = None
+
+
+def report_filename(outlet_name: str, start_date, end_date) -> str:
+    safe_outlet_name = (outlet_name or '').replace('/', '_').replace('\\', '_').replace(' ', '_')
+    return f"Report_{safe_outlet_name}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
+
+
+def _init_worker():
+    """
+    Builds a Flask app inside the pool process. Processes are spawned rather
+    than forked, so each one opens its own engine and never shares pooled
+    connections with the gunicorn worker. They inherit
+    PROMETHEUS_MULTIPROC_DIR, so their live gauges are dropped on exit.
+    """
+    global _worker_app
+    from app import create_app
+    from app.extensions.database import prefer_replica
+    from app.utils.metrics import mark_process_dead_on_exit
+    from app.utils.workloads import EXPORT, set_workload
+
+    mark_process_dead_on_exit()
+
+    _worker_app = create_app()
+    _worker_app.app_context().push()
+    prefer_replica()
+    set_workload(EXPORT)
+
+
+def _generate_outlet_workbook(outlet_code: str, outlet_name: str, start_date, end_date, user_role: str):
+    from app.extensions import db
+    from app.services.excel_export.export_cache import get_or_generate_report
+
+    started_at = time.perf_counter()
+    try:
+        excel_file, cache_status, _ = get_or_generate_report(outlet_code, start_date, end_date, user_role)
+        with excel_file:
+            content = excel_file.read()
+    finally:
+        db.session.remove()
+
+    return {
+        'filename': report_filename(outlet_name, start_date, end_date),
+        'content': content,
+        'cache': cache_status,
+        'seconds': round(time.perf_counter() - started_at, 3),
+    }
+
+
+class _ZipChunkBuffer:
+    """Write-only sink for ZipFile; the bytes written so far are drained per chunk."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_bulk_export_zip(outlets, start_date, end_date, user_role: str, max_workers: int = None):
+    """
+    Generates one workbook per outlet in a process pool and yields a ZIP
+    archive chunk by chunk, adding each workbook as soon as it finishes.
+
+    ``outlets`` is a list of (outlet_code, outlet_name) pairs. Failures do not
+    abort the archive; they are listed in manifest.json, written last.
+    """
+    max_workers = max(1, min(
+        max_workers or current_app.config['BULK_EXPORT_MAX_WORKERS'],
+        current_app.config['ADMISSION_LIMITS']['export']['concurrency'],
+        len(outlets),
+    ))
+    buffer = _ZipChunkBuffer()
+    manifest = {
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'requested': len(outlets),
+        'generated': [],
+        'failed': [],
+    }
+    started_at = time.perf_counter()
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+    try:
+        with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            futures = {
+                executor.submit(
+                    _generate_outlet_workbook, outlet_code, outlet_name, start_date, end_date, user_role
+                ): outlet_code
+                for outlet_code, outlet_name in outlets
+            }
+            used_filenames = set()
+
+            for future in as_completed(futures):
+                outlet_code = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Bulk export failed for outlet {outlet_code}:")
+                    traceback.print_exception(e)
+                    manifest['failed'].append({
+                        'outlet_code': outlet_code,
+                        'error': OUTLET_FAILURE_MESSAGE,
+                    })
+                    continue
+
+                filename = result['filename']
+                if filename in used_filenames:
+                    filename = f"{outlet_code}_{filename}"
+                used_filenames.add(filename)
+
+                archive.writestr(
+                    zipfile.ZipInfo(filename, date_time=datetime.now().timetuple()[:6]),
+                    result['content'],
+                )
+                manifest['generated'].append({
+                    'outlet_code': outlet_code,
+                    'filename': filename,
+                    'cache': result['cache'],
+                    'seconds': result['seconds'],
+                })
+                yield buffer.drain()
+
+            manifest['total_seconds'] = round(time.perf_counter() - started_at, 3)
+            archive.writestr(
+                zipfile.ZipInfo(MANIFEST_FILENAME, date_time=datetime.now().timetuple()[:6]),
+                json.dumps(manifest, indent=2),
+            )
+        yield buffer.drain()
+    finally:
+        # Also runs when the client disconnects mid-download
+        executor.shutdown(wait=False, cancel_futures=True)
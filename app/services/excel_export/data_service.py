@@ -15,27 +15,60 @@ from app.models.pukis import Pukis
 from app.models.ultra_voucher import VoucherReport
 from app.models.income_category import IncomeCategory
 from app.models.expense_category import ExpenseCategory
+from app.models.bank_mutations import BankMutation
+from app.models.transaction_match import TransactionMatch
+from app.extensions import db
+from app.services.partition_manager import grab_created_bound
 from app.utils.transaction_matcher import TransactionMatcher
 from app.utils.pkb_mutation import get_minus_manual_entries
-from sqlalchemy import func
+from sqlalchemy import case, func, or_
 from sqlalchemy.orm import aliased
 
 GRAB_REPORTS_TRANSFERRED_ONLY = False
 GRAB_TRANSFERRED_STATUSES = ('Transferred', 'Ditransfer')
 SHOW_MUTATIONS_WITHOUT_PLATFORM_DATA = True
+MATCH_PLATFORMS = ('gojek', 'grab', 'shopee', 'shopeepay')
+REUSABLE_MATCH_STATUSES = ('matched', 'manual_matched', 'unmatched_platform')
+CLOSING_OFFSET_DAYS = 7
 
 def _grab_report_datetime_col():
     return func.coalesce(GrabFoodReport.diperbarui_pada, GrabFoodReport.tanggal_dibuat)
 
-def _grab_report_date(report):
-    return report.diperbarui_pada or report.tanggal_dibuat
+def load_daily_aggregates(outlet_codes, start_date: datetime, end_date: datetime) -> dict:
+    """
+    Runs the per-day aggregate queries once for several outlets.
+
+    Returns {outlet_code: {source: rows}}. TikTok and Qpon are fetched over the
+    report range plus the closing window before it, so the regular and the
+    closing-shifted columns are both derived from the same rows.
+    """
+    end_date_inclusive = datetime(end_date.year, end_date.month, end_date.day, 23, 59, 59)
+    closing_start = start_date - timedelta(days=CLOSING_OFFSET_DAYS)
+    period = (outlet_codes, start_date, end_date_inclusive)
+    results = {
+        'gojek': _query_daily_gojek(*period),
+        'uv': _query_daily_uv(*period),
+        'grab': _query_daily_grab(*period),
+        'shopee': _query_daily_shopee(*period),
+        'shopeepay': _query_daily_shopeepay(*period),
+        'tiktok': _query_daily_tiktok(outlet_codes, closing_start, end_date_inclusive),
+        'qpon': _query_daily_qpon(outlet_codes, closing_start, end_date_inclusive),
+        'webshop': _query_daily_webshop(*period),
+        'cash': _query_daily_cash(*period),
+    }
 
-def _is_transferred_grab_report(report):
-    return (report.status or '').strip() in GRAB_TRANSFERRED_STATUSES
+    aggregates = {outlet_code: defaultdict(list) for outlet_code in outlet_codes}
+    for source, rows in results.items():
+        for row in rows:
+            aggregates.setdefault(row.outlet_code, defaultdict(list))[source].append(row)
+    return aggregates
 
-def get_report_data(outlet_code: str, start_date: datetime, end_date: datetime) -> dict:
+def get_report_data(outlet_code: str, start_date: datetime, end_date: datetime, daily_aggregates: dict | None = None) -> dict:
     """
     Fetches and prepares all data required for the Excel report.
+
+    daily_aggregates may come from load_daily_aggregates() when the caller
+    builds several outlets for the same period.
     """
     end_date_inclusive = datetime(end_date.year, end_date.month, end_date.day, 23, 59, 59)
 
@@ -52,47 +85,29 @@ def get_report_data(outlet_code: str, start_date: datetime, end_date: datetime)
         daily_totals[date_iter] = _init_daily_total()
         date_iter += timedelta(days=1)
 
-    # Fetch all reports
-    gojek_reports = GojekReport.query.filter(GojekReport.outlet_code == outlet_code, GojekReport.transaction_date >= start_date, GojekReport.transaction_date <= end_date_inclusive).all()
-    grab_date_col = _grab_report_datetime_col()
-    grab_query = GrabFoodReport.query.filter(
-        GrabFoodReport.outlet_code == outlet_code,
-        grab_date_col >= start_date,
-        grab_date_col <= end_date_inclusive,
-    )
-    if GRAB_REPORTS_TRANSFERRED_ONLY:
-        grab_query = grab_query.filter(GrabFoodReport.status.in_(GRAB_TRANSFERRED_STATUSES))
-    grab_reports = grab_query.all()
-    shopee_reports = ShopeeReport.query.filter(ShopeeReport.outlet_code == outlet_code, ShopeeReport.order_create_time >= start_date, ShopeeReport.order_create_time <= end_date_inclusive).all()
-    shopeepay_reports = ShopeepayReport.query.filter(ShopeepayReport.outlet_code == outlet_code, ShopeepayReport.create_time >= start_date, ShopeepayReport.create_time <= end_date_inclusive).all()
-    tiktok_reports = TiktokReport.query.filter(TiktokReport.outlet_code == outlet_code, TiktokReport.order_time >= start_date, TiktokReport.order_time <= end_date_inclusive).all()
-    tiktok_closing_reports = TiktokReport.query.filter(TiktokReport.outlet_code == outlet_code, TiktokReport.order_time >= start_date - timedelta(days=7), TiktokReport.order_time <= end_date_inclusive - timedelta(days=7)).all()
-    qpon_reports = QponReport.query.filter(QponReport.outlet_code == outlet_code, QponReport.bill_created_at >= start_date, QponReport.bill_created_at <= end_date_inclusive).all()
-    qpon_closing_reports = QponReport.query.filter(QponReport.outlet_code == outlet_code, QponReport.bill_created_at >= start_date - timedelta(days=7), QponReport.bill_created_at <= end_date_inclusive - timedelta(days=7)).all()
-    webshop_reports = WebshopReport.query.filter(WebshopReport.outlet_code == outlet_code, WebshopReport.created_at >= start_date, WebshopReport.created_at <= end_date_inclusive).all()
-    uv_reports = VoucherReport.query.filter(VoucherReport.outlet_code == outlet_code, VoucherReport.order_date >= start_date, VoucherReport.order_date <= end_date_inclusive).all()
-    cash_income_reports = CashReport.query.filter(CashReport.outlet_code == outlet_code, CashReport.type == 'income', CashReport.tanggal >= start_date, CashReport.tanggal <= end_date_inclusive).all()
-    cash_expense_reports = CashReport.query.filter(CashReport.outlet_code == outlet_code, CashReport.type == 'expense', CashReport.tanggal >= start_date, CashReport.tanggal <= end_date_inclusive).all()
+    # Per-day aggregates, possibly preloaded together with other outlets
+    if daily_aggregates is None or outlet_code not in daily_aggregates:
+        daily_aggregates = load_daily_aggregates([outlet_code], start_date, end_date)
+    sources = daily_aggregates[outlet_code]
+    _aggregate_gojek(daily_totals, sources['gojek'])
+    _aggregate_uv(daily_totals, sources['uv'])
+    grab_totals = _aggregate_grab(daily_totals, sources['grab'], outlet.brand)
+    _aggregate_shopee(daily_totals, sources['shopee'])
+    _aggregate_shopeepay(daily_totals, sources['shopeepay'])
+    # TikTok and Qpon rows span the closing window too; each helper keeps its own days
+    _aggregate_tiktok(daily_totals, sources['tiktok'])
+    _aggregate_tiktok_closing(daily_totals, sources['tiktok'])
+    _aggregate_qpon(daily_totals, sources['qpon'])
+    _aggregate_qpon_closing(daily_totals, sources['qpon'])
+    _aggregate_webshop(daily_totals, sources['webshop'])
+    _aggregate_cash(daily_totals, sources['cash'])
 
     pukis_reports = []
     if outlet.brand == "Pukis & Martabak Kota Baru":
         pukis_reports = Pukis.query.filter(Pukis.outlet_code == outlet_code, Pukis.tanggal >= start_date, Pukis.tanggal <= end_date_inclusive).order_by(Pukis.tanggal.asc()).all()
 
-    # Aggregate data
-    _aggregate_gojek(daily_totals, gojek_reports)
-    _aggregate_uv(daily_totals, uv_reports)
-    grab_totals = _aggregate_grab(daily_totals, grab_reports, outlet.brand)
-    _aggregate_shopee(daily_totals, shopee_reports)
-    _aggregate_shopeepay(daily_totals, shopeepay_reports)
-    _aggregate_tiktok(daily_totals, tiktok_reports)
-    _aggregate_tiktok_closing(daily_totals, tiktok_closing_reports)
-    _aggregate_qpon(daily_totals, qpon_reports)
-    _aggregate_qpon_closing(daily_totals, qpon_closing_reports)
-    _aggregate_webshop(daily_totals, webshop_reports)
-    _aggregate_cash(daily_totals, cash_income_reports, cash_expense_reports)
-
     # Match mutations
-    _match_mutations(daily_totals, outlet_code, start_date, end_date)
+    _match_mutations(daily_totals, outlet, start_date, end_date)
 
     # Get minusan entries
     minusan_entries = get_minus_manual_entries(outlet_code, start_date.date(), end_date_inclusive.date())
@@ -131,7 +146,7 @@ def get_report_data(outlet_code: str, start_date: datetime, end_date: datetime)
         .all()
     )
 
-    grand_totals = _calculate_grand_totals(daily_totals)
+    grand_totals = calculate_grand_totals(daily_totals)
 
     return {
         "outlet": outlet,
@@ -161,49 +176,172 @@ def _init_daily_total():
         'ShopeePay_Mutation': None, 'ShopeePay_Difference': 0, 'UV': 0
     }
 
-def _aggregate_gojek(daily_totals, reports):
-    for report in reports:
-        date = report.transaction_date
-        daily_totals[date]['Gojek_Net'] += float(report.nett_amount or 0)
-        daily_totals[date]['Gojek_Gross'] += float(report.amount or 0)
-
-        # Add Gojek_QRIS logic
-        if report.payment_type == 'QRIS':
-            daily_totals[date]['Gojek_QRIS'] += float(report.nett_amount or 0)
+def _sum(column):
+    return func.coalesce(func.sum(column), 0)
+
+def _query_daily_gojek(outlet_codes, start_date, end_date):
+    return db.session.query(
+        GojekReport.outlet_code.label('outlet_code'),
+        GojekReport.transaction_date.label('date'),
+        _sum(GojekReport.nett_amount).label('net'),
+        _sum(GojekReport.amount).label('gross'),
+        _sum(case((GojekReport.payment_type == 'QRIS', GojekReport.nett_amount), else_=0)).label('qris'),
+    ).filter(
+        GojekReport.outlet_code.in_(outlet_codes),
+        GojekReport.transaction_date >= start_date,
+        GojekReport.transaction_date <= end_date,
+    ).group_by(GojekReport.outlet_code, GojekReport.transaction_date).all()
+
+def _query_daily_uv(outlet_codes, start_date, end_date):
+    day = func.date(VoucherReport.order_date)
+    return db.session.query(
+        VoucherReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        _sum(VoucherReport.nominal).label('nominal'),
+        func.count().label('vouchers'),
+    ).filter(
+        VoucherReport.outlet_code.in_(outlet_codes),
+        VoucherReport.order_date >= start_date,
+        VoucherReport.order_date <= end_date,
+    ).group_by(VoucherReport.outlet_code, day).all()
+
+def _query_daily_grab(outlet_codes, start_date, end_date):
+    grab_date_col = _grab_report_datetime_col()
+    day = func.date(grab_date_col)
+    query = db.session.query(
+        GrabFoodReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        _sum(GrabFoodReport.total).label('net'),
+        _sum(GrabFoodReport.amount).label('gross'),
+        _sum(case((GrabFoodReport.jenis == 'OVO', GrabFoodReport.total), else_=0)).label('ovo_net'),
+        _sum(case((GrabFoodReport.jenis == 'OVO', GrabFoodReport.amount), else_=0)).label('ovo_gross'),
+        _sum(case((GrabFoodReport.jenis == 'GrabFood', GrabFoodReport.total), else_=0)).label('grabfood_net'),
+        _sum(case((GrabFoodReport.jenis == 'GrabFood', GrabFoodReport.amount), else_=0)).label('grabfood_gross'),
+    ).filter(
+        GrabFoodReport.outlet_code.in_(outlet_codes),
+        grab_date_col >= start_date,
+        grab_date_col <= end_date,
+        # Orders are updated after they are created; lets Postgres skip later partitions
+        grab_created_bound(GrabFoodReport.tanggal_dibuat <= end_date),
+    )
+    if GRAB_REPORTS_TRANSFERRED_ONLY:
+        query = query.filter(GrabFoodReport.status.in_(GRAB_TRANSFERRED_STATUSES))
+    return query.group_by(GrabFoodReport.outlet_code, day).all()
+
+def _query_daily_shopee(outlet_codes, start_date, end_date):
+    day = func.date(ShopeeReport.order_create_time)
+    return db.session.query(
+        ShopeeReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        _sum(ShopeeReport.net_income).label('net'),
+        _sum(ShopeeReport.order_amount).label('gross'),
+    ).filter(
+        ShopeeReport.outlet_code.in_(outlet_codes),
+        ShopeeReport.order_create_time >= start_date,
+        ShopeeReport.order_create_time <= end_date,
+        or_(ShopeeReport.order_status.is_(None), ShopeeReport.order_status != "Cancelled"),
+    ).group_by(ShopeeReport.outlet_code, day).all()
+
+def _query_daily_shopeepay(outlet_codes, start_date, end_date):
+    day = func.date(ShopeepayReport.create_time)
+    return db.session.query(
+        ShopeepayReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        _sum(ShopeepayReport.settlement_amount).label('net'),
+        _sum(ShopeepayReport.transaction_amount).label('gross'),
+    ).filter(
+        ShopeepayReport.outlet_code.in_(outlet_codes),
+        ShopeepayReport.create_time >= start_date,
+        ShopeepayReport.create_time <= end_date,
+        or_(ShopeepayReport.transaction_type.is_(None), ShopeepayReport.transaction_type != "Withdrawal"),
+    ).group_by(ShopeepayReport.outlet_code, day).all()
+
+def _query_daily_tiktok(outlet_codes, start_date, end_date):
+    """Grouped by order day and settlement day, so settlement dates survive the aggregation."""
+    day = func.date(TiktokReport.order_time)
+    settlement_day = func.date(TiktokReport.settlement_time)
+    return db.session.query(
+        TiktokReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        settlement_day.label('settlement_date'),
+        _sum(TiktokReport.net_amount).label('net'),
+        _sum(TiktokReport.gross_amount).label('gross'),
+    ).filter(
+        TiktokReport.outlet_code.in_(outlet_codes),
+        TiktokReport.order_time >= start_date,
+        TiktokReport.order_time <= end_date,
+    ).group_by(TiktokReport.outlet_code, day, settlement_day).all()
+
+def _query_daily_qpon(outlet_codes, start_date, end_date):
+    day = func.date(QponReport.bill_created_at)
+    return db.session.query(
+        QponReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        _sum(QponReport.gross_amount).label('gross'),
+    ).filter(
+        QponReport.outlet_code.in_(outlet_codes),
+        QponReport.bill_created_at >= start_date,
+        QponReport.bill_created_at <= end_date,
+    ).group_by(QponReport.outlet_code, day).all()
+
+def _query_daily_webshop(outlet_codes, start_date, end_date):
+    day = func.date(WebshopReport.created_at)
+    return db.session.query(
+        WebshopReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        _sum(WebshopReport.nett_value).label('net'),
+        _sum(WebshopReport.gross_value).label('gross'),
+    ).filter(
+        WebshopReport.outlet_code.in_(outlet_codes),
+        WebshopReport.created_at >= start_date,
+        WebshopReport.created_at <= end_date,
+    ).group_by(WebshopReport.outlet_code, day).all()
+
+def _query_daily_cash(outlet_codes, start_date, end_date):
+    day = func.date(CashReport.tanggal)
+    return db.session.query(
+        CashReport.outlet_code.label('outlet_code'),
+        day.label('date'),
+        CashReport.type.label('type'),
+        _sum(CashReport.total).label('total'),
+    ).filter(
+        CashReport.outlet_code.in_(outlet_codes),
+        CashReport.type.in_(('income', 'expense')),
+        CashReport.tanggal >= start_date,
+        CashReport.tanggal <= end_date,
+    ).group_by(CashReport.outlet_code, day, CashReport.type).all()
+
+def _aggregate_gojek(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
+            continue
+        daily_totals[row.date]['Gojek_Net'] += float(row.net)
+        daily_totals[row.date]['Gojek_Gross'] += float(row.gross)
+        daily_totals[row.date]['Gojek_QRIS'] += float(row.qris)
 
-def _aggregate_uv(daily_totals, reports):
-    for report in reports:
-        date = report.order_date.date()
-        daily_totals[date]['UV'] += float(report.nominal or 0) - 5000
+def _aggregate_uv(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
+            continue
+        daily_totals[row.date]['UV'] += float(row.nominal) - 5000 * row.vouchers
 
-def _aggregate_grab(daily_totals, reports, brand):
+def _aggregate_grab(daily_totals, rows, brand):
     grabfood_gross_total = 0
     grabovo_gross_total = 0
     grabfood_net_total = 0
     grabovo_net_total = 0
-    for report in reports:
-        if GRAB_REPORTS_TRANSFERRED_ONLY and not _is_transferred_grab_report(report):
+    for row in rows:
+        if row.date not in daily_totals:
             continue
 
-        report_datetime = _grab_report_date(report)
-        if not report_datetime:
-            continue
-
-        date = report_datetime.date()
-        if date not in daily_totals:
-            continue
-
-        daily_totals[date]['Grab_Net'] += float(report.total or 0)
-        daily_totals[date]['Grab_Gross'] += float(report.amount or 0)
-        if hasattr(report, 'jenis'):
-            if report.jenis == 'OVO':
-                grabovo_gross_total += float(report.amount or 0)
-                grabovo_net_total += float(report.total or 0)
-                daily_totals[date]['GrabOVO_Net'] += float(report.total or 0)
-                daily_totals[date]['GrabOVO_Gross'] += float(report.amount or 0)
-            elif report.jenis == 'GrabFood':
-                grabfood_gross_total += float(report.amount or 0)
-                grabfood_net_total += float(report.total or 0)
+        daily_totals[row.date]['Grab_Net'] += float(row.net)
+        daily_totals[row.date]['Grab_Gross'] += float(row.gross)
+        daily_totals[row.date]['GrabOVO_Net'] += float(row.ovo_net)
+        daily_totals[row.date]['GrabOVO_Gross'] += float(row.ovo_gross)
+        grabovo_gross_total += float(row.ovo_gross)
+        grabovo_net_total += float(row.ovo_net)
+        grabfood_gross_total += float(row.grabfood_gross)
+        grabfood_net_total += float(row.grabfood_net)
     for date in daily_totals:
         if brand not in ["Pukis & Martabak Kota Baru"]:
             daily_totals[date]['Grab_Commission'] = daily_totals[date]['Grab_Net'] * 1/74
@@ -214,108 +352,181 @@ def _aggregate_grab(daily_totals, reports, brand):
         "grabfood_net_total": grabfood_net_total, "grabovo_net_total": grabovo_net_total
     }
 
-def _aggregate_shopee(daily_totals, reports):
-    for report in reports:
-        if report.order_status != "Cancelled":
-            date = report.order_create_time.date()
-            daily_totals[date]['Shopee_Net'] += float(report.net_income or 0)
-            daily_totals[date]['Shopee_Gross'] += float(report.order_amount or 0)
-
-def _aggregate_shopeepay(daily_totals, reports):
-    for report in reports:
-        if report.transaction_type != "Withdrawal":
-            date = report.create_time.date()
-            daily_totals[date]['ShopeePay_Net'] += float(report.settlement_amount or 0)
-            daily_totals[date]['ShopeePay_Gross'] += float(report.transaction_amount or 0)
-
-def _aggregate_tiktok(daily_totals, reports):
-    for report in reports:
-        date = report.order_time.date()
-        daily_totals[date]['Tiktok_Net'] += float(report.net_amount or 0)
-        daily_totals[date]['Tiktok_Gross'] += float(report.gross_amount or 0)
-        if report.settlement_time:
-            daily_totals[date]['Tiktok_Settlement_Time'].add(report.settlement_time.date())
-
-def _aggregate_tiktok_closing(daily_totals, reports):
-    for report in reports:
-        date = report.order_time.date() + timedelta(days=7)
-        if date not in daily_totals:
+def _aggregate_shopee(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
             continue
+        daily_totals[row.date]['Shopee_Net'] += float(row.net)
+        daily_totals[row.date]['Shopee_Gross'] += float(row.gross)
 
-        daily_totals[date]['Tiktok_Closing_Net'] += float(report.net_amount or 0)
-        daily_totals[date]['Tiktok_Closing_Gross'] += float(report.gross_amount or 0)
-
-def _aggregate_qpon(daily_totals, reports):
-    for report in reports:
-        if not report.bill_created_at:
+def _aggregate_shopeepay(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
             continue
+        daily_totals[row.date]['ShopeePay_Net'] += float(row.net)
+        daily_totals[row.date]['ShopeePay_Gross'] += float(row.gross)
 
-        date = report.bill_created_at.date()
+def _aggregate_tiktok(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
+            continue
+        daily_totals[row.date]['Tiktok_Net'] += float(row.net)
+        daily_totals[row.date]['Tiktok_Gross'] += float(row.gross)
+        if row.settlement_date:
+            daily_totals[row.date]['Tiktok_Settlement_Time'].add(row.settlement_date)
+
+def _aggregate_tiktok_closing(daily_totals, rows):
+    for row in rows:
+        date = row.date + timedelta(days=CLOSING_OFFSET_DAYS)
         if date not in daily_totals:
             continue
 
-        qpon_amount = float(report.gross_amount or 0)
-        daily_totals[date]['Qpon_Net'] += qpon_amount
-        daily_totals[date]['Qpon_Gross'] += float(report.gross_amount or 0)
+        daily_totals[date]['Tiktok_Closing_Net'] += float(row.net)
+        daily_totals[date]['Tiktok_Closing_Gross'] += float(row.gross)
 
-def _aggregate_qpon_closing(daily_totals, reports):
-    for report in reports:
-        if not report.bill_created_at:
+def _aggregate_qpon(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
             continue
 
-        date = report.bill_created_at.date() + timedelta(days=7)
+        # Qpon net is the gross bill amount
+        daily_totals[row.date]['Qpon_Net'] += float(row.gross)
+        daily_totals[row.date]['Qpon_Gross'] += float(row.gross)
+
+def _aggregate_qpon_closing(daily_totals, rows):
+    for row in rows:
+        date = row.date + timedelta(days=CLOSING_OFFSET_DAYS)
         if date not in daily_totals:
             continue
 
-        qpon_amount = float(report.gross_amount or 0)
-        daily_totals[date]['Qpon_Closing_Net'] += qpon_amount
-        daily_totals[date]['Qpon_Closing_Gross'] += float(report.gross_amount or 0)
+        daily_totals[date]['Qpon_Closing_Net'] += float(row.gross)
+        daily_totals[date]['Qpon_Closing_Gross'] += float(row.gross)
 
-def _aggregate_webshop(daily_totals, reports):
-    for report in reports:
-        if not report.created_at:
+def _aggregate_webshop(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
             continue
 
-        date = report.created_at.date()
-        if date not in daily_totals:
+        daily_totals[row.date]['Webshop_Net'] += float(row.net)
+        daily_totals[row.date]['Webshop_Gross'] += float(row.gross)
+
+def _aggregate_cash(daily_totals, rows):
+    for row in rows:
+        if row.date not in daily_totals:
             continue
+        key = 'Cash_Income' if row.type == 'income' else 'Cash_Expense'
+        daily_totals[row.date][key] = int(round(float(row.total)))
+
+def _platform_total_keys(platform):
+    prefix = 'ShopeePay' if platform == 'shopeepay' else platform.capitalize()
+    return f'{prefix}_Net', f'{prefix}_Mutation', f'{prefix}_Difference'
+
+def _load_persisted_matches(outlet_code, start_date, end_date):
+    rows = TransactionMatch.query.filter(
+        TransactionMatch.platform.in_(MATCH_PLATFORMS),
+        TransactionMatch.daily_total_outlet_id == outlet_code,
+        TransactionMatch.daily_total_date >= start_date,
+        TransactionMatch.daily_total_date <= end_date,
+        TransactionMatch.daily_total_report_type == TransactionMatch.platform,
+    ).all()
+    return {(row.platform, row.daily_total_date): row for row in rows}
+
+def _latest_mutation_uploads(start_date, end_date):
+    """Newest bank mutation upload per platform name in the matchable window."""
+    rows = db.session.query(
+        BankMutation.platform_name,
+        func.max(BankMutation.created_at),
+    ).filter(
+        BankMutation.platform_name.in_([TransactionMatcher(platform).config['platform_name'] for platform in MATCH_PLATFORMS]),
+        BankMutation.tanggal >= start_date,
+        BankMutation.tanggal <= end_date + timedelta(days=1),
+    ).group_by(BankMutation.platform_name).all()
+    return dict(rows)
+
+def _persisted_mutation_amount(row, net_amount, latest_upload):
+    """
+    Returns (reusable, mutation_amount) for a transaction_matches row.
+
+    Rows are dirty when the platform amount no longer equals the exported net
+    amount, when the cache row was stored without its mutation, or when an
+    unmatched row predates the latest mutation upload for the platform.
+    """
+    if row is None or row.status not in REUSABLE_MATCH_STATUSES:
+        return False, None
+
+    mutation_amount = float(row.mutation_amount) if row.mutation_amount is not None else None
+    if row.mutation_id and mutation_amount is None:
+        return False, None
+    if row.status == 'manual_matched':
+        return True, mutation_amount
+
+    if row.notes:
+        return False, None
+    if row.platform_amount is None or round(float(row.platform_amount), 2) != round(float(net_amount), 2):
+        return False, None
+
+    matched_at = row.updated_at or row.created_at
+    if row.status == 'unmatched_platform' and latest_upload and (not matched_at or latest_upload > matched_at):
+        return False, None
+    return True, mutation_amount
+
+def _apply_mutation_amount(totals, mutation_key, diff_key, mutation_amount, net_amount):
+    if mutation_amount is not None:
+        totals[mutation_key] = mutation_amount
+        totals[diff_key] = mutation_amount - float(net_amount)
+    else:
+        totals[mutation_key] = None
+        totals[diff_key] = None
+
+def _match_mutations(daily_totals, outlet, start_date, end_date):
+    """
+    Fills mutation and difference columns, reusing persisted transaction_matches.
 
-        net_amount = getattr(report, "nett_value", None)
-        if net_amount is None:
-            net_amount = getattr(report, "net_value", 0)
-
-        daily_totals[date]['Webshop_Net'] += float(net_amount or 0)
-        daily_totals[date]['Webshop_Gross'] += float(report.gross_value or 0)
-
-def _aggregate_cash(daily_totals, income_reports, expense_reports):
-    cash_income_temp = defaultdict(float)
-    cash_expense_temp = defaultdict(float)
-    for report in income_reports:
-        cash_income_temp[report.tanggal.date()] += float(report.total or 0)
-    for report in expense_reports:
-        cash_expense_temp[report.tanggal.date()] += float(report.total or 0)
-    for date in cash_income_temp:
-        daily_totals[date]['Cash_Income'] = int(round(cash_income_temp[date]))
-    for date in cash_expense_temp:
-        daily_totals[date]['Cash_Expense'] = int(round(cash_expense_temp[date]))
-
-def _match_mutations(daily_totals, outlet_code, start_date, end_date):
-    platforms = ['gojek', 'grab', 'shopee', 'shopeepay']
-    for platform in platforms:
+    Only days without a reusable persisted match are matched on the fly, against
+    mutations narrowed to this outlet's platform codes and those days.
+    """
+    outlet_code = outlet.outlet_code
+    persisted_matches = _load_persisted_matches(outlet_code, start_date.date(), end_date.date())
+    latest_uploads = _latest_mutation_uploads(start_date.date(), end_date.date())
+
+    for platform in MATCH_PLATFORMS:
         try:
             matcher = TransactionMatcher(platform)
-            mutations = matcher.get_mutations_query(start_date.date(), end_date.date()).all()
-            match_context = matcher.build_match_context(mutations=mutations, outlet_codes=[outlet_code])
+            net_key, mutation_key, diff_key = _platform_total_keys(platform)
+            latest_upload = latest_uploads.get(matcher.config['platform_name'])
+
+            pending_dates = []
             for date, totals in daily_totals.items():
-                net_key = f'{platform.capitalize()}_Net' if platform != 'shopeepay' else 'ShopeePay_Net'
-                mutation_key = f'{platform.capitalize()}_Mutation' if platform != 'shopeepay' else 'ShopeePay_Mutation'
-                diff_key = f'{platform.capitalize()}_Difference' if platform != 'shopeepay' else 'ShopeePay_Difference'
                 net_amount = totals.get(net_key, 0)
-
                 if net_amount == 0:
-                    if not SHOW_MUTATIONS_WITHOUT_PLATFORM_DATA:
-                        continue
+                    if SHOW_MUTATIONS_WITHOUT_PLATFORM_DATA:
+                        pending_dates.append(date)
+                    continue
+
+                reusable, mutation_amount = _persisted_mutation_amount(
+                    persisted_matches.get((platform, date)),
+                    net_amount,
+                    latest_upload,
+                )
+                if reusable:
+                    _apply_mutation_amount(totals, mutation_key, diff_key, mutation_amount, net_amount)
+                else:
+                    pending_dates.append(date)
+
+            if not pending_dates:
+                continue
+
+            mutations = matcher.get_outlet_mutations_query(outlet, pending_dates).all()
+            match_context = matcher.build_match_context(
+                mutations=mutations,
+                outlet_codes=[outlet_code],
+                outlets_by_code={outlet_code: outlet},
+            )
+            for date in pending_dates:
+                totals = daily_totals[date]
+                net_amount = totals.get(net_key, 0)
 
+                if net_amount == 0:
                     mutation_data = matcher.match_mutation_without_daily_total(
                         outlet_code,
                         date,
@@ -332,18 +543,13 @@ def _match_mutations(daily_totals, outlet_code, start_date, end_date):
                     mock_total = MockDailyTotal(outlet_code, date, net_amount)
                     _, mutation_data = matcher.match_transactions(mock_total, mutations, match_context)
 
-                if mutation_data:
-                    mutation_amount = float(mutation_data.get('transaction_amount', 0))
-                    totals[mutation_key] = mutation_amount
-                    totals[diff_key] = mutation_amount - float(net_amount)
-                else:
-                    totals[mutation_key] = None
-                    totals[diff_key] = None
+                mutation_amount = float(mutation_data.get('transaction_amount', 0)) if mutation_data else None
+                _apply_mutation_amount(totals, mutation_key, diff_key, mutation_amount, net_amount)
         except Exception as e:
             print(f"Warning: Mutation matching failed for {platform}: {str(e)}")
             continue
 
-def _calculate_grand_totals(daily_totals):
+def calculate_grand_totals(daily_totals):
     grand_totals = defaultdict(float)
     for day_totals in daily_totals.values():
         for key, value in day_totals.items():
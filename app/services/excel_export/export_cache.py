@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from tempfile import NamedTemporaryFile, TemporaryFile
+
+from flask import current_app
+from sqlalchemy import Text, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app.extensions import db, s3
+from app.models.bank_mutations import BankMutation
+from app.models.cash_reports import CashReport
+from app.models.expense_category import ExpenseCategory
+from app.models.gojek_reports import GojekReport
+from app.models.grabfood_reports import GrabFoodReport
+from app.models.income_category import IncomeCategory
+from app.models.manual_entry import ManualEntry
+from app.models.mp78_mutations import MP78Mutation
+from app.models.mpr_mapping import MprMapping
+from app.models.outlet import Outlet
+from app.models.pukis import Pukis
+from app.models.qpon_reports import QponReport
+from app.models.rekening import Rekening
+from app.models.shopee_reports import ShopeeReport
+from app.models.shopeepay_reports import ShopeepayReport
+from app.models.tiktok_reports import TiktokReport
+from app.models.transaction_match import TransactionMatch
+from app.models.ultra_voucher import VoucherReport
+from app.models.webshop_report import WebshopReport
+from app.services.excel_export.generator import ExcelReportGenerator
+from app.services.partition_manager import grab_created_bound
+from app.utils.single_flight import SHARED, coalesce
+
+# Bump when sheet layout or calculations change so old artifacts stop matching
+EXPORT_CACHE_FORMAT_VERSION = 2
+# Covers the 7-day TikTok/Qpon closing windows and mutation settlement offsets
+DATA_VERSION_PADDING_DAYS = 7
+
+
+def _report_sources():
+    """(model, date column) pairs read for an outlet's report, filtered by outlet_code."""
+    return (
+        (GojekReport, GojekReport.transaction_date),
+        (GrabFoodReport, func.coalesce(GrabFoodReport.diperbarui_pada, GrabFoodReport.tanggal_dibuat)),
+        (ShopeeReport, ShopeeReport.order_create_time),
+        (ShopeepayReport, ShopeepayReport.create_time),
+        (TiktokReport, TiktokReport.order_time),
+        (QponReport, QponReport.bill_created_at),
+        (WebshopReport, WebshopReport.created_at),
+        (VoucherReport, VoucherReport.order_date),
+        (CashReport, CashReport.tanggal),
+        (Pukis, Pukis.tanggal),
+        (MP78Mutation, MP78Mutation.tanggal),
+        (TransactionMatch, TransactionMatch.report_date),
+    )
+
+
+def _fingerprint_columns(model, *criteria):
+    """count(*), max(created_at) and max(updated_at) of the matching rows as scalar subqueries."""
+    aggregates = [func.count()]
+    for column_name in ('created_at', 'updated_at'):
+        column = getattr(model, column_name, None)
+        if column is not None:
+            aggregates.append(func.max(column))
+    return [
+        select(aggregate).select_from(model).where(*criteria).scalar_subquery()
+        for aggregate in aggregates
+    ]
+
+
+def _content_fingerprint(model, *columns):
+    """md5 of every row's ``columns``, for small lookup tables without timestamps."""
+    rows = func.string_agg(cast(func.json_build_array(*columns), Text), aggregate_order_by(literal(','), model.id))
+    return select(func.md5(rows)).select_from(model).scalar_subquery()
+
+
+def get_data_version(outlet_code: str, start_date: datetime, end_date: datetime) -> str:
+    """
+    Fingerprints every row that can contribute to an outlet's workbook.
+
+    Row counts catch deletions and max(created_at/updated_at) catch inserts and
+    edits. Rekenings and income/expense categories, whose names appear on the
+    Summary and Closing sheets, are small and have no timestamps, so their
+    content is hashed instead. Everything is read in a single round trip.
+    """
+    mpr_outlet_codes = [
+        code for (code,) in
+        MprMapping.query.with_entities(MprMapping.mpr_outlet_code)
+        .filter(MprMapping.mp78_outlet_code == outlet_code)
+        .all()
+    ]
+    outlet_codes = [outlet_code, *mpr_outlet_codes]
+    window_start = start_date - timedelta(days=DATA_VERSION_PADDING_DAYS)
+    window_end = datetime(end_date.year, end_date.month, end_date.day, 23, 59, 59) + timedelta(days=DATA_VERSION_PADDING_DAYS)
+
+    columns = []
+    for model, date_column in _report_sources():
+        criteria = [model.outlet_code.in_(outlet_codes), date_column >= window_start, date_column <= window_end]
+        if model is GrabFoodReport:
+            # Grab is partitioned on tanggal_dibuat, which never exceeds the report date
+            criteria.append(grab_created_bound(GrabFoodReport.tanggal_dibuat <= window_end))
+        columns.extend(_fingerprint_columns(model, *criteria))
+    columns.extend(_fingerprint_columns(ManualEntry, ManualEntry.outlet_code.in_(outlet_codes)))
+    columns.extend(_fingerprint_columns(Outlet, Outlet.outlet_code.in_(outlet_codes)))
+    columns.extend(_fingerprint_columns(MprMapping, MprMapping.mp78_outlet_code == outlet_code))
+    # Bank mutations are keyed by platform code, not outlet, so any upload in the window counts
+    columns.extend(_fingerprint_columns(
+        BankMutation,
+        BankMutation.tanggal >= window_start.date(),
+        BankMutation.tanggal <= window_end.date(),
+    ))
+    columns.append(_content_fingerprint(Rekening, Rekening.id, Rekening.name, Rekening.rekening_type, Rekening.rekening_number))
+    columns.append(_content_fingerprint(IncomeCategory, IncomeCategory.id, IncomeCategory.name))
+    columns.append(_content_fingerprint(ExpenseCategory, ExpenseCategory.id, ExpenseCategory.name))
+
+    row = db.session.execute(select(*columns)).one()
+    payload = json.dumps([str(value) for value in row]).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def build_cache_key(outlet_code: str, start_date, end_date, user_role, data_version: str) -> str:
+    raw = "|".join([
+        str(EXPORT_CACHE_FORMAT_VERSION),
+        outlet_code,
+        start_date.strftime('%Y-%m-%d'),
+        end_date.strftime('%Y-%m-%d'),
+        user_role or '',
+        data_version,
+    ])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class LocalExportCacheStore:
+    """
+    Artifacts on local disk, evicted least-recently-used once the directory
+    grows past max_bytes. Hits refresh the file's access time.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return f"{base}.xlsx", f"{base}.json"
+
+    def get(self, key):
+        artifact_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            now = time.time()
+            os.utime(artifact_path, (now, now))
+            artifact = open(artifact_path, 'rb')
+        except (OSError, ValueError):
+            # Missing, half-written or evicted by another worker meanwhile
+            return None
+        return artifact, meta
+
+    def put(self, key, fileobj, meta: dict):
+        artifact_path, meta_path = self._paths(key)
+        with NamedTemporaryFile(dir=self.directory, delete=False) as tmp:
+            for chunk in iter(lambda: fileobj.read(1024 * 1024), b''):
+                tmp.write(chunk)
+        os.replace(tmp.name, artifact_path)
+        with NamedTemporaryFile('w', dir=self.directory, suffix='.tmp', delete=False) as tmp:
+            json.dump(meta, tmp)
+        os.replace(tmp.name, meta_path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.xlsx'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name[:-len('.xlsx')]))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+
+class S3ExportCacheStore:
+    """
+    Artifacts under a prefix of the app's S3 bucket. S3 has no access time,
+    so eviction drops the oldest uploads first once the prefix exceeds max_bytes.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str, max_bytes: int):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/') + '/'
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.xlsx")
+        except Exception:
+            return None
+        artifact = TemporaryFile()
+        for chunk in response['Body'].iter_chunks():
+            artifact.write(chunk)
+        artifact.seek(0)
+        meta = {
+            'generation_seconds': float(response.get('Metadata', {}).get('generation-seconds', 0)),
+        }
+        return artifact, meta
+
+    def put(self, key, fileobj, meta: dict):
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            f"{self.prefix}{key}.xlsx",
+            ExtraArgs={'Metadata': {'generation-seconds': str(meta['generation_seconds'])}},
+        )
+        self._evict()
+
+    def _evict(self):
+        objects = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            objects.extend(page.get('Contents', []))
+
+        total = sum(obj['Size'] for obj in objects)
+        for obj in sorted(objects, key=lambda item: item['LastModified']):
+            if total <= self.max_bytes:
+                break
+            self.client.delete_object(Bucket=self.bucket, Key=obj['Key'])
+            total -= obj['Size']
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_export_cache_store():
+    """Builds the configured store once per process; returns None when caching is off."""
+    global _store
+    backend = current_app.config.get('EXPORT_CACHE_BACKEND', 'local')
+    if backend == 'none':
+        return None
+
+    with _store_lock:
+        if _store is None:
+            max_bytes = current_app.config['EXPORT_CACHE_MAX_BYTES']
+            if backend == 's3':
+                _store = S3ExportCacheStore(
+                    s3.client, s3.bucket, current_app.config['EXPORT_CACHE_S3_PREFIX'], max_bytes
+                )
+            else:
+                _store = LocalExportCacheStore(current_app.config['EXPORT_CACHE_DIR'], max_bytes)
+        return _store
+
+
+def get_or_generate_report(outlet_code: str, start_date, end_date, user_role, progress=None):
+    """
+    Returns (file object, cache status, generation seconds) for an outlet's
+    workbook, reusing a stored artifact while the underlying data is unchanged.
+    Identical requests arriving while the workbook is generated wait for it
+    and get status SHARED. ``progress`` is passed to
+    ExcelReportGenerator.generate_report() on a miss.
+    """
+    store = get_export_cache_store()
+    data_version = ''
+    if store is not None:
+        data_version = get_data_version(outlet_code, start_date, end_date)
+    cache_key = build_cache_key(outlet_code, start_date, end_date, user_role, data_version)
+    if store is not None:
+        cached = store.get(cache_key)
+        if cached is not None:
+            artifact, meta = cached
+            return artifact, 'HIT', meta.get('generation_seconds', 0)
+
+    def generate():
+        started_at = time.perf_counter()
+        generator = ExcelReportGenerator(
+            outlet_code=outlet_code,
+            start_date=start_date,
+            end_date=end_date,
+            user_role=user_role
+        )
+        excel_file = generator.generate_report(progress=progress)
+        generation_seconds = round(time.perf_counter() - started_at, 3)
+
+        if store is not None:
+            try:
+                store.put(cache_key, excel_file, {'generation_seconds': generation_seconds})
+            except Exception as e:
+                print(f"Warning: failed to store export artifact for {outlet_code}: {e}")
+            excel_file.seek(0)
+        return excel_file, {'generation_seconds': generation_seconds}
+
+    excel_file, meta, flight = coalesce(f"export:{cache_key}", generate)
+    if flight == SHARED:
+        return excel_file, SHARED, meta['generation_seconds']
+    return excel_file, 'BYPASS' if store is None else 'MISS', meta['generation_seconds']
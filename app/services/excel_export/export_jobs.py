@@ -0,0 +1,451 @@
+import json
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from tempfile import NamedTemporaryFile, TemporaryFile
+
+from flask import current_app, url_for
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from openpyxl import Workbook
+
+from app.extensions import db, s3
+from app.extensions.database import prefer_replica
+from app.models.outlet import Outlet
+from app.services.excel_export.bulk_export import report_filename
+from app.services.excel_export.export_cache import get_or_generate_report
+from app.services.excel_export.sheets.monthly_income_sheet import MonthlyIncomeSheet
+from app.services.excel_export.sheets.monthly_management_commission_sheet import (
+    MonthlyManagementCommissionSheet,
+)
+from app.services.excel_export.sheets.monthly_mpr_commission_sheet import MonthlyMprCommissionSheet
+from app.services.reporting_service import (
+    generate_monthly_management_commission_data,
+    generate_monthly_mpr_commission_data,
+    generate_monthly_net_income_data,
+)
+from app.utils.admission import run_slot
+from app.utils.workloads import EXPORT, set_workload
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+# Shown to clients polling a failed job; the exception itself is only logged on the server
+JOB_FAILURE_MESSAGE = 'Export failed'
+
+DOWNLOAD_TOKEN_SALT = 'export-job-download'
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec='seconds') + 'Z'
+
+
+def _parse_day(value, field):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a YYYY-MM-DD date")
+
+
+def _parse_optional_range(params):
+    start_date, end_date = params.get('start_date'), params.get('end_date')
+    if not start_date and not end_date:
+        return None, None
+    if not start_date or not end_date:
+        raise ValueError("start_date and end_date are required together")
+    start_date = _parse_day(start_date, 'start_date').date()
+    end_date = _parse_day(end_date, 'end_date').date()
+    if end_date < start_date:
+        raise ValueError("end_date must be greater than or equal to start_date")
+    return start_date, end_date
+
+
+def _monthly_download_name(prefix, label, year, start_date, end_date):
+    if start_date and end_date:
+        return f"{prefix}_{label}_{start_date.isoformat()}_to_{end_date.isoformat()}.xlsx"
+    return f"{prefix}_{label}_{year}.xlsx"
+
+
+def _save_workbook(workbook, progress, total_steps):
+    progress('Saving workbook', total_steps - 1, total_steps)
+    output = TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def _build_monthly_workbook(sheet_class, data, progress):
+    # Data fetch, the sheet, then save
+    total_steps = 3
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    sheet = sheet_class(workbook, data)
+    progress(f"Generating {sheet.sheet_name}", 1, total_steps)
+    sheet.generate()
+    return _save_workbook(workbook, progress, total_steps)
+
+
+def _validate_outlet(data):
+    outlet_code = data.get('outlet_code')
+    if not outlet_code:
+        raise ValueError("outlet_code is required")
+    start_date = _parse_day(data.get('start_date'), 'start_date')
+    end_date = _parse_day(data.get('end_date'), 'end_date')
+    if end_date < start_date:
+        raise ValueError("end_date must be greater than or equal to start_date")
+    return {
+        'outlet_code': outlet_code,
+        'start_date': data['start_date'],
+        'end_date': data['end_date'],
+        'user_role': data.get('user_role'),
+    }
+
+
+def _run_outlet(params, progress):
+    start_date = _parse_day(params['start_date'], 'start_date')
+    end_date = _parse_day(params['end_date'], 'end_date')
+    outlet = Outlet.query.filter_by(outlet_code=params['outlet_code']).first()
+    if not outlet:
+        raise ValueError(f"Outlet {params['outlet_code']} not found")
+
+    excel_file, cache_status, generation_seconds = get_or_generate_report(
+        params['outlet_code'], start_date, end_date, params['user_role'], progress=progress
+    )
+    return excel_file, report_filename(outlet.outlet_name_gojek, start_date, end_date), {
+        'cache': cache_status,
+        'generation_seconds': generation_seconds,
+    }
+
+
+def _validate_monthly(data, require_brand=False, reject_mpr=False):
+    params = {'year': data.get('year', datetime.now().year)}
+    try:
+        params['year'] = int(params['year'])
+    except (TypeError, ValueError):
+        raise ValueError("year must be a number")
+    _parse_optional_range(data)
+    params['start_date'] = data.get('start_date')
+    params['end_date'] = data.get('end_date')
+
+    if require_brand:
+        brand_name = (data.get('brand_name') or '').strip()
+        if not brand_name:
+            raise ValueError("brand_name is required")
+        if reject_mpr and brand_name.upper() == 'MPR':
+            raise ValueError("brand_name must be a non-MPR brand")
+        params['brand_name'] = brand_name
+    return params
+
+
+def _run_monthly_income(params, progress):
+    start_date, end_date = _parse_optional_range(params)
+    data = generate_monthly_net_income_data(
+        params['brand_name'], params['year'], start_date=start_date, end_date=end_date
+    )
+    if not data:
+        raise ValueError("No data found for the given criteria")
+    return _build_monthly_workbook(MonthlyIncomeSheet, data, progress), _monthly_download_name(
+        'Monthly_income', params['brand_name'], params['year'], start_date, end_date
+    ), {}
+
+
+def _run_monthly_mpr_commission(params, progress):
+    start_date, end_date = _parse_optional_range(params)
+    data = generate_monthly_mpr_commission_data(params['year'], start_date=start_date, end_date=end_date)
+    if not data:
+        raise ValueError("No data found for the given criteria")
+    return _build_monthly_workbook(MonthlyMprCommissionSheet, data, progress), _monthly_download_name(
+        'Monthly_mpr_commission', 'MPR', params['year'], start_date, end_date
+    ), {}
+
+
+def _run_monthly_management_commission(params, progress):
+    start_date, end_date = _parse_optional_range(params)
+    data = generate_monthly_management_commission_data(
+        params['brand_name'], params['year'], start_date=start_date, end_date=end_date
+    )
+    if not data or not data.get('outlets'):
+        raise ValueError("No data found for the given criteria")
+    return _build_monthly_workbook(MonthlyManagementCommissionSheet, data, progress), _monthly_download_name(
+        'Monthly_management_commission', params['brand_name'], params['year'], start_date, end_date
+    ), {}
+
+
+# report type -> (validate request body into job params, build the workbook)
+EXPORT_JOB_REPORTS = {
+    'outlet': (_validate_outlet, _run_outlet),
+    'monthly-income': (
+        lambda data: _validate_monthly(data, require_brand=True),
+        _run_monthly_income,
+    ),
+    'monthly-mpr-commission': (_validate_monthly, _run_monthly_mpr_commission),
+    'monthly-management-commission': (
+        lambda data: _validate_monthly(data, require_brand=True, reject_mpr=True),
+        _run_monthly_management_commission,
+    ),
+}
+
+
+class LocalExportJobStore:
+    """
+    Job state and artifacts on local disk, shared by every gunicorn worker on
+    the host. Downloads go through a signed, expiring URL served by the app.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id, extension):
+        return os.path.join(self.directory, f"{job_id}.{extension}")
+
+    def save_state(self, job_id, state: dict):
+        with NamedTemporaryFile('w', dir=self.directory, delete=False) as tmp:
+            json.dump(state, tmp)
+        os.replace(tmp.name, self._path(job_id, 'json'))
+
+    def load_state(self, job_id):
+        try:
+            with open(self._path(job_id, 'json')) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return None
+
+    def put_artifact(self, job_id, fileobj, filename):
+        with NamedTemporaryFile(dir=self.directory, delete=False) as tmp:
+            for chunk in iter(lambda: fileobj.read(1024 * 1024), b''):
+                tmp.write(chunk)
+        os.replace(tmp.name, self._path(job_id, 'xlsx'))
+
+    def artifact_path(self, job_id):
+        path = self._path(job_id, 'xlsx')
+        return path if os.path.exists(path) else None
+
+    def download_url(self, job_id, filename, expires_in: int) -> str:
+        token = _download_serializer().dumps(job_id)
+        return url_for('export.download_export_job', job_id=job_id, token=token, _external=True)
+
+    def cleanup(self, max_age_seconds: int):
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class S3ExportJobStore:
+    """
+    Job state and artifacts under a prefix of the app's S3 bucket; downloads
+    are presigned S3 URLs. Expire old jobs with a lifecycle rule on the prefix.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/') + '/'
+
+    def _key(self, job_id, extension):
+        return f"{self.prefix}{job_id}.{extension}"
+
+    def save_state(self, job_id, state: dict):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(job_id, 'json'),
+            Body=json.dumps(state).encode(),
+            ContentType='application/json',
+        )
+
+    def load_state(self, job_id):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(job_id, 'json'))
+            return json.loads(response['Body'].read())
+        except Exception:
+            return None
+
+    def put_artifact(self, job_id, fileobj, filename):
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            self._key(job_id, 'xlsx'),
+            ExtraArgs={'ContentType': XLSX_MIMETYPE},
+        )
+
+    def artifact_path(self, job_id):
+        return None
+
+    def download_url(self, job_id, filename, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._key(job_id, 'xlsx'),
+                'ResponseContentDisposition': f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=expires_in,
+        )
+
+    def cleanup(self, max_age_seconds: int):
+        pass
+
+
+_store = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_export_job_store():
+    global _store
+    with _lock:
+        if _store is None:
+            if current_app.config.get('EXPORT_JOB_BACKEND', 'local') == 's3':
+                _store = S3ExportJobStore(s3.client, s3.bucket, current_app.config['EXPORT_JOB_S3_PREFIX'])
+            else:
+                _store = LocalExportJobStore(current_app.config['EXPORT_JOB_DIR'])
+        return _store
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['EXPORT_JOB_MAX_WORKERS'],
+                thread_name_prefix='export-job',
+            )
+        return _executor
+
+
+def _download_serializer():
+    return URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'], salt=DOWNLOAD_TOKEN_SALT)
+
+
+def is_valid_job_id(job_id: str) -> bool:
+    return bool(JOB_ID_PATTERN.match(job_id or ''))
+
+
+def submit_export_job(report: str, data: dict) -> dict:
+    """
+    Validates the request body for ``report``, records a queued job and hands
+    it to the background pool. Raises ValueError for an invalid request.
+    """
+    if report not in EXPORT_JOB_REPORTS:
+        raise ValueError(f"report must be one of: {', '.join(EXPORT_JOB_REPORTS)}")
+    validate, _ = EXPORT_JOB_REPORTS[report]
+    params = validate(data)
+
+    store = get_export_job_store()
+    store.cleanup(current_app.config['EXPORT_JOB_RETENTION_SECONDS'])
+
+    job_id = uuid.uuid4().hex
+    state = {
+        'job_id': job_id,
+        'report': report,
+        'params': params,
+        'status': JOB_QUEUED,
+        'phase': 'Queued',
+        'completed_steps': 0,
+        'total_steps': None,
+        'progress': 0,
+        'filename': None,
+        'error': None,
+        'created_at': _now(),
+        'updated_at': _now(),
+        'finished_at': None,
+    }
+    store.save_state(job_id, state)
+    # The worker thread keeps updating ``state``; the response gets the state as submitted
+    submitted = dict(state)
+    _get_executor().submit(_run_job, current_app._get_current_object(), store, state)
+    return submitted
+
+
+def _run_job(app, store, state):
+    job_id = state['job_id']
+    _, build = EXPORT_JOB_REPORTS[state['report']]
+
+    def save(**changes):
+        state.update(changes, updated_at=_now())
+        store.save_state(job_id, state)
+
+    def progress(phase, completed_steps, total_steps):
+        percent = int(completed_steps * 100 / total_steps) if total_steps else 0
+        save(phase=phase, completed_steps=completed_steps, total_steps=total_steps, progress=percent)
+
+    started_at = time.perf_counter()
+    with app.app_context():
+        prefer_replica()
+        set_workload(EXPORT)
+        try:
+            # Jobs count against the same export run slots as export requests in every worker
+            with run_slot(EXPORT, on_wait=lambda: save(phase='Waiting for a free export slot')):
+                save(status=JOB_RUNNING, phase='Fetching data')
+                excel_file, filename, details = build(state['params'], progress)
+                with excel_file:
+                    store.put_artifact(job_id, excel_file, filename)
+            save(
+                status=JOB_DONE,
+                phase='Done',
+                progress=100,
+                completed_steps=state['total_steps'] or state['completed_steps'],
+                filename=filename,
+                seconds=round(time.perf_counter() - started_at, 3),
+                finished_at=_now(),
+                **details,
+            )
+        except Exception as e:
+            print(f"Export job {job_id} ({state['report']}) failed:")
+            traceback.print_exception(e)
+            save(status=JOB_FAILED, error=JOB_FAILURE_MESSAGE, finished_at=_now())
+        finally:
+            db.session.remove()
+
+
+def get_export_job(job_id: str):
+    """
+    Returns the job's public state, with a time-limited download URL once it
+    is done, or None for an unknown job.
+    """
+    store = get_export_job_store()
+    state = store.load_state(job_id)
+    if state is None:
+        return None
+
+    if state['status'] in (JOB_QUEUED, JOB_RUNNING):
+        updated_at = datetime.fromisoformat(state['updated_at'].rstrip('Z'))
+        if (datetime.utcnow() - updated_at).total_seconds() > current_app.config['EXPORT_JOB_STALE_SECONDS']:
+            state.update(status=JOB_FAILED, error="Export job was interrupted")
+
+    if state['status'] == JOB_DONE:
+        expires_in = current_app.config['EXPORT_JOB_URL_TTL_SECONDS']
+        state['download_url'] = store.download_url(job_id, state['filename'], expires_in)
+        state['download_expires_in'] = expires_in
+    return state
+
+
+def resolve_download_token(job_id: str, token: str):
+    """
+    Checks a local download token and returns (artifact path, filename).
+    Raises itsdangerous' SignatureExpired / BadSignature for a bad token.
+    """
+    signed_job_id = _download_serializer().loads(
+        token, max_age=current_app.config['EXPORT_JOB_URL_TTL_SECONDS']
+    )
+    if signed_job_id != job_id:
+        raise BadSignature("Token does not match job")
+
+    store = get_export_job_store()
+    state = store.load_state(job_id)
+    path = store.artifact_path(job_id)
+    if not state or state['status'] != JOB_DONE or path is None:
+        return None, None
+    return path, state['filename']
@@ -1,34 +1,73 @@
+import time
 from io import BytesIO
 from openpyxl import Workbook
 from app.models.mpr_mapping import MprMapping
-from app.services.excel_export.data_service import get_report_data
+from app.services.excel_export.data_service import get_report_data, load_daily_aggregates
 from app.services.excel_export.sheets.daily_sheet import DailySheet
 from app.services.excel_export.sheets.summary_sheet import SummarySheet
 from app.services.excel_export.sheets.closing_sheet import ClosingSheet
 from app.services.excel_export.sheets.pukis_sheet import PukisSheet
 from app.services.excel_export.sheets.pukis_closing_sheet import PukisClosingSheet
+from app.services.excel_export.utils.streaming_workbook import StreamingWorkbook
+from app.utils.metrics import observe_excel_sheet
+from app.utils.query_limits import set_db_phase
+
+
+def _ignore_progress(phase, completed_steps, total_steps):
+    pass
+
 
 class ExcelReportGenerator:
-    def __init__(self, outlet_code: str, start_date, end_date, user_role: str):
+    def __init__(self, outlet_code: str, start_date, end_date, user_role: str, streaming: bool = True):
         self.outlet_code = outlet_code
         self.start_date = start_date
         self.end_date = end_date
         self.user_role = user_role
-        self.wb = Workbook()
-        self.wb.remove(self.wb.active)  # Remove default sheet
+        self.streaming = streaming
+        self._daily_aggregates = None
+        self._mpr_outlet_code = None
+        if streaming:
+            self.wb = StreamingWorkbook()
+        else:
+            self.wb = Workbook()
+            self.wb.remove(self.wb.active)  # Remove default sheet
 
-    def generate_report(self) -> BytesIO:
+    def generate_report(self, progress=None):
         """
         Generates the full Excel report by fetching data and calling each sheet generator.
+
+        In streaming mode each sheet is written to openpyxl's write-only backend
+        once the next one starts, and the saved workbook is returned as a temp
+        file so it is sent from disk instead of an in-memory buffer.
+
+        ``progress(phase, completed_steps, total_steps)`` is called as each
+        phase starts: data fetch, every sheet, then save.
         """
-        report_data = self._build_report_data(self.outlet_code)
+        report_progress = progress or _ignore_progress
+
+        def progress(phase, completed_steps, total_steps):
+            # A statement timeout names the phase it interrupted
+            set_db_phase(phase)
+            report_progress(phase, completed_steps, total_steps)
+
+        progress('Fetching data', 0, None)
 
-        DailySheet(self.wb, report_data).generate()
+        # The MPR Daily sheet covers the mapped MPR outlet over the same period,
+        # so both outlets' per-day aggregates are fetched in one pass.
+        self._mpr_outlet_code = self._get_mpr_outlet_code()
+        self._daily_aggregates = load_daily_aggregates(
+            [code for code in (self.outlet_code, self._mpr_outlet_code) if code],
+            self.start_date,
+            self.end_date,
+        )
 
+        report_data = self._build_report_data(self.outlet_code)
         mpr_report_data = self._get_mpr_report_data(report_data)
         report_data['mpr_report_data'] = mpr_report_data
+
+        sheets = [(DailySheet, report_data, {})]
         if mpr_report_data:
-            DailySheet(self.wb, mpr_report_data, sheet_name='MPR Daily').generate()
+            sheets.append((DailySheet, mpr_report_data, {'sheet_name': 'MPR Daily'}))
 
         # Define the sheet generators to run
         sheet_generators = [
@@ -41,11 +80,22 @@ class ExcelReportGenerator:
             sheet_generators.append(PukisSheet)
         else:
             sheet_generators.append(ClosingSheet)
+        sheets.extend((sheet_class, report_data, {}) for sheet_class in sheet_generators)
+
+        # Data fetch, one step per sheet, then save
+        total_steps = len(sheets) + 2
 
         # Generate each sheet
-        for sheet_class in sheet_generators:
-            sheet_instance = sheet_class(self.wb, report_data)
+        for step, (sheet_class, sheet_data, options) in enumerate(sheets, 1):
+            sheet_instance = sheet_class(self.wb, sheet_data, **options)
+            progress(f"Generating {sheet_instance.sheet_name}", step, total_steps)
+            started_at = time.perf_counter()
             sheet_instance.generate()
+            observe_excel_sheet(sheet_class, time.perf_counter() - started_at)
+
+        progress('Saving workbook', total_steps - 1, total_steps)
+        if self.streaming:
+            return self.wb.save_to_tempfile()
 
         # Save workbook to a byte stream
         excel_file = BytesIO()
@@ -54,13 +104,14 @@ class ExcelReportGenerator:
 
         return excel_file
 
-    def generate_daily_preview(self) -> dict:
+    def generate_daily_preview(self, window_days: int | None = None) -> dict:
         """
         Generates only the Daily sheet preview data.
 
         This intentionally avoids building the full workbook. Full reporting,
         reconciliation, summary, closing, monthly, and commission sheets should
-        continue to use generate_report().
+        continue to use generate_report(). ``window_days`` adds per-window
+        totals for paged previews (see DailySheet.build_preview).
         """
         report_data = self._build_report_data(self.outlet_code)
         outlet = report_data['outlet']
@@ -75,25 +126,30 @@ class ExcelReportGenerator:
                 'start_date': self.start_date.strftime('%Y-%m-%d'),
                 'end_date': self.end_date.strftime('%Y-%m-%d'),
             },
-            'sheet': DailySheet(None, report_data).build_preview(),
+            'sheet': DailySheet(None, report_data).build_preview(window_days=window_days),
         }
 
     def _build_report_data(self, outlet_code: str) -> dict:
-        report_data = get_report_data(outlet_code, self.start_date, self.end_date)
+        report_data = get_report_data(outlet_code, self.start_date, self.end_date, self._daily_aggregates)
         report_data['user_role'] = self.user_role
         return report_data
 
+    def _get_mpr_outlet_code(self) -> str | None:
+        mapping = MprMapping.query.filter_by(mp78_outlet_code=self.outlet_code).first()
+        if not mapping or not mapping.mpr_outlet_code:
+            return None
+        return mapping.mpr_outlet_code
+
     def _get_mpr_report_data(self, report_data: dict) -> dict | None:
         outlet = report_data['outlet']
         if outlet.brand != "MP78":
             return None
 
-        mapping = MprMapping.query.filter_by(mp78_outlet_code=outlet.outlet_code).first()
-        if not mapping or not mapping.mpr_outlet_code:
+        if not self._mpr_outlet_code:
             return None
 
         try:
-            return self._build_report_data(mapping.mpr_outlet_code)
+            return self._build_report_data(self._mpr_outlet_code)
         except ValueError as exc:
             print(
                 "Warning: Skipping MPR Daily sheet for "
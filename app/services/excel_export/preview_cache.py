@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from tempfile import NamedTemporaryFile
+
+from flask import current_app
+
+from app.services.excel_export.export_cache import build_cache_key, get_data_version
+from app.services.excel_export.generator import ExcelReportGenerator
+from app.utils.admission import claim_run_slot
+from app.utils.single_flight import SHARED, coalesce
+
+# Rows per page of a paged preview; also the longest range served unpaged
+PREVIEW_WINDOW_DAYS = 31
+
+
+class PreviewCache:
+    """
+    Built previews as JSON files in a directory shared by all workers, so
+    consecutive pages of one range are served from a single build whichever
+    worker answers. Hits refresh the file's mtime and the least recently used
+    are evicted past max_entries. Entries are keyed by data version, so stale
+    ones are simply never hit again.
+    """
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as entry_file:
+                preview = current_app.json.loads(entry_file.read())
+            now = time.time()
+            os.utime(path, (now, now))
+        except (OSError, ValueError):
+            return None
+        return preview
+
+    def put(self, key, preview: dict):
+        with NamedTemporaryFile('w', dir=self.directory, suffix='.tmp', delete=False, encoding='utf-8') as tmp:
+            tmp.write(current_app.json.dumps(preview))
+        os.replace(tmp.name, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                entries.append((os.stat(os.path.join(self.directory, name)).st_mtime, name))
+            except OSError:
+                continue
+        for _, name in sorted(entries)[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_preview_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PreviewCache(current_app.config['PREVIEW_CACHE_DIR'], current_app.config['PREVIEW_CACHE_MAX_ENTRIES'])
+        return _cache
+
+
+def _build_preview(outlet_code, start_date, end_date, user_role):
+    generator = ExcelReportGenerator(
+        outlet_code=outlet_code,
+        start_date=start_date,
+        end_date=end_date,
+        user_role=user_role,
+        streaming=False,
+    )
+    return generator.generate_daily_preview(window_days=PREVIEW_WINDOW_DAYS)
+
+
+def get_daily_preview(outlet_code: str, start_date, end_date, user_role, page: int | None = None):
+    """
+    Returns (preview, cache status). The whole range is built once, split into
+    PREVIEW_WINDOW_DAYS windows, and cached until the outlet's data version
+    changes; ``page`` (1-based) selects one window from that build. Requests
+    for a range that another worker is already building wait for that build.
+    """
+    cache = get_preview_cache()
+    cache_key = build_cache_key(
+        outlet_code, start_date, end_date, user_role,
+        get_data_version(outlet_code, start_date, end_date),
+    )
+    preview = cache.get(cache_key)
+    cache_status = 'HIT'
+    if preview is None:
+        built = {}
+
+        def build():
+            built['preview'] = _build_preview(outlet_code, start_date, end_date, user_role)
+            try:
+                cache.put(cache_key, built['preview'])
+            except OSError as e:
+                print(f"Warning: failed to store daily preview for {outlet_code}: {e}")
+            return None, {}
+
+        _, _, flight = coalesce(f"preview:{cache_key}", build)
+        preview = built.get('preview') or cache.get(cache_key)
+        if preview is None:
+            # The build we waited for could not be stored
+            claim_run_slot()
+            preview = _build_preview(outlet_code, start_date, end_date, user_role)
+        cache_status = SHARED if flight == SHARED else 'MISS'
+
+    sheet = preview['sheet']
+    if page is None:
+        return {
+            'outlet': preview['outlet'],
+            'period': preview['period'],
+            'sheet': {key: value for key, value in sheet.items() if key != 'windows'},
+        }, cache_status
+
+    windows = sheet['windows']
+    if not 1 <= page <= len(windows):
+        raise IndexError(f"page must be between 1 and {len(windows)}")
+    window = windows[page - 1]
+    return {
+        'outlet': preview['outlet'],
+        'period': preview['period'],
+        'page': page,
+        'page_count': len(windows),
+        'window': {'start_date': window['start_date'], 'end_date': window['end_date']},
+        'sheet': {
+            'key': sheet['key'],
+            'title': sheet['title'],
+            'columns': sheet['columns'],
+            'rows': sheet['rows'][window['row_offset']:window['row_offset'] + window['row_count']],
+            'totals': window['totals'],
+            'range_totals': sheet['totals'],
+        },
+    }, cache_status
@@ -1,10 +1,10 @@
 from app.services.excel_export.base_sheet import BaseSheet
 from app.services.excel_export import mpr_calculations as mpr_calc
 from app.services.excel_export.utils.excel_utils import (
-    HEADER_FONT, YELLOW_FILL, CENTER_ALIGN, GOJEK_FILL, GRAB_FILL, SHOPEE_FILL,GREY_FILL,
-    TIKTOK_FILL, BLUE_FILL, DIFFERENCE_FILL, THIN_BORDER, auto_fit_columns, LEFT_ALIGN, RIGHT_ALIGN,
-    CLOSED_OFF_FILL
+    YELLOW_FILL, GOJEK_FILL, GRAB_FILL, SHOPEE_FILL, GREY_FILL,
+    TIKTOK_FILL, BLUE_FILL, DIFFERENCE_FILL, THIN_BORDER, CLOSED_OFF_FILL
 )
+from app.services.excel_export.utils.sheet_writer import SheetWriter
 from app.models.mpr_mapping import MprMapping
 from app.models.outlet import Outlet
 from app.services.closing_platforms import is_platform_disabled, platform_for_header
@@ -21,6 +21,7 @@ class ClosingSheet(BaseSheet):
 
     def __init__(self, workbook, data):
         super().__init__(workbook, 'Closing Sheet', data)
+        self.writer = SheetWriter(self.ws)
         self.main_table_col_end = None
         self.grand_total_col_start = None
         self.grand_total_col_end = None
@@ -42,7 +43,7 @@ class ClosingSheet(BaseSheet):
         self._write_store_id_table()
         self._write_rekening_table()
         self._apply_styles()
-        auto_fit_columns(self.ws)
+        self.writer.fit_columns()
 
     def _write_main_table(self):
         outlet = self.data['outlet']
@@ -50,52 +51,41 @@ class ClosingSheet(BaseSheet):
         platform_definitions = self._get_main_table_platforms()
 
         # Header
-        self.ws['A1'] = outlet.outlet_name_gojek
-        self.ws['A1'].alignment = CENTER_ALIGN
-        self.ws['A1'].font = HEADER_FONT
+        self.writer.write(1, 1, outlet.outlet_name_gojek, 'header_center')
 
         closing_row = 3
         self._write_main_table_group_headers(closing_row - 1, platform_definitions)
 
         # Merged 'Tanggal' header
         self.ws.merge_cells(start_row=closing_row, start_column=1, end_row=closing_row + 1, end_column=1)
-        tanggal_cell = self.ws.cell(row=closing_row, column=1)
-        tanggal_cell.value = 'Tanggal'
-        tanggal_cell.font = HEADER_FONT
-        tanggal_cell.alignment = CENTER_ALIGN
+        self.writer.write(closing_row, 1, 'Tanggal', 'header_center')
 
         # Platform totals in the first row of the header
         for col, (name, header, report_type) in enumerate(platform_definitions, 2):
-            cell = self.ws.cell(row=closing_row, column=col)
             value = self._get_platform_grand_total_with_fallback(report_type, header)
-            cell.value = value
-            cell.font = HEADER_FONT
-            cell.alignment = RIGHT_ALIGN
-            cell.number_format = '#,##0'
-            cell.fill = CLOSED_OFF_FILL if self._is_closing_platform_disabled(header, report_type) else YELLOW_FILL
+            fill = CLOSED_OFF_FILL if self._is_closing_platform_disabled(header, report_type) else YELLOW_FILL
+            self.writer.write(closing_row, col, value, 'header_amount', fill=fill)
 
         # Platform names in the second row of the header
         for col, (name, header, report_type) in enumerate(platform_definitions, 2):
-            cell = self.ws.cell(row=closing_row + 1, column=col)
-            cell.value = name
-            cell.font = HEADER_FONT
-            cell.alignment = CENTER_ALIGN
+            fill = None
             if self._is_closing_platform_disabled(header, report_type):
-                cell.fill = CLOSED_OFF_FILL
+                fill = CLOSED_OFF_FILL
             elif name in ['Gojek', 'Gojek (ac)', 'Gojek MPR (ac)']:
-                cell.fill = GOJEK_FILL
+                fill = GOJEK_FILL
             elif name in ['Grab', 'Grab Net', 'Grab (ac)', 'Grab MPR (ac)', 'Grab(OVO)']:
-                cell.fill = GRAB_FILL
+                fill = GRAB_FILL
             elif name in [
                 'ShopeeFood', 'ShopeeFood (ac)', 'ShopeePay', 'ShopeePay (ac)',
                 'Shopee MPR (ac)', 'ShopeePay MPR (ac)'
             ]:
-                cell.fill = SHOPEE_FILL
+                fill = SHOPEE_FILL
             elif name in [
                 'Tiktok', 'Tiktok (ac)', 'Tiktok MPR (ac)',
                 'Qpon', 'Qpon (ac)', 'Qpon MPR (ac)', 'Webshop', 'Webshop (ac)'
             ]:
-                cell.fill = TIKTOK_FILL
+                fill = TIKTOK_FILL
+            self.writer.write(closing_row + 1, col, name, 'header_center', fill=fill)
 
         closing_row += 2
 
@@ -106,13 +96,8 @@ class ClosingSheet(BaseSheet):
                 value = self._get_platform_daily_value_with_fallback(report_type, date, header)
                 row_data.append(value)
 
-            for col, value in enumerate(row_data, 1):
-                cell = self.ws.cell(row=closing_row, column=col, value=value)
-                cell.alignment = RIGHT_ALIGN
-                if col == 1:
-                    cell.number_format = 'yyyy-mm-dd'
-                else:
-                    cell.number_format = '#,##0'
+            self.writer.write(closing_row, 1, row_data[0], 'date')
+            self.writer.write_row(closing_row, row_data[1:], start_column=2, style='amount')
             closing_row += 1
 
         self.main_table_col_end = len(platform_definitions) + 1
@@ -141,10 +126,7 @@ class ClosingSheet(BaseSheet):
 
         label = 'MP78 (ac)' if report_type == 'main' else 'MPR (ac)'
         self.ws.merge_cells(start_row=row, start_column=start_col, end_row=row, end_column=end_col)
-        cell = self.ws.cell(row=row, column=start_col, value=label)
-        cell.font = HEADER_FONT
-        cell.alignment = CENTER_ALIGN
-        cell.fill = BLUE_FILL
+        self.writer.write(row, start_col, label, 'header_center', fill=BLUE_FILL)
 
     def _get_grand_total_with_fallback(self, header):
         grand_totals = self.data['grand_totals']
@@ -252,12 +234,14 @@ class ClosingSheet(BaseSheet):
         self.grand_total_col_end = col_start + 3
         self.grand_total_row_start = row_start
 
-        self.ws.cell(row=row_start, column=col_start, value=outlet.outlet_name_gojek).font = HEADER_FONT
-        self.ws.cell(row=row_start, column=col_start).alignment = CENTER_ALIGN
-        self.ws.cell(row=row_start, column=col_start).fill = BLUE_FILL
-        self.ws.cell(row=row_start + 1, column=col_start, value=f'{start_date.strftime("%Y-%m-%d")} to {end_date.strftime("%Y-%m-%d")}').font = HEADER_FONT
-        self.ws.cell(row=row_start + 1, column=col_start).alignment = CENTER_ALIGN
-        self.ws.cell(row=row_start + 1, column=col_start).fill = BLUE_FILL
+        self.writer.write(row_start, col_start, outlet.outlet_name_gojek, 'header_center', fill=BLUE_FILL)
+        self.writer.write(
+            row_start + 1,
+            col_start,
+            f'{start_date.strftime("%Y-%m-%d")} to {end_date.strftime("%Y-%m-%d")}',
+            'header_center',
+            fill=BLUE_FILL,
+        )
 
         grab_net_total = self._get_grand_total_with_fallback('Grab_Net') or 0
         grab_management_expense = self._get_grab_management_commission_expense(grab_net_total)
@@ -281,66 +265,40 @@ class ClosingSheet(BaseSheet):
             mp78_income_total +
             self._get_grand_total_with_fallback('UV')
         )
-        self.ws.cell(row=row_start + 1, column=col_start + 1, value=total_income).font = HEADER_FONT
-        self.ws.cell(row=row_start + 1, column=col_start + 1).alignment = RIGHT_ALIGN
-        self.ws.cell(row=row_start + 1, column=col_start + 1).number_format = '#,##0'
-        self.ws.cell(row=row_start + 1, column=col_start + 1).fill = GRAB_FILL
-        self.ws.cell(row=row_start, column=col_start + 1).fill = GRAB_FILL
+        self.writer.write(row_start + 1, col_start + 1, total_income, 'header_amount', fill=GRAB_FILL)
+        self.writer.style(row_start, col_start + 1, fill=GRAB_FILL)
 
         total_expense = (
             sum(float(entry.amount) for entry, _, _ in manual_entries if entry.entry_type == 'expense') +
             mp78_expense_total +
             grab_management_expense
         )
-        self.ws.cell(row=row_start + 1, column=col_start + 2, value=total_expense).font = HEADER_FONT
-        self.ws.cell(row=row_start + 1, column=col_start + 2).alignment = RIGHT_ALIGN
-        self.ws.cell(row=row_start + 1, column=col_start + 2).number_format = '#,##0'
-        self.ws.cell(row=row_start + 1, column=col_start + 2).fill = DIFFERENCE_FILL
-        self.ws.cell(row=row_start, column=col_start + 2).fill = DIFFERENCE_FILL
+        self.writer.write(row_start + 1, col_start + 2, total_expense, 'header_amount', fill=DIFFERENCE_FILL)
+        self.writer.style(row_start, col_start + 2, fill=DIFFERENCE_FILL)
 
         total_all = total_income - total_expense
-        self.ws.cell(row=row_start + 1, column=col_start + 3, value=total_all).font = HEADER_FONT
-        self.ws.cell(row=row_start + 1, column=col_start + 3).alignment = RIGHT_ALIGN
-        self.ws.cell(row=row_start + 1, column=col_start + 3).number_format = '#,##0'
-        self.ws.cell(row=row_start + 1, column=col_start + 3).fill = GREY_FILL
-        self.ws.cell(row=row_start, column=col_start + 3).fill = GREY_FILL
+        self.writer.write(row_start + 1, col_start + 3, total_all, 'header_amount', fill=GREY_FILL)
+        self.writer.style(row_start, col_start + 3, fill=GREY_FILL)
 
         final_i = 0
         for platform_label, header, _ in platform_definitions:
             label_row = row_start + 1 + final_i + 1
             platform_label = self._get_closing_grand_total_platform_label(platform_label, header)
             platform_disabled = self._is_closing_platform_disabled(header, 'main')
-            label_cell = self.ws.cell(row=label_row, column=col_start, value=platform_label)
-            label_cell.alignment = LEFT_ALIGN
-            label_cell.font = HEADER_FONT
-            if platform_disabled:
-                label_cell.fill = CLOSED_OFF_FILL
-            value_cell = self.ws.cell(
-                row=label_row,
-                column=col_start + 1,
-                value=None if platform_disabled else self._get_closing_grand_total_income_value(header, grab_net_total)
+            disabled_fill = CLOSED_OFF_FILL if platform_disabled else None
+            self.writer.write(label_row, col_start, platform_label, 'header_left', fill=disabled_fill)
+            self.writer.write(
+                label_row,
+                col_start + 1,
+                None if platform_disabled else self._get_closing_grand_total_income_value(header, grab_net_total),
+                'amount',
+                fill=disabled_fill,
             )
-            value_cell.number_format = '#,##0'
-            value_cell.alignment = RIGHT_ALIGN
-            if platform_disabled:
-                value_cell.fill = CLOSED_OFF_FILL
             final_i += 1
             if header == 'Grab_Net':
                 grab_mgmt_row = label_row + 1
-                management_label_cell = self.ws.cell(
-                    row=grab_mgmt_row,
-                    column=col_start,
-                    value=self._get_grab_management_commission_label()
-                )
-                management_label_cell.alignment = LEFT_ALIGN
-                management_label_cell.font = HEADER_FONT
-                management_cell_value = self.ws.cell(
-                    row=grab_mgmt_row,
-                    column=col_start + 2,
-                    value=grab_management_expense
-                )
-                management_cell_value.number_format = '#,##0'
-                management_cell_value.alignment = RIGHT_ALIGN
+                self.writer.write(grab_mgmt_row, col_start, self._get_grab_management_commission_label(), 'header_left')
+                self.writer.write(grab_mgmt_row, col_start + 2, grab_management_expense, 'amount')
                 final_i += 1
 
         mpr_rows = [
@@ -359,20 +317,15 @@ class ClosingSheet(BaseSheet):
 
             label_row = row_start + 1 + final_i + 1
             platform_disabled = self._is_closing_platform_disabled(header, 'mpr')
-            label_cell = self.ws.cell(row=label_row, column=col_start, value=label)
-            label_cell.alignment = LEFT_ALIGN
-            label_cell.font = HEADER_FONT
-            if platform_disabled:
-                label_cell.fill = CLOSED_OFF_FILL
-            value_cell = self.ws.cell(
-                row=label_row,
-                column=col_start + 1,
-                value=None if platform_disabled else mpr_value,
+            disabled_fill = CLOSED_OFF_FILL if platform_disabled else None
+            self.writer.write(label_row, col_start, label, 'header_left', fill=disabled_fill)
+            self.writer.write(
+                label_row,
+                col_start + 1,
+                None if platform_disabled else mpr_value,
+                'amount',
+                fill=disabled_fill,
             )
-            value_cell.number_format = '#,##0'
-            value_cell.alignment = RIGHT_ALIGN
-            if platform_disabled:
-                value_cell.fill = CLOSED_OFF_FILL
             final_i += 1
 
         MONTH_MAP = {
@@ -421,11 +374,8 @@ class ClosingSheet(BaseSheet):
                 amount = float(mutation.transaction_amount or 0)
                 amount_col = col_start + 2 if self._is_mp78_expense_mutation(mutation) else col_start + 1
 
-            self.ws.cell(row=row, column=col_start, value=desc_text).alignment = LEFT_ALIGN
-            self.ws.cell(row=row, column=col_start, value=desc_text).font = HEADER_FONT
-            cell = self.ws.cell(row=row, column=amount_col, value=amount)
-            cell.number_format = '#,##0'
-            cell.alignment = RIGHT_ALIGN
+            self.writer.write(row, col_start, desc_text, 'header_left')
+            self.writer.write(row, amount_col, amount, 'amount')
 
     def _is_mp78_expense_mutation(self, mutation):
         return (getattr(mutation, 'transaction_type', '') or '').upper() == 'DB'
@@ -476,24 +426,12 @@ class ClosingSheet(BaseSheet):
             (start_column + 1, 'Store ID'),
         ]
         for column, value in header_cells:
-            cell = self.ws.cell(row=row, column=column, value=value)
-            cell.font = HEADER_FONT
-            cell.alignment = CENTER_ALIGN
-            cell.fill = BLUE_FILL
+            self.writer.write(row, column, value, 'header_center', fill=BLUE_FILL)
 
         for offset, (label, value, fill) in enumerate(store_id_rows, start=1):
             data_row = row + offset
             self.ws.row_dimensions[data_row].height = 18
-
-            label_cell = self.ws.cell(row=data_row, column=start_column, value=label)
-            label_cell.font = HEADER_FONT
-            label_cell.alignment = CENTER_ALIGN
-            label_cell.fill = fill
-
-            value_cell = self.ws.cell(row=data_row, column=start_column + 1, value=value or "-")
-            value_cell.font = HEADER_FONT
-            value_cell.alignment = CENTER_ALIGN
-            value_cell.fill = fill
+            self.writer.write_row(data_row, [label, value or "-"], start_column, 'header_center', fill=fill)
 
     def _write_rekening_table(self):
         outlet = self.data['outlet']
@@ -528,33 +466,18 @@ class ClosingSheet(BaseSheet):
             (start_column + 2, 'Rekening'),
         ]
         for column, value in header_cells:
-            cell = self.ws.cell(row=row, column=column, value=value)
-            cell.font = HEADER_FONT
-            cell.alignment = CENTER_ALIGN
-            cell.fill = BLUE_FILL
+            self.writer.write(row, column, value, 'header_center', fill=BLUE_FILL)
 
         for offset, rekening_info in enumerate(rekening_rows, start=1):
             data_row = row + offset
             self.ws.row_dimensions[data_row].height = 18
-
-            label_cell = self.ws.cell(row=data_row, column=start_column, value=rekening_info.outlet_label)
-            label_cell.font = HEADER_FONT
-            label_cell.alignment = CENTER_ALIGN
-            label_cell.fill = GREY_FILL
-
-            platform_cell = self.ws.cell(row=data_row, column=start_column + 1, value=rekening_info.platform_name)
-            platform_cell.font = HEADER_FONT
-            platform_cell.alignment = CENTER_ALIGN
-            platform_cell.fill = GREY_FILL
-
-            value_cell = self.ws.cell(
-                row=data_row,
-                column=start_column + 2,
-                value=rekening_info.display_value,
+            self.writer.write_row(
+                data_row,
+                [rekening_info.outlet_label, rekening_info.platform_name, rekening_info.display_value],
+                start_column,
+                'header_center',
+                fill=GREY_FILL,
             )
-            value_cell.font = HEADER_FONT
-            value_cell.alignment = CENTER_ALIGN
-            value_cell.fill = GREY_FILL
 
     def _get_mapped_mpr_outlet(self):
         if not self._is_mp78_brand():
@@ -2,6 +2,7 @@ from openpyxl.styles import PatternFill
 from openpyxl.utils import get_column_letter
 from app.services.excel_export.base_sheet import BaseSheet
 from app.services.excel_export import mpr_calculations as mpr_calc
+from app.services.excel_export.data_service import calculate_grand_totals
 from app.services.excel_export.utils.excel_utils import (
     HEADER_FONT, YELLOW_FILL, CENTER_ALIGN, GOJEK_FILL, GRAB_FILL, SHOPEE_FILL,
     SHOPEEPAY_FILL, TIKTOK_FILL, CASH_FILL, DATE_FILL, DIFFERENCE_FILL,
@@ -10,6 +11,7 @@ from app.services.excel_export.utils.excel_utils import (
 
 class DailySheet(BaseSheet):
     MPR_COMMISSION_RATE = 0.08
+    FLUSH_EVERY_ROWS = 100
     MP78_MANAGEMENT_AC_HEADERS = {
         'Gojek Net (ac)',
         'Grab Net (ac)',
@@ -38,9 +40,11 @@ class DailySheet(BaseSheet):
     def generate(self):
         self._write_title()
         self._write_headers()
+        # Widths only depend on the header count and must be known before
+        # the first row is streamed.
+        self._set_column_widths()
         self._write_data()
         self._write_grand_total()
-        self._set_column_widths()
 
     def _write_title(self):
         self.ws['A1'] = 'Sales Report'
@@ -293,6 +297,8 @@ class DailySheet(BaseSheet):
                             cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')  # Light green
                         elif value < 0:
                             cell.fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')  # Light red
+            if current_row % self.FLUSH_EVERY_ROWS == 0:
+                self.flush_rows(current_row)
             current_row += 1
 
     def _write_grand_total(self):
@@ -394,7 +400,12 @@ class DailySheet(BaseSheet):
             'Minusan (Mutasi)': lambda: sum(minusan_by_date.get(date, 0) for date in all_dates),
         }
 
-    def build_preview(self):
+    def build_preview(self, window_days=None):
+        """
+        Serializes the Daily sheet. With ``window_days`` the dates are also
+        split into consecutive windows, each with its own totals, so a long
+        range can be served page by page from one build.
+        """
         headers = self._get_headers()
         daily_value_map = self._get_daily_value_map()
         rows = []
@@ -408,25 +419,44 @@ class DailySheet(BaseSheet):
                 for header in headers
             ])
 
+        preview = {
+            'key': 'daily',
+            'title': self.sheet_name,
+            'columns': headers,
+            'rows': rows,
+            'totals': self._build_preview_totals(headers, self.data['grand_totals'], self.data['all_dates']),
+        }
+
+        if window_days:
+            all_dates = self.data['all_dates']
+            preview['windows'] = []
+            for offset in range(0, len(all_dates), window_days):
+                window_dates = all_dates[offset:offset + window_days]
+                window_totals = calculate_grand_totals(
+                    {date: self.data['daily_totals'][date] for date in window_dates}
+                )
+                preview['windows'].append({
+                    'start_date': window_dates[0].isoformat(),
+                    'end_date': window_dates[-1].isoformat(),
+                    'row_offset': offset,
+                    'row_count': len(window_dates),
+                    'totals': self._build_preview_totals(headers, window_totals, window_dates),
+                })
+
+        return preview
+
+    def _build_preview_totals(self, headers, grand_totals, dates):
         grand_total_map = self._get_grand_total_value_map(
-            self.data['grand_totals'],
-            self.data['all_dates'],
+            grand_totals,
+            dates,
             self.data['minusan_by_date'],
         )
-        totals = {
+        return {
             header: self._serialize_preview_value(grand_total_map[header]())
             for header in headers
             if header in grand_total_map
         }
 
-        return {
-            'key': 'daily',
-            'title': self.sheet_name,
-            'columns': headers,
-            'rows': rows,
-            'totals': totals,
-        }
-
     def _serialize_preview_value(self, value):
         if hasattr(value, 'isoformat'):
             return value.isoformat()
@@ -1,15 +1,17 @@
 from app.services.excel_export.base_sheet import BaseSheet
 from app.services.excel_export.utils.excel_utils import (
-    HEADER_FONT, YELLOW_FILL, CENTER_ALIGN, THIN_BORDER, auto_fit_columns, RIGHT_ALIGN,
+    YELLOW_FILL, CENTER_ALIGN, THIN_BORDER, RIGHT_ALIGN,
     CASH_FILL, GOJEK_FILL, GRAB_FILL, SHOPEE_FILL, TIKTOK_FILL, DATA_FILL, LIGHT_BLUE_FILL,
     BLUE_FILL, GREY_FILL
 )
+from app.services.excel_export.utils.sheet_writer import SheetWriter
 from app.services.rekening_info_service import OutletRekeningInfo, RekeningInfoService
 from datetime import timedelta
 
 class PukisClosingSheet(BaseSheet):
     def __init__(self, workbook, data):
         super().__init__(workbook, 'Pukis Closing Sheet', data)
+        self.writer = SheetWriter(self.ws)
         self.rekening_col_start = None
         self.rekening_col_end = None
         self.rekening_row = None
@@ -21,34 +23,28 @@ class PukisClosingSheet(BaseSheet):
         self._write_expenses_table()
         self._apply_styles()
         self._write_rekening_table()
-        auto_fit_columns(self.ws)
+        self.writer.fit_columns()
 
     def _write_header(self):
         outlet = self.data['outlet']
         start_date = self.data['start_date']
         end_date = self.data['end_date']
 
-        self.ws['A1'] = outlet.outlet_name_gojek
+        self.writer.write(1, 1, outlet.outlet_name_gojek, 'header_center')
         self.ws.merge_cells('A1:R1')
-        self.ws['A1'].alignment = CENTER_ALIGN
-        self.ws['A1'].font = HEADER_FONT
 
-        self.ws['A2'] = f"PERIODE {start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}"
+        self.writer.write(2, 1, f"PERIODE {start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}", 'header_center')
         self.ws.merge_cells('A2:R2')
-        self.ws['A2'].alignment = CENTER_ALIGN
-        self.ws['A2'].font = HEADER_FONT
 
         header1 = ["TANGGAL", "PENERIMAAN", None, None, None, None, None, None, None, "PUKIS JUMBO TERJUAL", "PUKIS KLASIK TERJUAL", "PUKIS FREE", "PUKIS SISA", "TGL TF REK BARU", "NOMINAL TF", "SELISIH", "KETERANGAN", "NOTE"]
-        self.ws.append(header1)
+        self.writer.append(header1)
         self.ws.merge_cells(start_row=4, start_column=2, end_row=4, end_column=9)
 
         header2 = [None, "CASH", "GOJEK", "GRAB", "SHOPEE FOOD", "TIKTOK", "QPON", "WEBSHOP", "TRF"]
-        self.ws.append(header2)
+        self.writer.append(header2)
         header2_row = self.ws.max_row
-        for cell in self.ws[3]:
-            cell.font = HEADER_FONT
-            cell.alignment = CENTER_ALIGN
-            cell.fill = YELLOW_FILL
+        for column in range(1, self.ws.max_column + 1):
+            self.writer.style(3, column, 'header_center', fill=YELLOW_FILL)
 
         header2_fills = {
             "CASH": CASH_FILL,
@@ -60,11 +56,8 @@ class PukisClosingSheet(BaseSheet):
             "WEBSHOP": TIKTOK_FILL,
         }
 
-        for col in range(1, len(header2) + 1):
-            cell = self.ws.cell(row=header2_row, column=col)
-            cell.font = HEADER_FONT
-            cell.alignment = CENTER_ALIGN
-            cell.fill = header2_fills.get(cell.value, DATA_FILL)
+        for col, value in enumerate(header2, 1):
+            self.writer.style(header2_row, col, 'header_center', fill=header2_fills.get(value, DATA_FILL))
 
     def _write_data(self):
         all_dates = self.data['all_dates']
@@ -120,7 +113,7 @@ class PukisClosingSheet(BaseSheet):
                 None,
                 None
             ]
-            self.ws.append(row_data)
+            self.writer.append(row_data)
         self.daily_rows_end = self.ws.max_row
 
         # Add total row
@@ -156,10 +149,10 @@ class PukisClosingSheet(BaseSheet):
             total_sisa,
             None, None, None, None, None
         ]
-        self.ws.append(total_row)
+        self.writer.append(total_row)
 
         for i in range(1, 10):
-            self.ws.cell(row=self.ws.max_row, column=i).font = HEADER_FONT
+            self.writer.style(self.ws.max_row, i, 'header')
         
         # self.ws.append(total_row)
         # self.ws.append(["GRAND TOTAL", None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None])
@@ -185,13 +178,8 @@ class PukisClosingSheet(BaseSheet):
 
         # Header
         # Merging A and B for the main title, then C for the value title
-        header_a = self.ws.cell(row=start_row, column=1, value='PENGELUARAN')
-        header_a.font = HEADER_FONT
-        header_a.fill = YELLOW_FILL
-        header_a.alignment = CENTER_ALIGN
-
-        header_b = self.ws.cell(row=start_row, column=2)
-        header_b.fill = YELLOW_FILL # Also fill the second cell to make the merge seamless
+        self.writer.write(start_row, 1, 'PENGELUARAN', 'header_center', fill=YELLOW_FILL)
+        self.writer.style(start_row, 2, fill=YELLOW_FILL) # Also fill the second cell to make the merge seamless
 
         self.ws.merge_cells(start_row=start_row, start_column=1, end_row=start_row, end_column=2)
 
@@ -203,10 +191,7 @@ class PukisClosingSheet(BaseSheet):
 
         # Sub-header for categories
         sub_header_row = start_row + 1
-        keterangan_header = self.ws.cell(row=sub_header_row, column=2, value='KETERANGAN')
-        keterangan_header.font = HEADER_FONT
-        keterangan_header.fill = YELLOW_FILL
-        keterangan_header.alignment = CENTER_ALIGN
+        self.writer.write(sub_header_row, 2, 'KETERANGAN', 'header_center', fill=YELLOW_FILL)
 
         # Data
         current_row = sub_header_row + 1
@@ -224,29 +209,21 @@ class PukisClosingSheet(BaseSheet):
         sorted_expenses = sorted(expenses_to_sort, key=lambda item: category_order.index(item[0]) if item[0] in category_order else len(category_order))
 
         for category, amount in sorted_expenses:
-            self.ws.cell(row=current_row, column=2).value = category
-            amount_cell = self.ws.cell(row=current_row, column=3)
-            amount_cell.value = amount
-            amount_cell.number_format = '#,##0'
-            amount_cell.alignment = RIGHT_ALIGN
+            self.writer.write(current_row, 2, category)
+            self.writer.write(current_row, 3, amount, 'amount')
             total_expenses += amount
             current_row += 1
 
         # Footer
         footer_row_val = 'TOTAL'
-        footer_cell_a = self.ws.cell(row=current_row, column=1, value=footer_row_val)
-        footer_cell_a.font = HEADER_FONT
+        self.writer.write(current_row, 1, footer_row_val, 'header')
         # footer_cell_a.fill = LIGHT_BLUE_FILL
-        footer_cell_b = self.ws.cell(row=current_row, column=2) # Empty cell for merging
+        self.ws.cell(row=current_row, column=2) # Empty cell for merging
         # footer_cell_b.fill = LIGHT_BLUE_FILL
 
         self.ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=2)
 
-        total_cell = self.ws.cell(row=current_row, column=3)
-        total_cell.value = total_expenses
-        total_cell.number_format = '#,##0'
-        total_cell.alignment = RIGHT_ALIGN
-        total_cell.font = HEADER_FONT
+        self.writer.write(current_row, 3, total_expenses, 'header_amount')
         # total_cell.fill = LIGHT_BLUE_FILL
 
         # Apply borders to the new table
@@ -282,33 +259,18 @@ class PukisClosingSheet(BaseSheet):
             (start_column + 2, 'Rekening'),
         ]
         for column, value in header_cells:
-            cell = self.ws.cell(row=row, column=column, value=value)
-            cell.font = HEADER_FONT
-            cell.alignment = CENTER_ALIGN
-            cell.fill = BLUE_FILL
+            self.writer.write(row, column, value, 'header_center', fill=BLUE_FILL)
 
         for offset, rekening_info in enumerate(rekening_rows, start=1):
             data_row = row + offset
             self.ws.row_dimensions[data_row].height = 18
-
-            label_cell = self.ws.cell(row=data_row, column=start_column, value=rekening_info.outlet_label)
-            label_cell.font = HEADER_FONT
-            label_cell.alignment = CENTER_ALIGN
-            label_cell.fill = GREY_FILL
-
-            platform_cell = self.ws.cell(row=data_row, column=start_column + 1, value=rekening_info.platform_name)
-            platform_cell.font = HEADER_FONT
-            platform_cell.alignment = CENTER_ALIGN
-            platform_cell.fill = GREY_FILL
-
-            value_cell = self.ws.cell(
-                row=data_row,
-                column=start_column + 2,
-                value=rekening_info.display_value,
+            self.writer.write_row(
+                data_row,
+                [rekening_info.outlet_label, rekening_info.platform_name, rekening_info.display_value],
+                start_column,
+                'header_center',
+                fill=GREY_FILL,
             )
-            value_cell.font = HEADER_FONT
-            value_cell.alignment = CENTER_ALIGN
-            value_cell.fill = GREY_FILL
 
         for row_cells in self.ws.iter_rows(
             min_row=self.rekening_row,
@@ -1,14 +1,16 @@
 from app.services.excel_export.base_sheet import BaseSheet
 from app.services.excel_export.utils.excel_utils import (
     HEADER_FONT, BOLD_RED_FONT, YELLOW_FILL, GRAB_FILL, CASH_FILL, SHOPEE_FILL,
-    COMMISSION_FILL, auto_fit_columns
+    COMMISSION_FILL
 )
+from app.services.excel_export.utils.sheet_writer import SheetWriter
 from datetime import datetime
 import re
 
 class SummarySheet(BaseSheet):
     def __init__(self, workbook, data):
         super().__init__(workbook, 'Summary', data)
+        self.writer = SheetWriter(self.ws)
 
     def generate(self):
         self._write_title()
@@ -17,28 +19,22 @@ class SummarySheet(BaseSheet):
         self._write_grand_total_net_income()
         if self.data['outlet'].brand in ["MP78", "MP78 Express", "Martabak 777 Sinar Bulan", "Martabak 999 Asli Bandung", "Martabak Surya Kencana", "Martabak Akim"]:
             self._write_commission_summary()
-        auto_fit_columns(self.ws)
+        self.writer.fit_columns()
 
     def _write_title(self):
-        self.ws['A1'] = 'Summary Report'
-        self.ws['A2'] = 'Period:'
-        self.ws['B2'] = f"{self.data['start_date'].strftime('%Y-%m-%d')} to {self.data['end_date'].strftime('%Y-%m-%d')}"
-        self.ws['A3'] = 'Outlet:'
-        self.ws['B3'] = self.data['outlet'].outlet_name_gojek
+        self.writer.write(1, 1, 'Summary Report')
+        self.writer.write(2, 1, 'Period:')
+        self.writer.write(2, 2, f"{self.data['start_date'].strftime('%Y-%m-%d')} to {self.data['end_date'].strftime('%Y-%m-%d')}")
+        self.writer.write(3, 1, 'Outlet:')
+        self.writer.write(3, 2, self.data['outlet'].outlet_name_gojek)
 
     def _write_online_platform_summary(self):
         current_row = 5
-        summary_title_cell = self.ws.cell(row=current_row, column=1, value='Online Platform Summary')
-        summary_title_cell.font = HEADER_FONT
-        summary_title_cell.fill = GRAB_FILL
+        self.writer.write(current_row, 1, 'Online Platform Summary', 'header', fill=GRAB_FILL)
         current_row += 1
 
         platform_headers = ['Platform', 'Gross', 'Net', 'Difference']
-        for col, header in enumerate(platform_headers, 1):
-            cell = self.ws.cell(row=current_row, column=col)
-            cell.value = header
-            cell.font = HEADER_FONT
-            cell.fill = GRAB_FILL
+        self.writer.write_row(current_row, platform_headers, style='header', fill=GRAB_FILL)
         current_row += 1
 
         grand_totals = self.data['grand_totals']
@@ -60,28 +56,18 @@ class SummarySheet(BaseSheet):
 
         for platform, gross, net in platforms:
             difference = gross - net if net is not None else 0
-            row_data = [platform, gross, net, difference]
-            for col, value in enumerate(row_data, 1):
-                cell = self.ws.cell(row=current_row, column=col, value=value)
-                cell.fill = GRAB_FILL
-                if col > 1:
-                    cell.number_format = '#,##0'
+            self.writer.write(current_row, 1, platform, fill=GRAB_FILL)
+            self.writer.write_row(current_row, [gross, net, difference], start_column=2, style='number', fill=GRAB_FILL)
             current_row += 1
-        self.ws.cell(row=current_row, column=1, value='') # Add spacing
+        self.writer.write(current_row, 1, '') # Add spacing
 
     def _write_income_expense_summary(self):
         current_row = self.ws.max_row + 2
-        summary_title_cell = self.ws.cell(row=current_row, column=1, value='Income/Expense Summary')
-        summary_title_cell.font = HEADER_FONT
-        summary_title_cell.fill = CASH_FILL
+        self.writer.write(current_row, 1, 'Income/Expense Summary', 'header', fill=CASH_FILL)
         current_row += 1
 
         expense_headers = ['Category', 'Income', 'Expense', 'Net Total', 'Description', 'Date Range']
-        for col, header in enumerate(expense_headers, 1):
-            cell = self.ws.cell(row=current_row, column=col)
-            cell.value = header
-            cell.font = HEADER_FONT
-            cell.fill = CASH_FILL
+        self.writer.write_row(current_row, expense_headers, style='header', fill=CASH_FILL)
         current_row += 1
 
         grand_totals = self.data['grand_totals']
@@ -89,11 +75,7 @@ class SummarySheet(BaseSheet):
 
         cash_net_total = grand_totals['Cash_Income'] - grand_totals['Cash_Expense']
         cash_row = ['Cash', grand_totals['Cash_Income'], grand_totals['Cash_Expense'], cash_net_total, '', '']
-        for col, value in enumerate(cash_row, 1):
-            cell = self.ws.cell(row=current_row, column=col, value=value)
-            cell.fill = CASH_FILL
-            if 1 < col <= 4:
-                cell.number_format = '#,##0'
+        self._write_income_expense_row(current_row, cash_row)
         current_row += 1
 
         # Sort manual entries
@@ -133,11 +115,7 @@ class SummarySheet(BaseSheet):
                 category_name, income_amount, expense_amount, net_amount,
                 entry.description, f"{entry.start_date} - {entry.end_date}"
             ]
-            for col, value in enumerate(row_data, 1):
-                cell = self.ws.cell(row=current_row, column=col, value=value)
-                cell.fill = CASH_FILL
-                if 1 < col <= 4:
-                    cell.number_format = '#,##0'
+            self._write_income_expense_row(current_row, row_data)
             current_row += 1
 
         total_net = (grand_totals['Cash_Income'] + manual_income) - (grand_totals['Cash_Expense'] + manual_expense)
@@ -145,12 +123,13 @@ class SummarySheet(BaseSheet):
             'Total', grand_totals['Cash_Income'] + manual_income,
             grand_totals['Cash_Expense'] + manual_expense, total_net, '', ''
         ]
-        for col, value in enumerate(total_row, 1):
-            cell = self.ws.cell(row=current_row, column=col, value=value)
-            cell.font = HEADER_FONT
-            cell.fill = CASH_FILL
-            if 1 < col <= 4:
-                cell.number_format = '#,##0'
+        self._write_income_expense_row(current_row, total_row, font=HEADER_FONT)
+
+    def _write_income_expense_row(self, row, values, font=None):
+        """Label, three amount columns, then description and date range."""
+        self.writer.write(row, 1, values[0], fill=CASH_FILL, font=font)
+        self.writer.write_row(row, values[1:4], start_column=2, style='number', fill=CASH_FILL, font=font)
+        self.writer.write_row(row, values[4:], start_column=5, fill=CASH_FILL, font=font)
 
     def _write_grand_total_net_income(self):
         current_row = self.ws.max_row + 2
@@ -188,31 +167,22 @@ class SummarySheet(BaseSheet):
         ])
 
         for label, amount in summary_data:
-            cell = self.ws.cell(row=current_row, column=1, value=label)
-            amount_cell = self.ws.cell(row=current_row, column=2, value=amount)
-            cell.fill = SHOPEE_FILL
-            amount_cell.fill = SHOPEE_FILL
-            amount_cell.number_format = '#,##0'
             if label == 'GRAND TOTAL NET INCOME':
-                cell.font = HEADER_FONT
-                amount_cell.font = HEADER_FONT
-                cell.fill = YELLOW_FILL
-                amount_cell.fill = YELLOW_FILL
-            
+                self.writer.write(current_row, 1, label, 'header', fill=YELLOW_FILL)
+                self.writer.write(current_row, 2, amount, 'header_number', fill=YELLOW_FILL)
+            else:
+                self.writer.write(current_row, 1, label, fill=SHOPEE_FILL)
+                self.writer.write(current_row, 2, amount, 'number', fill=SHOPEE_FILL)
+
             current_row += 1
 
     def _write_commission_summary(self):
         current_row = self.ws.max_row + 2
-        summary_title_cell = self.ws.cell(row=current_row, column=1, value='Commission Summary')
-        summary_title_cell.font = HEADER_FONT
-        summary_title_cell.fill = COMMISSION_FILL
+        self.writer.write(current_row, 1, 'Commission Summary', 'header', fill=COMMISSION_FILL)
         current_row += 1
 
         commission_headers = ['Category', 'Rate', 'Commission']
-        for col, header in enumerate(commission_headers, 1):
-            cell = self.ws.cell(row=current_row, column=col, value=header)
-            cell.font = HEADER_FONT
-            cell.fill = COMMISSION_FILL
+        self.writer.write_row(current_row, commission_headers, style='header', fill=COMMISSION_FILL)
         current_row += 1
 
         grabfood_net_total = self.data['grabfood_net_total']
@@ -228,10 +198,6 @@ class SummarySheet(BaseSheet):
         ]
 
         for category, rate, commission in commission_data:
-            row_data = [category, rate, commission]
-            for col, value in enumerate(row_data, 1):
-                cell = self.ws.cell(row=current_row, column=col, value=value)
-                cell.fill = COMMISSION_FILL
-                if col == 3:
-                    cell.number_format = '#,##0'
+            self.writer.write_row(current_row, [category, rate], fill=COMMISSION_FILL)
+            self.writer.write(current_row, 3, commission, 'number', fill=COMMISSION_FILL)
             current_row += 1
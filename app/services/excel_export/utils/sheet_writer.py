@@ -0,0 +1,136 @@
+from copy import copy
+from typing import NamedTuple, Optional
+from weakref import WeakKeyDictionary
+
+from openpyxl.styles import Alignment, Border, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from app.services.excel_export.utils.excel_utils import (
+    HEADER_FONT, CENTER_ALIGN, LEFT_ALIGN, RIGHT_ALIGN, THIN_BORDER
+)
+
+
+class CellStyle(NamedTuple):
+    """Everything write() may set on a cell. None leaves that attribute untouched."""
+    font: Optional[Font] = None
+    fill: Optional[PatternFill] = None
+    alignment: Optional[Alignment] = None
+    border: Optional[Border] = None
+    number_format: Optional[str] = None
+
+    def with_(self, **overrides) -> 'CellStyle':
+        return self._replace(**{key: value for key, value in overrides.items() if value is not None})
+
+
+STYLES = {}
+
+
+def register_style(name: str, **attributes) -> CellStyle:
+    STYLES[name] = CellStyle(**attributes)
+    return STYLES[name]
+
+
+register_style('header', font=HEADER_FONT)
+register_style('header_center', font=HEADER_FONT, alignment=CENTER_ALIGN)
+register_style('header_left', font=HEADER_FONT, alignment=LEFT_ALIGN)
+register_style('header_amount', font=HEADER_FONT, alignment=RIGHT_ALIGN, number_format='#,##0')
+register_style('header_number', font=HEADER_FONT, number_format='#,##0')
+register_style('number', number_format='#,##0')
+register_style('amount', alignment=RIGHT_ALIGN, number_format='#,##0')
+register_style('date', alignment=RIGHT_ALIGN, number_format='yyyy-mm-dd')
+register_style('right', alignment=RIGHT_ALIGN)
+register_style('center', alignment=CENTER_ALIGN)
+register_style('border', border=THIN_BORDER)
+
+# Per workbook: CellStyle -> the StyleArray openpyxl built for it the first time
+_style_arrays = WeakKeyDictionary()
+
+
+class SheetWriter:
+    """
+    Writes a cell's value and style in one call and tracks column widths.
+
+    On regular worksheets a style is resolved into openpyxl's style array once
+    per workbook; later cells copy that array instead of looking up font, fill,
+    alignment and number format one assignment at a time. fit_columns() sizes
+    columns from the tracked values, matching auto_fit_columns() without
+    rescanning every cell.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._lengths = {}
+        self._style_arrays = None
+        workbook = getattr(ws, 'parent', None)
+        if workbook is not None:
+            self._style_arrays = _style_arrays.setdefault(workbook, {})
+
+    def write(self, row, column, value=None, style=None, **overrides):
+        cell = self.ws.cell(row=row, column=column)
+        if value is not None:
+            cell.value = value
+        self._track(row, column, cell.value)
+
+        if isinstance(style, str):
+            style = STYLES[style]
+        if overrides:
+            style = (style or CellStyle()).with_(**overrides)
+        if style is not None:
+            self._apply(cell, style)
+        return cell
+
+    def write_row(self, row, values, start_column=1, style=None, **overrides):
+        return [
+            self.write(row, column, value, style, **overrides)
+            for column, value in enumerate(values, start_column)
+        ]
+
+    def append(self, values):
+        """ws.append() that also tracks the appended row for fit_columns()."""
+        self.ws.append(values)
+        row = self.ws._current_row
+        for column, value in enumerate(values, 1):
+            self._track(row, column, value)
+
+    def style(self, row, column, style=None, **overrides):
+        """Styles a cell without touching its value."""
+        return self.write(row, column, None, style, **overrides)
+
+    def _track(self, row, column, value):
+        self._lengths[(row, column)] = len(str(value)) if value else 0
+
+    def _apply(self, cell, style: CellStyle):
+        cached = None
+        can_cache = (
+            self._style_arrays is not None
+            and hasattr(cell, '_style')
+            and not cell.has_style
+        )
+        if can_cache:
+            cached = self._style_arrays.get(style)
+            if cached is not None:
+                cell._style = copy(cached)
+                return
+
+        if style.font is not None:
+            cell.font = style.font
+        if style.fill is not None:
+            cell.fill = style.fill
+        if style.alignment is not None:
+            cell.alignment = style.alignment
+        if style.border is not None:
+            cell.border = style.border
+        if style.number_format is not None:
+            cell.number_format = style.number_format
+
+        if can_cache:
+            self._style_arrays[style] = copy(cell._style)
+
+    def fit_columns(self, padding=2):
+        """Same widths as auto_fit_columns(), from the values written through this writer."""
+        widths = {}
+        for (_, column), length in self._lengths.items():
+            if length > widths.get(column, 0):
+                widths[column] = length
+        for column in range(1, self.ws.max_column + 1):
+            self.ws.column_dimensions[get_column_letter(column)].width = widths.get(column, 0) + padding
@@ -0,0 +1,228 @@
+import datetime
+from tempfile import TemporaryFile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles.numbers import is_date_format
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.cell import coordinate_from_string, range_boundaries
+from openpyxl.worksheet.cell_range import CellRange
+
+TIME_TYPES = (datetime.datetime, datetime.date, datetime.time, datetime.timedelta)
+
+
+class BufferedCell:
+    """
+    Lightweight stand-in for an openpyxl Cell.
+
+    Only the attributes the export sheets touch are kept. Styles are stored as
+    references to the shared style objects and resolved when the row is
+    written, so a buffered sheet costs a fraction of a regular worksheet.
+    """
+    __slots__ = ('row', 'column', '_value', 'font', 'fill', 'alignment', 'border', 'number_format')
+
+    def __init__(self, row, column):
+        self.row = row
+        self.column = column
+        self._value = None
+        self.font = None
+        self.fill = None
+        self.alignment = None
+        self.border = None
+        self.number_format = None
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        # Mirror openpyxl: a date value resets a non-date number format
+        if isinstance(value, TIME_TYPES) and self.number_format and not is_date_format(self.number_format):
+            self.number_format = None
+        self._value = value
+
+    @property
+    def coordinate(self):
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    def to_write_only_cell(self, ws):
+        cell = WriteOnlyCell(ws, value=self._value)
+        if self.font is not None:
+            cell.font = self.font
+        if self.fill is not None:
+            cell.fill = self.fill
+        if self.alignment is not None:
+            cell.alignment = self.alignment
+        if self.border is not None:
+            cell.border = self.border
+        if self.number_format is not None:
+            cell.number_format = self.number_format
+        return cell
+
+
+class StreamingWorksheet:
+    """
+    Row-ordered front end for an openpyxl write-only worksheet.
+
+    Supports the subset of the Worksheet API used by the export sheets
+    (cell, append, indexing, iter_rows, columns, merge_cells, dimensions).
+    Cells are buffered until flush_rows() or close() writes them, strictly in
+    row order, as WriteOnlyCell objects. Column widths, row heights and merged
+    ranges must be known before the rows they affect are flushed.
+    """
+
+    def __init__(self, workbook: Workbook, title: str):
+        self._ws = workbook.create_sheet(title=title)
+        self.title = title
+        self._rows = {}
+        self._current_row = 0
+        self._max_row = 0
+        self._max_column = 0
+        self._flushed_row = 0
+        self._closed = False
+
+    @property
+    def column_dimensions(self):
+        return self._ws.column_dimensions
+
+    @property
+    def row_dimensions(self):
+        return self._ws.row_dimensions
+
+    @property
+    def max_row(self):
+        return self._max_row or 1
+
+    @property
+    def max_column(self):
+        return self._max_column or 1
+
+    def cell(self, row, column, value=None):
+        if row < 1 or column < 1:
+            raise ValueError("Row or column values must be at least 1")
+        cell = self._get_cell(row, column)
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def _get_cell(self, row, column):
+        row_cells = self._rows.get(row)
+        if row_cells is None:
+            if row <= self._flushed_row:
+                raise ValueError(f"Row {row} of sheet '{self.title}' was already streamed")
+            row_cells = self._rows[row] = {}
+        cell = row_cells.get(column)
+        if cell is None:
+            cell = row_cells[column] = BufferedCell(row, column)
+            self._current_row = max(self._current_row, row)
+            self._max_row = max(self._max_row, row)
+            self._max_column = max(self._max_column, column)
+        return cell
+
+    def append(self, iterable):
+        row = self._current_row + 1
+        for column, value in enumerate(iterable, 1):
+            self.cell(row=row, column=column, value=value)
+        self._current_row = row
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return tuple(self.cell(row=key, column=column) for column in range(1, self.max_column + 1))
+        column_letter, row = coordinate_from_string(key)
+        return self.cell(row=row, column=column_index_from_string(column_letter))
+
+    def __setitem__(self, key, value):
+        self[key].value = value
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None):
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        for row in range(min_row, max_row + 1):
+            yield tuple(self.cell(row=row, column=column) for column in range(min_col, max_col + 1))
+
+    @property
+    def columns(self):
+        max_row = self.max_row
+        for column in range(1, self.max_column + 1):
+            yield tuple(self.cell(row=row, column=column) for row in range(1, max_row + 1))
+
+    def merge_cells(self, range_string=None, start_row=None, start_column=None, end_row=None, end_column=None):
+        if range_string is not None:
+            start_column, start_row, end_column, end_row = range_boundaries(range_string)
+        cell_range = CellRange(min_col=start_column, min_row=start_row, max_col=end_column, max_row=end_row)
+        self._ws.merged_cells.add(cell_range)
+
+        # Like openpyxl, the anchor is created as a regular cell (which moves the
+        # append cursor) and cells covered by the merge lose their value and style
+        self._get_cell(start_row, start_column)
+        for row in range(start_row, end_row + 1):
+            for column in range(start_column, end_column + 1):
+                if (row, column) == (start_row, start_column):
+                    continue
+                self._rows.setdefault(row, {})[column] = BufferedCell(row, column)
+        self._max_row = max(self._max_row, end_row)
+        self._max_column = max(self._max_column, end_column)
+
+    def flush_rows(self, max_row):
+        """Stream every buffered row up to max_row to the write-only sheet."""
+        for row in range(self._flushed_row + 1, max_row + 1):
+            row_cells = self._rows.pop(row, None)
+            if not row_cells:
+                self._ws.append([])
+                continue
+            values = [None] * max(row_cells)
+            for column, cell in row_cells.items():
+                values[column - 1] = cell.to_write_only_cell(self._ws)
+            self._ws.append(values)
+        self._flushed_row = max(self._flushed_row, max_row)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush_rows(self._max_row)
+        self._closed = True
+
+
+class StreamingWorkbook:
+    """
+    Write-only workbook whose sheets are streamed one after another.
+
+    Creating a sheet closes the previous one, so at most one sheet is held in
+    memory as buffered cells; finished sheets live in openpyxl's temp files
+    until save().
+    """
+
+    def __init__(self):
+        self._wb = Workbook(write_only=True)
+        self._open_sheet = None
+
+    @property
+    def style_names(self):
+        return self._wb.style_names
+
+    def add_named_style(self, style):
+        self._wb.add_named_style(style)
+
+    def create_sheet(self, title=None):
+        self._close_open_sheet()
+        self._open_sheet = StreamingWorksheet(self._wb, title)
+        return self._open_sheet
+
+    def _close_open_sheet(self):
+        if self._open_sheet is not None:
+            self._open_sheet.close()
+            self._open_sheet = None
+
+    def save(self, file):
+        self._close_open_sheet()
+        self._wb.save(file)
+
+    def save_to_tempfile(self):
+        """Save to an anonymous temp file, rewound and ready to stream."""
+        output = TemporaryFile()
+        self.save(output)
+        output.seek(0)
+        return output
@@ -0,0 +1,131 @@
+"""
+Outlet listing serialization with per-outlet JSON fragments.
+
+GET /outlets first reads only (id, updated_at) for the filtered, ordered
+outlets, then answers each one from a fragment cached in this worker for
+that exact updated_at and field set. Only outlets without a current fragment
+are loaded, selecting just the requested columns. A changed outlet has a new
+updated_at, so other workers stop using their fragment for it as well; the
+worker that saved it also drops it straight away.
+"""
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.outlet import Outlet
+from app.utils.json_provider import STREAM_BATCH_SIZE
+
+# Distinct ?fields= sets remembered per outlet before its fragments are reset
+MAX_FIELD_SETS_PER_OUTLET = 8
+
+
+class OutletFragmentCache:
+    """Encoded outlets by id, then field set, least-recently-used outlet first out."""
+
+    def __init__(self, max_outlets: int):
+        self.max_outlets = max_outlets
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, outlet_id, updated_at, fields):
+        with self._lock:
+            entry = self._entries.get(outlet_id)
+            if entry is None or entry[0] != updated_at:
+                return None
+            self._entries.move_to_end(outlet_id)
+            return entry[1].get(fields)
+
+    def put(self, outlet_id, updated_at, fields, fragment: str):
+        with self._lock:
+            entry = self._entries.get(outlet_id)
+            if entry is None or entry[0] != updated_at or len(entry[1]) >= MAX_FIELD_SETS_PER_OUTLET:
+                entry = self._entries[outlet_id] = (updated_at, {})
+            entry[1][fields] = fragment
+            self._entries.move_to_end(outlet_id)
+            while len(self._entries) > self.max_outlets:
+                self._entries.popitem(last=False)
+
+    def discard(self, outlet_id):
+        with self._lock:
+            self._entries.pop(outlet_id, None)
+
+
+_fragments = None
+_fragments_lock = threading.Lock()
+
+
+def get_fragment_cache():
+    """Builds the cache once per process; returns None when it is disabled."""
+    global _fragments
+    max_outlets = current_app.config['OUTLET_FRAGMENT_CACHE_MAX_OUTLETS']
+    if max_outlets <= 0:
+        return None
+    with _fragments_lock:
+        if _fragments is None:
+            _fragments = OutletFragmentCache(max_outlets)
+        return _fragments
+
+
+@event.listens_for(Outlet, 'after_update')
+@event.listens_for(Outlet, 'after_delete')
+def _discard_fragments(mapper, connection, outlet):
+    if _fragments is not None:
+        _fragments.discard(outlet.id)
+
+
+def parse_fields(raw):
+    """
+    Returns (fields, unknown) for a comma-separated ?fields= value, fields in
+    to_dict() order and always starting with id. No value selects every field.
+    """
+    if not raw:
+        return Outlet.SERIALIZED_FIELDS, []
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(requested - set(Outlet.SERIALIZED_FIELDS))
+    fields = tuple(name for name in Outlet.SERIALIZED_FIELDS if name == 'id' or name in requested)
+    return fields, unknown
+
+
+def outlet_fragments(rows, fields) -> list:
+    """Encoded outlets for (id, updated_at) rows, in row order, loading only the ones not cached."""
+    cache = get_fragment_cache()
+    fragments = {}
+    missing = []
+    for outlet_id, updated_at in rows:
+        # Rows without updated_at cannot tell when they changed, so they are never cached
+        fragment = cache.get(outlet_id, updated_at, fields) if cache is not None and updated_at else None
+        if fragment is None:
+            missing.append(outlet_id)
+        else:
+            fragments[outlet_id] = fragment
+
+    if missing:
+        dumps = current_app.json.dumps
+        names = tuple(dict.fromkeys(('id', 'updated_at') + fields))
+        loaded = (
+            db.session.query(*[getattr(Outlet, name) for name in names])
+            .filter(Outlet.id.in_(missing))
+        )
+        for row in loaded:
+            values = row._mapping
+            fragment = dumps(Outlet.serialize_values({name: values[name] for name in fields}))
+            fragments[values['id']] = fragment
+            if cache is not None and values['updated_at']:
+                cache.put(values['id'], values['updated_at'], fields, fragment)
+
+    # An outlet deleted between the two queries is left out
+    return [fragments[outlet_id] for outlet_id, _ in rows if outlet_id in fragments]
+
+
+def outlet_fragment_batches(id_query, fields):
+    """outlet_fragments() for an (id, updated_at) query, one list per STREAM_BATCH_SIZE rows."""
+    batch = []
+    for row in id_query.yield_per(STREAM_BATCH_SIZE):
+        batch.append(tuple(row))
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield outlet_fragments(batch, fields)
+            batch = []
+    yield outlet_fragments(batch, fields)
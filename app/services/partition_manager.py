@@ -0,0 +1,286 @@
+"""
+Monthly RANGE partitioning for the large transaction tables.
+
+Each table is partitioned on its business date column into ``<table>_pYYYYMM``
+partitions plus a ``<table>_default`` partition for NULL or not-yet-covered
+dates. Postgres only allows a primary key on a partitioned table when it
+includes the partition column, so the parent has none; every partition gets
+the model's primary key and unique constraints instead. Rows with the same
+natural key share a business date, so per-partition uniqueness matches the
+old table-wide rule, and ORM identity is unchanged.
+
+For the same reason a partitioned table cannot be the target of a foreign
+key on its id alone. bank_mutations stays a plain table because
+transaction_matches.mutation_id references it, and convert refuses any table
+that other tables still reference.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import UniqueConstraint, func, or_, text
+from sqlalchemy.schema import CreateIndex
+
+from app.extensions import db
+from app.models.grabfood_reports import GrabFoodReport
+
+# table -> business date column to partition on
+PARTITIONED_TABLES = {
+    'gojek_reports': 'transaction_date',
+    'grabfood_reports': 'tanggal_dibuat',
+    'shopee_reports': 'order_create_time',
+    'shopeepay_reports': 'create_time',
+}
+DEFAULT_MONTHS_AHEAD = 3
+PARTITION_NAME_PATTERN = re.compile(r'^(?P<table>.+)_p(?P<year>\d{4})(?P<month>\d{2})$')
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def day_range_filters(column, start_date, end_date):
+    """
+    ``start_date <= column::date <= end_date`` as a plain range on the column.
+    Postgres cannot prune partitions through a cast, so report queries filter
+    the raw column instead.
+    """
+    return [column >= _as_date(start_date), column < _as_date(end_date) + timedelta(days=1)]
+
+
+def grab_report_day_filters(start_date, end_date):
+    """
+    Day range on a Grab row's report date, coalesce(diperbarui_pada, tanggal_dibuat).
+    An order is updated after it is created, so tanggal_dibuat is bounded by
+    the range end too, which lets Postgres skip the later partitions.
+    """
+    report_datetime = func.coalesce(GrabFoodReport.diperbarui_pada, GrabFoodReport.tanggal_dibuat)
+    next_day = _as_date(end_date) + timedelta(days=1)
+    return [
+        report_datetime >= _as_date(start_date),
+        report_datetime < next_day,
+        grab_created_bound(GrabFoodReport.tanggal_dibuat < next_day),
+    ]
+
+
+def grab_created_bound(criterion):
+    """
+    A pruning ``criterion`` on tanggal_dibuat that also keeps rows where it is
+    NULL: their report date comes from diperbarui_pada alone, and they live in
+    the default partition.
+    """
+    return or_(GrabFoodReport.tanggal_dibuat.is_(None), criterion)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _model_table(table: str):
+    return db.Model.metadata.tables[table]
+
+
+def _partition_constraints_sql(table: str) -> str:
+    """The model's primary key and unique constraints, declared on each partition."""
+    model_table = _model_table(table)
+    constraints = [
+        'PRIMARY KEY ({})'.format(', '.join(_quote(column.name) for column in model_table.primary_key.columns))
+    ]
+    for constraint in model_table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            constraints.append('UNIQUE ({})'.format(', '.join(_quote(column.name) for column in constraint.columns)))
+    return ', '.join(constraints)
+
+
+def is_partitioned(connection, table: str) -> bool:
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+    ), {'table': table}).scalar()
+
+
+def list_partitions(connection, table: str):
+    """Returns (partition name, month or None for the default partition) pairs, oldest first."""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {'table': table}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_PATTERN.match(name)
+        month = date(int(match['year']), int(match['month']), 1) if match and match['table'] == table else None
+        partitions.append((name, month))
+    return sorted(partitions, key=lambda item: (item[1] is None, item[1] or date.min))
+
+
+def _create_month_partition(connection, table: str, month: date):
+    """
+    Creates one monthly partition. Rows already sitting in the default
+    partition for that month are moved into it, since Postgres refuses to add
+    a partition whose range overlaps rows in the default one.
+    """
+    column = PARTITIONED_TABLES[table]
+    name = partition_name(table, month)
+    default_name = default_partition_name(table)
+    bounds = {'start': month, 'end': _add_months(month, 1)}
+
+    stranded = connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {_quote(default_name)} "
+        f"WHERE {_quote(column)} >= :start AND {_quote(column)} < :end)"
+    ), bounds).scalar()
+
+    if stranded:
+        connection.execute(text(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(default_name)}"))
+
+    connection.execute(text(
+        f"CREATE TABLE {_quote(name)} PARTITION OF {_quote(table)} ({_partition_constraints_sql(table)}) "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+
+    if stranded:
+        range_filter = f"{_quote(column)} >= :start AND {_quote(column)} < :end"
+        connection.execute(text(
+            f"INSERT INTO {_quote(name)} SELECT * FROM {_quote(default_name)} WHERE {range_filter}"
+        ), bounds)
+        connection.execute(text(f"DELETE FROM {_quote(default_name)} WHERE {range_filter}"), bounds)
+        connection.execute(text(
+            f"ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(default_name)} DEFAULT"
+        ))
+
+
+def ensure_partitions(connection, table: str, months_ahead: int = DEFAULT_MONTHS_AHEAD, today: date = None):
+    """Pre-creates monthly partitions from the current month through ``months_ahead`` months out."""
+    current_month = _month_start(today or date.today())
+    existing = {month for _, month in list_partitions(connection, table) if month}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current_month, offset)
+        if month not in existing:
+            _create_month_partition(connection, table, month)
+            created.append(partition_name(table, month))
+    return created
+
+
+def detach_partitions(connection, table: str, keep_months: int, today: date = None):
+    """
+    Detaches monthly partitions that end before the last ``keep_months``
+    months. Detached partitions stay as standalone tables for archiving.
+    """
+    cutoff = _add_months(_month_start(today or date.today()), -keep_months)
+    detached = []
+    for name, month in list_partitions(connection, table):
+        if month and _add_months(month, 1) <= cutoff:
+            connection.execute(text(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}"))
+            detached.append(name)
+    return detached
+
+
+def referencing_foreign_keys(connection, table: str):
+    """(constraint, referencing table) pairs of the foreign keys that point at ``table``."""
+    return connection.execute(text(
+        "SELECT con.conname, src.relname FROM pg_constraint con "
+        "JOIN pg_class src ON src.oid = con.conrelid "
+        "JOIN pg_class dst ON dst.oid = con.confrelid "
+        "WHERE con.contype = 'f' AND dst.relname = :table"
+    ), {'table': table}).all()
+
+
+def convert_to_partitioned(connection, table: str, months_ahead: int = DEFAULT_MONTHS_AHEAD, today: date = None):
+    """
+    Rebuilds an existing table as a partitioned one inside the caller's
+    transaction: creates the partitioned parent, one partition per month that
+    has data plus ``months_ahead`` future months and the default partition,
+    copies every row, keeps the id sequences and recreates the model's indexes.
+    The table is locked for the duration of the copy. Raises ValueError when
+    a foreign key references the table: it would follow the renamed table and
+    block the drop, and the parent has no unique key on id to re-point it to.
+    """
+    references = referencing_foreign_keys(connection, table)
+    if references:
+        raise ValueError(
+            f"{table} is referenced by foreign keys ("
+            + ", ".join(f"{name} on {source}" for name, source in references)
+            + "); partitioning it would break them"
+        )
+    column = PARTITIONED_TABLES[table]
+    legacy = f"{table}_unpartitioned"
+    model_table = _model_table(table)
+
+    connection.execute(text(f"LOCK TABLE {_quote(table)} IN ACCESS EXCLUSIVE MODE"))
+    first_value = connection.execute(text(f"SELECT min({_quote(column)}) FROM {_quote(table)}")).scalar()
+    sequences = {
+        pk_column.name: connection.execute(
+            text("SELECT pg_get_serial_sequence(:table, :column)"),
+            {'table': table, 'column': pk_column.name},
+        ).scalar()
+        for pk_column in model_table.primary_key.columns
+    }
+
+    connection.execute(text(f"ALTER TABLE {_quote(table)} RENAME TO {_quote(legacy)}"))
+    connection.execute(text(
+        f"CREATE TABLE {_quote(table)} (LIKE {_quote(legacy)} INCLUDING DEFAULTS INCLUDING STORAGE) "
+        f"PARTITION BY RANGE ({_quote(column)})"
+    ))
+    connection.execute(text(
+        f"CREATE TABLE {_quote(default_partition_name(table))} PARTITION OF {_quote(table)} "
+        f"({_partition_constraints_sql(table)}) DEFAULT"
+    ))
+
+    current_month = _month_start(today or date.today())
+    month = _month_start(first_value) if first_value else current_month
+    last_month = _add_months(current_month, months_ahead)
+    while month <= last_month:
+        _create_month_partition(connection, table, month)
+        month = _add_months(month, 1)
+
+    connection.execute(text(f"INSERT INTO {_quote(table)} SELECT * FROM {_quote(legacy)}"))
+
+    # Serial sequences belong to the old table; move them before it is dropped
+    for column_name, sequence in sequences.items():
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {_quote(table)}.{_quote(column_name)}"))
+    connection.execute(text(f"DROP TABLE {_quote(legacy)}"))
+
+    # Created on the parent, so Postgres builds a matching index on every partition
+    for index in model_table.indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+    connection.execute(text(f"ANALYZE {_quote(table)}"))
+
+
+def partition_status(connection, table: str) -> dict:
+    if not is_partitioned(connection, table):
+        return {'table': table, 'partitioned': False}
+
+    partitions = list_partitions(connection, table)
+    months = [month for _, month in partitions if month]
+    default_rows = connection.execute(text(
+        f"SELECT count(*) FROM {_quote(default_partition_name(table))}"
+    )).scalar()
+    return {
+        'table': table,
+        'partitioned': True,
+        'column': PARTITIONED_TABLES[table],
+        'partitions': len(months),
+        'first_month': months[0].isoformat() if months else None,
+        'last_month': months[-1].isoformat() if months else None,
+        'default_partition_rows': default_rows,
+    }
@@ -148,7 +148,7 @@ class RekeningInfoService:
             return []
 
         if platform_name in ("ShopeeFood", "Shopee"):
-            return cls._unique_values([store_id, store_id[-4:], store_id[-5:]])
+            return cls._unique_values([store_id, *outlet.shopee_platform_codes()])
 
         return [store_id]
 
@@ -12,10 +12,7 @@ from app.models.shopeepay_reports import ShopeepayReport
 from app.models.tiktok_reports import TiktokReport
 from app.models.webshop_report import WebshopReport
 from app.services.excel_export import mpr_calculations as mpr_calc
-
-
-def _grab_report_datetime_col():
-    return db.func.coalesce(GrabFoodReport.diperbarui_pada, GrabFoodReport.tanggal_dibuat)
+from app.services.partition_manager import day_range_filters, grab_report_day_filters
 
 
 def _grab_report_date(report) -> date | None:
@@ -224,8 +221,7 @@ def generate_monthly_net_income_data_from_closing_anchor(
 
     grab_reports = GrabFoodReport.query.filter(
         GrabFoodReport.brand_name == brand_name,
-        db.func.cast(_grab_report_datetime_col(), db.Date) >= query_start_date,
-        db.func.cast(_grab_report_datetime_col(), db.Date) <= query_end_date,
+        *grab_report_day_filters(query_start_date, query_end_date),
     ).all()
 
     data = {}
@@ -296,8 +292,7 @@ def generate_monthly_grab_net_income_data(
     query_end_date = date(year + 1, 1, 31)
     grab_reports = GrabFoodReport.query.filter(
         GrabFoodReport.brand_name == brand_name,
-        db.func.cast(_grab_report_datetime_col(), db.Date) >= query_start_date,
-        db.func.cast(_grab_report_datetime_col(), db.Date) <= query_end_date,
+        *grab_report_day_filters(query_start_date, query_end_date),
     ).all()
 
     for report in grab_reports:
@@ -450,16 +445,13 @@ def generate_monthly_mpr_commission_data(
             GojekReport.transaction_date <= end_date,
         )
         grab_query = grab_query.filter(
-            db.func.cast(_grab_report_datetime_col(), db.Date) >= start_date,
-            db.func.cast(_grab_report_datetime_col(), db.Date) <= end_date,
+            *grab_report_day_filters(start_date, end_date),
         )
         shopee_query = shopee_query.filter(
-            db.func.cast(ShopeeReport.order_create_time, db.Date) >= start_date,
-            db.func.cast(ShopeeReport.order_create_time, db.Date) <= end_date,
+            *day_range_filters(ShopeeReport.order_create_time, start_date, end_date),
         )
         shopeepay_query = shopeepay_query.filter(
-            db.func.cast(ShopeepayReport.create_time, db.Date) >= start_date,
-            db.func.cast(ShopeepayReport.create_time, db.Date) <= end_date,
+            *day_range_filters(ShopeepayReport.create_time, start_date, end_date),
         )
         tiktok_query = tiktok_query.filter(
             db.func.cast(TiktokReport.order_time, db.Date) >= start_date,
@@ -473,16 +465,13 @@ def generate_monthly_mpr_commission_data(
             GojekReport.transaction_date <= query_end_date,
         )
         grab_query = grab_query.filter(
-            db.func.cast(_grab_report_datetime_col(), db.Date) >= query_start_date,
-            db.func.cast(_grab_report_datetime_col(), db.Date) <= query_end_date,
+            *grab_report_day_filters(query_start_date, query_end_date),
         )
         shopee_query = shopee_query.filter(
-            db.func.cast(ShopeeReport.order_create_time, db.Date) >= query_start_date,
-            db.func.cast(ShopeeReport.order_create_time, db.Date) <= query_end_date,
+            *day_range_filters(ShopeeReport.order_create_time, query_start_date, query_end_date),
         )
         shopeepay_query = shopeepay_query.filter(
-            db.func.cast(ShopeepayReport.create_time, db.Date) >= query_start_date,
-            db.func.cast(ShopeepayReport.create_time, db.Date) <= query_end_date,
+            *day_range_filters(ShopeepayReport.create_time, query_start_date, query_end_date),
         )
         tiktok_query = tiktok_query.filter(
             db.func.cast(TiktokReport.order_time, db.Date) >= query_start_date,
@@ -810,8 +799,7 @@ def generate_monthly_management_commission_data_custom_range(
     grab_reports = GrabFoodReport.query.filter(
         GrabFoodReport.brand_name == normalized_brand_name,
         GrabFoodReport.outlet_code.in_(outlet_codes),
-        db.func.cast(_grab_report_datetime_col(), db.Date) >= start_date,
-        db.func.cast(_grab_report_datetime_col(), db.Date) <= end_date,
+        *grab_report_day_filters(start_date, end_date),
     ).all()
     for report in grab_reports:
         transaction_date = _grab_report_date(report)
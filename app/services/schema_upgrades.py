@@ -0,0 +1,57 @@
+"""
+Schema changes for databases created before a model gained columns.
+
+db.create_all() only creates missing tables; it never alters an existing
+one. Columns and indexes added to existing models are listed here so that
+deployed databases can catch up with ``python manage_schema.py apply``
+before the new code is started. Every statement is idempotent, a step counts
+as applied once all of its columns and indexes exist, and each step runs in
+its own transaction.
+"""
+from sqlalchemy import inspect, text
+
+# Applied in order. ``follow_up`` is printed after the step is applied.
+SCHEMA_UPGRADES = [
+    {
+        'name': 'outlets_shopee_store_id_suffixes',
+        'columns': {'outlets': ['store_id_shopee_suffix4', 'store_id_shopee_suffix5']},
+        'indexes': {'outlets': ['ix_outlets_store_id_shopee_suffix4', 'ix_outlets_store_id_shopee_suffix5']},
+        'statements': [
+            'ALTER TABLE outlets ADD COLUMN IF NOT EXISTS store_id_shopee_suffix4 varchar(4)',
+            'ALTER TABLE outlets ADD COLUMN IF NOT EXISTS store_id_shopee_suffix5 varchar(5)',
+            'CREATE INDEX IF NOT EXISTS ix_outlets_store_id_shopee_suffix4 ON outlets (store_id_shopee_suffix4)',
+            'CREATE INDEX IF NOT EXISTS ix_outlets_store_id_shopee_suffix5 ON outlets (store_id_shopee_suffix5)',
+        ],
+        'follow_up': 'fill existing outlets with POST /admin/tools/backfill_shopee_store_id_suffixes',
+    },
+    {
+        # Read by the export cache's data version; only set by ORM updates, so no backfill
+        'name': 'platform_reports_updated_at',
+        'columns': {
+            table: ['updated_at']
+            for table in ('gojek_reports', 'grabfood_reports', 'shopee_reports', 'shopeepay_reports')
+        },
+        'statements': [
+            f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at timestamp'
+            for table in ('gojek_reports', 'grabfood_reports', 'shopee_reports', 'shopeepay_reports')
+        ],
+    },
+]
+
+
+def upgrade_applied(connection, upgrade: dict) -> bool:
+    inspector = inspect(connection)
+    for table, columns in upgrade.get('columns', {}).items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        if not set(columns) <= existing:
+            return False
+    for table, indexes in upgrade.get('indexes', {}).items():
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if not set(indexes) <= existing:
+            return False
+    return True
+
+
+def apply_upgrade(connection, upgrade: dict):
+    for statement in upgrade['statements']:
+        connection.execute(text(statement))
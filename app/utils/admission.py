@@ -0,0 +1,206 @@
+"""
+Admission control for ingestion and export requests across gunicorn workers.
+
+Every heavy request holds one of ``ADMISSION_WORKERS - ADMISSION_INTERACTIVE_RESERVED``
+occupancy slots while it runs or queues, so that many workers are always
+left for interactive routes. Within that, each workload runs at most its
+``concurrency`` requests at once; the rest wait up to ``queue_seconds`` for a
+run slot. Requests that find no occupancy slot, or time out in the queue,
+get 429 with Retry-After. Slots are flock()ed files, so a worker that dies
+releases its slots with its file descriptors.
+
+Endpoints in DEFERRED_RUN_SLOT_ENDPOINTS do their heavy work inside
+single_flight.coalesce(). They only take the occupancy slot up front; the
+run slot is claimed by claim_run_slot() when the request actually computes,
+so identical requests can wait for (and share) a computation that is already
+running instead of queueing behind the run cap and recomputing.
+
+Background work started by a request (export jobs) takes the same run slots
+through run_slot(), so it counts against the cap shared by all workers.
+"""
+import fcntl
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+from app.utils.metrics import (
+    observe_admission_rejected,
+    observe_admission_wait,
+    track_admission_in_flight,
+    track_admission_queued,
+)
+from app.utils.workloads import current_workload
+
+SLOT_POLL_SECONDS = 0.05
+# How often run_slot() reports that background work is still waiting
+RUN_SLOT_HEARTBEAT_SECONDS = 30
+# Their run slot is taken inside single_flight.coalesce(), only by the request that computes
+DEFERRED_RUN_SLOT_ENDPOINTS = {
+    'export.export_reports',
+    'export.preview_daily_report',
+    'reports.monthly_income_report',
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised by claim_run_slot() when no run slot frees up in time; answered with 429."""
+
+    def __init__(self, workload: str, limits: dict, reason: str):
+        super().__init__(f"Too many {workload} requests in progress")
+        self.workload = workload
+        self.limits = limits
+        self.reason = reason
+
+
+def _try_slot(name: str, count: int):
+    """Returns the open handle of a free slot, which holds it until closed, or None."""
+    directory = current_app.config['ADMISSION_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for index in range(count):
+        handle = open(os.path.join(directory, f"{name}.{index}.lock"), 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return handle
+        except BlockingIOError:
+            handle.close()
+    return None
+
+
+def _reject(workload: str, limits: dict, reason: str):
+    observe_admission_rejected(workload, reason)
+    retry_after = max(math.ceil(limits['queue_seconds']), 1)
+    response = jsonify({
+        'error': f"Too many {workload} requests in progress, retry later",
+        'workload': workload,
+        'retry_after_seconds': retry_after,
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _wait_for_run_slot(workload: str, limits: dict):
+    """Returns the run slot handle, waiting up to queue_seconds, or None."""
+    started_at = time.monotonic()
+    run_slot = _try_slot(workload, limits['concurrency'])
+    if run_slot is None:
+        track_admission_queued(workload, 1)
+        try:
+            deadline = started_at + limits['queue_seconds']
+            while run_slot is None and time.monotonic() < deadline:
+                time.sleep(SLOT_POLL_SECONDS)
+                run_slot = _try_slot(workload, limits['concurrency'])
+        finally:
+            track_admission_queued(workload, -1)
+
+    observe_admission_wait(workload, time.monotonic() - started_at, admitted=run_slot is not None)
+    if run_slot is not None:
+        g.admission_slots.append(run_slot)
+        g.admission_workload = workload
+        track_admission_in_flight(workload, 1)
+    return run_slot
+
+
+def _admit():
+    if request.method == 'OPTIONS':
+        return None
+    workload = current_workload()
+    limits = current_app.config['ADMISSION_LIMITS'].get(workload)
+    if limits is None:
+        return None
+
+    occupancy_slots = current_app.config['ADMISSION_WORKERS'] - current_app.config['ADMISSION_INTERACTIVE_RESERVED']
+    occupancy = _try_slot('heavy', max(occupancy_slots, 0))
+    if occupancy is None:
+        return _reject(workload, limits, 'full')
+    g.admission_slots = [occupancy]
+
+    if request.endpoint in DEFERRED_RUN_SLOT_ENDPOINTS:
+        g.admission_deferred = (workload, limits)
+        return None
+    if _wait_for_run_slot(workload, limits) is None:
+        return _reject(workload, limits, 'queue_timeout')
+    return None
+
+
+def claim_run_slot():
+    """
+    Takes the deferred run slot of the current request, if it has one, before
+    it computes. Raises AdmissionRejected when none frees up in time. A no-op
+    outside requests (export jobs, bulk export processes) and for requests
+    that were admitted with their run slot.
+    """
+    if not has_request_context():
+        return
+    deferred = g.pop('admission_deferred', None)
+    if deferred is None:
+        return
+    workload, limits = deferred
+    if _wait_for_run_slot(workload, limits) is None:
+        raise AdmissionRejected(workload, limits, 'queue_timeout')
+
+
+@contextmanager
+def run_slot(workload: str, on_wait=None):
+    """
+    Holds one of the workload's run slots for background work outside a
+    request, waiting as long as it takes. ``on_wait`` is called every
+    RUN_SLOT_HEARTBEAT_SECONDS while waiting. Workloads without limits run
+    straight away.
+    """
+    limits = current_app.config['ADMISSION_LIMITS'].get(workload)
+    if limits is None:
+        yield
+        return
+
+    started_at = time.monotonic()
+    handle = _try_slot(workload, limits['concurrency'])
+    if handle is None:
+        track_admission_queued(workload, 1)
+        try:
+            last_heartbeat = started_at
+            while handle is None:
+                time.sleep(SLOT_POLL_SECONDS)
+                handle = _try_slot(workload, limits['concurrency'])
+                if handle is None and on_wait and time.monotonic() - last_heartbeat >= RUN_SLOT_HEARTBEAT_SECONDS:
+                    on_wait()
+                    last_heartbeat = time.monotonic()
+        finally:
+            track_admission_queued(workload, -1)
+    observe_admission_wait(workload, time.monotonic() - started_at, admitted=True)
+
+    track_admission_in_flight(workload, 1)
+    try:
+        yield
+    finally:
+        track_admission_in_flight(workload, -1)
+        handle.close()
+
+
+def _rejected_response(error: AdmissionRejected):
+    return _reject(error.workload, error.limits, error.reason)
+
+
+def _release(exception=None):
+    g.pop('admission_deferred', None)
+    workload = g.pop('admission_workload', None)
+    if workload is not None:
+        track_admission_in_flight(workload, -1)
+    for handle in g.pop('admission_slots', []):
+        handle.close()
+
+
+def init_admission(app):
+    """Register after init_workloads, which tags the request with its workload."""
+    reserved = app.config['ADMISSION_INTERACTIVE_RESERVED']
+    if reserved < 1 or reserved >= app.config['ADMISSION_WORKERS']:
+        print(
+            f"Warning: ADMISSION_INTERACTIVE_RESERVED={reserved} with ADMISSION_WORKERS="
+            f"{app.config['ADMISSION_WORKERS']} leaves no guaranteed room for one of the workload classes"
+        )
+    app.before_request(_admit)
+    app.teardown_request(_release)
+    app.register_error_handler(AdmissionRejected, _rejected_response)
@@ -0,0 +1,114 @@
+"""
+Response compression negotiated from Accept-Encoding (br, then gzip).
+
+JSON, text and CSV bodies of at least COMPRESSION_MIN_BYTES are compressed;
+files sent with send_file (xlsx, pdf, zip) and anything already encoded are
+left alone. Streamed bodies are compressed chunk by chunk and flushed after
+each one, so the client still receives rows as they are produced.
+"""
+import zlib
+
+import brotli
+from flask import current_app, request
+
+from app.utils.metrics import observe_compression
+
+# Preferred first when the client accepts both at the same quality
+ENCODINGS = ('br', 'gzip')
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'application/xml', 'text/')
+# zlib window bits for a gzip header and trailer
+GZIP_WBITS = 31
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=level)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def _level(encoding: str) -> int:
+    if encoding == 'br':
+        return current_app.config['COMPRESSION_BROTLI_QUALITY']
+    return current_app.config['COMPRESSION_GZIP_LEVEL']
+
+
+def _compressible(response) -> bool:
+    return (
+        request.method != 'HEAD'
+        and 200 <= response.status_code < 300
+        and response.status_code != 204
+        and not response.direct_passthrough
+        and 'Content-Encoding' not in response.headers
+        and 'no-transform' not in response.headers.get('Cache-Control', '')
+        and (response.mimetype or '').startswith(COMPRESSIBLE_MIMETYPES)
+    )
+
+
+def _compress_stream(chunks, compressor: _Compressor, encoding: str):
+    before = after = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            before += len(chunk)
+            compressed = compressor.compress(chunk) + compressor.flush()
+            after += len(compressed)
+            if compressed:
+                yield compressed
+        tail = compressor.finish()
+        after += len(tail)
+        yield tail
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        observe_compression(encoding, before, after)
+
+
+def _compress_response(response):
+    if not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    compressor = _Compressor(encoding, _level(encoding))
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, compressor, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config['COMPRESSION_MIN_BYTES']:
+            return response
+        compressed = compressor.compress(body) + compressor.finish()
+        if len(compressed) >= len(body):
+            return response
+        observe_compression(encoding, len(body), len(compressed))
+        response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Register before every other after_request hook so this runs last, on the final body."""
+    app.after_request(_compress_response)
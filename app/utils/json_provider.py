@@ -0,0 +1,93 @@
+"""
+JSON encoding for every response.
+
+Decimal is written as a number and date/datetime/time as ISO 8601, so views
+can return model values as they are instead of converting each one. orjson
+is used when installed; the standard library fallback produces the same
+output. stream_encoded_json_array() writes large listings batch by batch,
+from items that are already JSON text such as cached per-row fragments,
+instead of building the whole payload first; encoded_json_array() builds the
+same body as a regular response.
+"""
+from datetime import date, time
+from decimal import Decimal
+
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rows fetched per round trip, and rows per chunk written to the client
+STREAM_BATCH_SIZE = 500
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    # datetime is a date subclass
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Flask only ever adds indent/separators (pretty-printing in debug)
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=_default, option=option).decode()
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the standard library still handles
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def _json_array_chunks(key: str, batches, fields: dict):
+    dumps = current_app.json.dumps
+    yield '{' + dumps(key) + ':['
+    separator = ''
+    for batch in batches:
+        if batch:
+            yield separator + ','.join(batch)
+            separator = ','
+    yield ']'
+    for name, value in fields.items():
+        yield ',' + dumps(name) + ':' + dumps(value)
+    yield '}\n'
+
+
+def stream_encoded_json_array(key: str, batches, **fields):
+    """
+    Streams ``{key: [...], **fields}`` for items that are already JSON text,
+    one chunk per list in ``batches``. The request context, and so the
+    session, stays open until the last batch.
+    """
+    return current_app.response_class(
+        stream_with_context(_json_array_chunks(key, batches, fields)), mimetype=current_app.json.mimetype
+    )
+
+
+def encoded_json_array(key: str, items, **fields):
+    """``{key: [...items], **fields}`` as a regular response, for items that are already JSON text."""
+    return current_app.response_class(
+        ''.join(_json_array_chunks(key, [items], fields)), mimetype=current_app.json.mimetype
+    )
+
+
+def init_json(app):
+    app.json = FastJSONProvider(app)
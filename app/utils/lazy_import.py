@@ -0,0 +1,34 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stands in for a module that is imported on first attribute access, so
+    controllers can keep ``pd.read_excel(...)``-style calls while pandas,
+    openpyxl, fpdf and the export sheet modules load only when a route that
+    needs them is first hit instead of when the worker boots.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,281 @@
+"""
+Prometheus metrics served at /metrics.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py before any
+worker imports prometheus_client) makes every worker write its samples to
+that shared directory, and /metrics merges them so a scrape that lands on
+any worker reports totals for all of them.
+"""
+import os
+import time
+from multiprocessing.util import Finalize
+
+from flask import current_app, g, jsonify, request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from app.extensions import db
+from app.utils.pool_monitor import pool_label
+
+# Upload responses report ingested and skipped rows under these keys
+UPLOAD_ROW_KEYS = ('total_records', 'total_records_processed', 'total_processed_rows', 'cash_count', 'pukis_count')
+UPLOAD_SKIPPED_PREFIXES = ('skipped_', 'total_skipped_')
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by blueprint and route.',
+    ['method', 'blueprint', 'route', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+UPLOAD_ROWS = Counter('upload_rows_total', 'Rows ingested per upload endpoint.', ['endpoint'])
+UPLOAD_ROWS_SKIPPED = Counter('upload_rows_skipped_total', 'Rows skipped per upload endpoint.', ['endpoint'])
+UPLOAD_DURATION = Histogram(
+    'upload_duration_seconds',
+    'Upload request duration per endpoint.',
+    ['endpoint'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+UPLOAD_THROUGHPUT = Histogram(
+    'upload_rows_per_second',
+    'Rows ingested per second of each upload request.',
+    ['endpoint'],
+    buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000),
+)
+MATCHER_BATCH_DURATION = Histogram(
+    'transaction_matcher_batch_duration_seconds',
+    'TransactionMatcher in-memory matching duration per platform.',
+    ['platform'],
+)
+MATCHER_PERSIST_DURATION = Histogram(
+    'transaction_matcher_persist_duration_seconds',
+    'TransactionMatcher match persistence duration per platform.',
+    ['platform'],
+)
+EXCEL_SHEET_DURATION = Histogram(
+    'excel_sheet_generation_duration_seconds',
+    'Excel export generation duration per sheet class.',
+    ['sheet'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool.',
+    ['pool'],
+    multiprocess_mode='liveall',
+)
+POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Checked-out connections beyond pool_size.',
+    ['pool'],
+    multiprocess_mode='liveall',
+)
+POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Pool checkouts.', ['pool'])
+POOL_CHECKOUT_WAITS = Counter(
+    'db_pool_checkout_waits_total',
+    'Pool checkouts that had to wait for a free connection.',
+    ['pool'],
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pool connection.',
+    ['pool'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 300),
+)
+# A checkout slower than this waited on the pool rather than just taking an idle connection
+POOL_WAIT_THRESHOLD_SECONDS = 0.001
+RESPONSE_BYTES_UNCOMPRESSED = Counter(
+    'http_response_uncompressed_bytes_total',
+    'Size of compressed response bodies before compression.',
+    ['encoding'],
+)
+RESPONSE_BYTES_COMPRESSED = Counter(
+    'http_response_compressed_bytes_total',
+    'Size of compressed response bodies as sent.',
+    ['encoding'],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    'admission_in_flight_requests',
+    'Admitted requests currently running, per workload.',
+    ['workload'],
+    multiprocess_mode='livesum',
+)
+ADMISSION_QUEUED = Gauge(
+    'admission_queued_requests',
+    'Requests waiting for a run slot, per workload.',
+    ['workload'],
+    multiprocess_mode='livesum',
+)
+ADMISSION_WAIT = Histogram(
+    'admission_wait_seconds',
+    'Time requests waited for a run slot, by outcome.',
+    ['workload', 'outcome'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+ADMISSION_REJECTED = Counter(
+    'admission_rejected_total',
+    'Requests turned away with 429, by reason (full or queue_timeout).',
+    ['workload', 'reason'],
+)
+
+
+def observe_matcher_batch(platform: str, seconds: float):
+    MATCHER_BATCH_DURATION.labels(platform=platform).observe(seconds)
+
+
+def observe_matcher_persist(platform: str, seconds: float):
+    MATCHER_PERSIST_DURATION.labels(platform=platform).observe(seconds)
+
+
+def observe_excel_sheet(sheet_class: type, seconds: float):
+    EXCEL_SHEET_DURATION.labels(sheet=sheet_class.__name__).observe(seconds)
+
+
+def observe_compression(encoding: str, uncompressed_bytes: int, compressed_bytes: int):
+    RESPONSE_BYTES_UNCOMPRESSED.labels(encoding=encoding).inc(uncompressed_bytes)
+    RESPONSE_BYTES_COMPRESSED.labels(encoding=encoding).inc(compressed_bytes)
+
+
+def observe_admission_wait(workload: str, seconds: float, admitted: bool):
+    ADMISSION_WAIT.labels(workload=workload, outcome='admitted' if admitted else 'rejected').observe(seconds)
+
+
+def observe_admission_rejected(workload: str, reason: str):
+    ADMISSION_REJECTED.labels(workload=workload, reason=reason).inc()
+
+
+def track_admission_queued(workload: str, delta: int):
+    ADMISSION_QUEUED.labels(workload=workload).inc(delta)
+
+
+def track_admission_in_flight(workload: str, delta: int):
+    ADMISSION_IN_FLIGHT.labels(workload=workload).inc(delta)
+
+
+def _upload_counts(payload: dict):
+    rows = sum(payload[key] for key in UPLOAD_ROW_KEYS if isinstance(payload.get(key), int))
+    skipped = sum(
+        value for key, value in payload.items()
+        if key.startswith(UPLOAD_SKIPPED_PREFIXES) and isinstance(value, int)
+    )
+    return rows, skipped
+
+
+def _start_request_timer():
+    g.metrics_started_at = time.perf_counter()
+
+
+def _record_request(response):
+    started_at = g.pop('metrics_started_at', None)
+    if started_at is None:
+        return response
+
+    seconds = time.perf_counter() - started_at
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    REQUEST_LATENCY.labels(
+        method=request.method,
+        blueprint=request.blueprint or '<app>',
+        route=route,
+        status=response.status_code,
+    ).observe(seconds)
+
+    if '/upload' in route and response.is_json and response.status_code < 400:
+        rows, skipped = _upload_counts(response.get_json(silent=True) or {})
+        UPLOAD_ROWS.labels(endpoint=route).inc(rows)
+        UPLOAD_ROWS_SKIPPED.labels(endpoint=route).inc(skipped)
+        UPLOAD_DURATION.labels(endpoint=route).observe(seconds)
+        if seconds > 0:
+            UPLOAD_THROUGHPUT.labels(endpoint=route).observe(rows / seconds)
+    return response
+
+
+def _watch_pool(engine, pool_label: str):
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        wait_seconds = connection_record.info.get('checkout_wait_seconds', 0.0)
+        POOL_CHECKOUTS.labels(pool=pool_label).inc()
+        POOL_CHECKOUT_WAIT.labels(pool=pool_label).observe(wait_seconds)
+        if wait_seconds > POOL_WAIT_THRESHOLD_SECONDS:
+            POOL_CHECKOUT_WAITS.labels(pool=pool_label).inc()
+        _set_pool_gauges(engine.pool, pool_label, engine.pool.checkedout())
+
+    def on_checkin(dbapi_connection, connection_record):
+        # Checkin listeners run before the pool takes the connection back
+        _set_pool_gauges(engine.pool, pool_label, engine.pool.checkedout() - 1)
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+
+
+def _set_pool_gauges(pool, pool_label: str, checked_out: int):
+    POOL_CHECKED_OUT.labels(pool=pool_label).set(checked_out)
+    POOL_OVERFLOW.labels(pool=pool_label).set(max(checked_out - pool.size(), 0))
+
+
+def mark_process_dead_on_exit():
+    """
+    For pool process initializers: drops the process's live gauge samples when
+    it exits, as gunicorn.conf.py does for workers, so /metrics and the pool
+    report stop listing its pid. Uses a multiprocessing finalizer because
+    forked pool processes exit without running atexit handlers.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        Finalize(None, multiprocess.mark_process_dead, args=(os.getpid(),), exitpriority=0)
+
+
+def _registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def worker_pool_gauges():
+    """
+    Checked-out and overflow connections per live gunicorn worker and pool,
+    as {pid: {pool: {...}}}, or None outside multiprocess mode.
+    """
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return None
+
+    gauges = {
+        'db_pool_checked_out_connections': 'checked_out',
+        'db_pool_overflow_connections': 'overflow_in_use',
+    }
+    workers = {}
+    for metric in _registry().collect():
+        field = gauges.get(metric.name)
+        if field is None:
+            continue
+        for sample in metric.samples:
+            pool = workers.setdefault(sample.labels['pid'], {}).setdefault(sample.labels['pool'], {})
+            pool[field] = int(sample.value)
+    return workers
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'msg': 'Unauthorized'}), 401
+
+    return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    app.before_request(_start_request_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if isinstance(engine.pool, QueuePool):
+                _watch_pool(engine, pool_label(bind_key))
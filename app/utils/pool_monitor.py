@@ -0,0 +1,96 @@
+import logging
+import threading
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+
+from app.extensions import db
+from app.utils.workloads import INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+_checkout_stats = {}
+_checkout_stats_lock = threading.Lock()
+
+
+def pool_label(bind_key) -> str:
+    """Engines are labelled by bind key; the default bind serves interactive requests."""
+    return bind_key or INTERACTIVE
+
+
+def _watch_checkouts(engine, label: str):
+    stats = _checkout_stats.setdefault(label, {
+        'checkouts': 0,
+        'slow_checkouts': 0,
+        'wait_seconds_total': 0.0,
+        'wait_seconds_max': 0.0,
+    })
+    slow_seconds = current_app.config['DB_POOL_SLOW_CHECKOUT_SECONDS']
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        wait_seconds = connection_record.info.get('checkout_wait_seconds', 0.0)
+        checked_out = engine.pool.checkedout()
+        with _checkout_stats_lock:
+            stats['checkouts'] += 1
+            stats['wait_seconds_total'] += wait_seconds
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], wait_seconds)
+            if wait_seconds >= slow_seconds:
+                stats['slow_checkouts'] += 1
+
+        log = logger.warning if wait_seconds >= slow_seconds else logger.debug
+        log(
+            "db_pool.checkout pool=%s wait_ms=%.1f checked_out=%s size=%s overflow=%s",
+            label,
+            wait_seconds * 1000,
+            checked_out,
+            engine.pool.size(),
+            max(checked_out - engine.pool.size(), 0),
+        )
+
+    event.listen(engine, 'checkout', on_checkout)
+
+
+def pool_usage() -> list:
+    """Live usage of this worker's pools."""
+    usage = []
+    for bind_key, engine in db.engines.items():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        label = pool_label(bind_key)
+        with _checkout_stats_lock:
+            stats = dict(_checkout_stats.get(label, {}))
+        checkouts = stats.get('checkouts', 0)
+        usage.append({
+            'pool': label,
+            'pool_size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'max_connections': pool.size() + pool._max_overflow,
+            'timeout_seconds': pool.timeout(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow_in_use': max(pool.checkedout() - pool.size(), 0),
+            'checkouts': checkouts,
+            'slow_checkouts': stats.get('slow_checkouts', 0),
+            'checkout_timeouts': getattr(pool, 'checkout_timeouts', 0),
+            'avg_wait_ms': round(stats.get('wait_seconds_total', 0.0) * 1000 / checkouts, 2) if checkouts else 0.0,
+            'max_wait_ms': round(stats.get('wait_seconds_max', 0.0) * 1000, 2),
+        })
+    return usage
+
+
+def postgres_max_connections():
+    try:
+        with db.engine.connect() as connection:
+            return int(connection.execute(text('SHOW max_connections')).scalar())
+    except Exception as e:
+        print(f"Warning: could not read max_connections: {e}")
+        return None
+
+
+def init_pool_monitor(app):
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if isinstance(engine.pool, QueuePool):
+                _watch_checkouts(engine, pool_label(bind_key))
@@ -0,0 +1,158 @@
+"""
+Per-route statement timeouts and per-request DB-time budgets.
+
+Every transaction a request opens starts with ``SET LOCAL statement_timeout``
+(the route's @statement_timeout, else the workload default), so Postgres
+cancels runaway queries even after the client has gone. Once a request has
+spent its DB-time budget, further statements are refused before they reach
+the pool. Either failure becomes a 503 naming the phase that ran out of time,
+even when the view caught the exception and returned its own 500.
+"""
+import re
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.extensions.database import RoutingSession
+from app.utils.sql_stats import current_sql_stats
+from app.utils.workloads import current_workload
+
+QUERY_CANCELED_PGCODE = '57014'
+# Plain listings should never need more than this per statement
+LISTING_STATEMENT_TIMEOUT_SECONDS = 5
+_FROM_TABLE_PATTERN = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+
+_listeners_installed = False
+_install_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised instead of running a statement once the request's DB-time budget is spent."""
+
+
+def statement_timeout(seconds: float):
+    """Caps every statement the view runs at ``seconds``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.statement_timeout_seconds = seconds
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def db_time_budget(seconds: float):
+    """Caps the total DB time the view may spend across all its statements."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.db_time_budget_seconds = seconds
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def set_db_phase(phase: str):
+    """Names the work in progress; reported if one of its statements times out."""
+    if has_app_context():
+        g.db_phase = phase
+
+
+@contextmanager
+def db_phase(phase: str):
+    previous = g.get('db_phase')
+    set_db_phase(phase)
+    try:
+        yield
+    finally:
+        g.db_phase = previous
+
+
+def _statement_timeout_seconds():
+    seconds = g.get('statement_timeout_seconds')
+    if seconds is None:
+        seconds = current_app.config['STATEMENT_TIMEOUT_SECONDS'].get(current_workload())
+    return seconds
+
+
+def _db_time_budget_seconds():
+    seconds = g.get('db_time_budget_seconds')
+    if seconds is None:
+        seconds = current_app.config['DB_TIME_BUDGET_SECONDS'].get(current_workload())
+    return seconds
+
+
+def _phase(statement: str) -> str:
+    if g.get('db_phase'):
+        return g.db_phase
+    match = _FROM_TABLE_PATTERN.search(statement or '')
+    return f"query on {match.group(1)}" if match else 'query'
+
+
+def _apply_statement_timeout(session, transaction, connection):
+    if not has_app_context() or connection.dialect.name != 'postgresql':
+        return
+    seconds = _statement_timeout_seconds()
+    if seconds:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(seconds * 1000)}")
+
+
+def _enforce_budget(conn, cursor, statement, parameters, context, executemany):
+    stats = current_sql_stats()
+    if stats is None:
+        return
+    budget = _db_time_budget_seconds()
+    if budget and stats.seconds > budget:
+        g.db_limit_failure = {
+            'error': 'Query budget exceeded',
+            'phase': _phase(statement),
+            'db_time_budget_seconds': budget,
+            'db_seconds': round(stats.seconds, 3),
+        }
+        raise QueryBudgetExceeded(
+            f"Request spent {stats.seconds:.1f}s in the database, budget is {budget}s"
+        )
+
+
+def _record_timeout(exception_context):
+    original = exception_context.original_exception
+    if not has_app_context() or getattr(original, 'pgcode', None) != QUERY_CANCELED_PGCODE:
+        return
+    g.db_limit_failure = {
+        'error': 'Query timed out',
+        'phase': _phase(exception_context.statement),
+        'statement_timeout_seconds': _statement_timeout_seconds(),
+    }
+
+
+def _limit_failure_response(response):
+    failure = g.pop('db_limit_failure', None)
+    if failure is None or response.status_code < 500:
+        return response
+
+    print(f"Warning: {failure['error']} on {request.endpoint}: {failure}")
+    limited = jsonify({**failure, 'endpoint': request.endpoint})
+    limited.status_code = 503
+    return limited
+
+
+def init_query_limits(app):
+    """Register after the response-header hooks so they report the final 503."""
+    global _listeners_installed
+    with _install_lock:
+        if not _listeners_installed:
+            event.listen(RoutingSession, 'after_begin', _apply_statement_timeout)
+            # Ahead of the SQL stats timer, so refused statements are never timed
+            event.listen(Engine, 'before_cursor_execute', _enforce_budget, insert=True)
+            event.listen(Engine, 'handle_error', _record_timeout)
+            _listeners_installed = True
+
+    app.after_request(_limit_failure_response)
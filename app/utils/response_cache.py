@@ -0,0 +1,410 @@
+"""
+Response cache for read-heavy report and listing endpoints.
+
+Responses are keyed by endpoint, normalized query string and JSON body, and
+the caller's scope (role, brands and outlets from the JWT). Each entry records
+the version of every data tag it depends on (``platform:gojek``,
+``outlet:*``, ``brand:MP78``, ``month:2025-01``); a successful upload or edit
+bumps the tags it touches, so later lookups see a newer version and miss.
+Tags are kept in the same backend as the entries, so with the filesystem or
+Redis backend an invalidation in one gunicorn worker is seen by all of them.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from tempfile import NamedTemporaryFile
+
+from flask import current_app, make_response, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+ANY = '*'
+CACHE_HEADER = 'X-Cache'
+
+# Tables behind the report endpoints, named by the upload that fills them
+REPORT_PLATFORMS = ('gojek', 'grab', 'shopee', 'shopeepay', 'tiktok', 'qpon', 'webshop', 'cash', 'manual')
+MATCH_PLATFORMS = ('gojek', 'grab', 'shopee', 'mutation')
+
+# Tags bumped when one of these endpoints succeeds
+INVALIDATED_BY_ENDPOINT = {
+    'reports.upload_report_gojek': ('platform:gojek',),
+    'reports.upload_report_grab': ('platform:grab',),
+    'reports_s3.upload_grab_report': ('platform:grab',),
+    'reports.upload_report_shopee': ('platform:shopee',),
+    'reports.upload_report_shopee_adjustment': ('platform:shopee',),
+    'reports.upload_report_shopeepay': ('platform:shopeepay',),
+    'reports.upload_report_tiktok': ('platform:tiktok',),
+    'reports.upload_report_qpon': ('platform:qpon',),
+    'reports.upload_report_webshop': ('platform:webshop',),
+    'reports.upload_voucher_report': ('platform:voucher',),
+    'reports.upload_cash_report': ('platform:cash',),
+    'reports.upload_manual_entry': ('platform:manual',),
+    'reports.upload_report_mutation': ('platform:mutation',),
+    'reports.upload_report_pkb': ('platform:mutation',),
+    'manual_entries.create_entry': ('platform:manual',),
+    'manual_entries.update_entry': ('platform:manual',),
+    'manual_entries.delete_entry': ('platform:manual',),
+    'manual_entries.import_adm_expenses': ('platform:manual',),
+    'outlet_bp.create_outlet': ('outlet', 'brand'),
+    'outlet_bp.update_outlet': ('outlet', 'brand'),
+    'outlet_bp.delete_outlet': ('outlet', 'brand'),
+    'outlet_bp.update_outlet_rekening_id': ('outlet',),
+    'outlet_bp.clear_outlet_rekening_id': ('outlet',),
+    'outlet_bp.set_outlet_closing_platforms': ('outlet',),
+    'outlet_bp.toggle_outlet_closing_platform': ('outlet',),
+    'admin_tools.apply_outlet_codes_from_excel': ('outlet',),
+    'admin_tools.backfill_shopee_store_id_suffixes': ('outlet',),
+    'partner_bp.create_partner': ('outlet',),
+    'partner_bp.update_partner': ('outlet',),
+    'partner_bp.delete_partner': ('outlet',),
+    'product_bp.create_product': ('brand',),
+    'product_bp.update_product': ('brand',),
+    'product_bp.delete_product': ('brand',),
+    'rekening_bp.create_rekening': ('outlet',),
+    'rekening_bp.update_rekening': ('outlet',),
+    'rekening_bp.delete_rekening': ('outlet',),
+}
+
+
+def scoped_tag(domain: str, value) -> str:
+    """``domain:value``, or ``domain:*`` for requests covering every value ('', 'ALL')."""
+    if value is None or str(value).strip().upper() in ('', 'ALL'):
+        return f"{domain}:{ANY}"
+    return f"{domain}:{value}"
+
+
+def platform_tags(platforms) -> list:
+    return [f"platform:{platform}" for platform in platforms]
+
+
+def month_tags(start_date, end_date) -> list:
+    """One tag per calendar month in the range; ``month:*`` when it is missing or malformed."""
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return [f"month:{ANY}"]
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month) and len(months) < 36:
+        months.append(f"month:{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months or [f"month:{ANY}"]
+
+
+def _dependencies(tags) -> set:
+    """An entry also depends on each tag's domain, so a domain-wide bump reaches it."""
+    dependencies = set()
+    for tag in tags:
+        dependencies.add(tag)
+        dependencies.add(tag.split(':', 1)[0])
+    return dependencies
+
+
+def _bumped(tags) -> set:
+    """A specific value also bumps ``domain:*``, which entries covering every value depend on."""
+    bumped = set()
+    for tag in tags:
+        bumped.add(tag)
+        domain, _, value = tag.partition(':')
+        if value and value != ANY:
+            bumped.add(f"{domain}:{ANY}")
+    return bumped
+
+
+class LocalResponseCache:
+    """Entries and tag versions in process memory, least-recently-used first out."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def tag_versions(self, tags) -> dict:
+        with self._lock:
+            return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class FileResponseCache:
+    """
+    Entries as JSON files in a directory shared by all workers, oldest written
+    first out once there are more than max_entries. Tag versions live in one
+    JSON file updated under an exclusive lock.
+    """
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries_dir = os.path.join(directory, 'entries')
+        self._tags_path = os.path.join(directory, 'tags.json')
+        self._lock_path = os.path.join(directory, 'tags.lock')
+        os.makedirs(self._entries_dir, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self._entries_dir, f"{key}.json"), encoding='utf-8') as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry: dict):
+        with NamedTemporaryFile('w', dir=self._entries_dir, suffix='.tmp', delete=False, encoding='utf-8') as tmp:
+            json.dump(entry, tmp)
+        os.replace(tmp.name, os.path.join(self._entries_dir, f"{key}.json"))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self._entries_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                entries.append((os.stat(os.path.join(self._entries_dir, name)).st_mtime, name))
+            except OSError:
+                continue
+        for _, name in sorted(entries)[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(os.path.join(self._entries_dir, name))
+            except OSError:
+                pass
+
+    def _read_versions(self) -> dict:
+        try:
+            with open(self._tags_path, encoding='utf-8') as tags_file:
+                return json.load(tags_file)
+        except (OSError, ValueError):
+            return {}
+
+    def tag_versions(self, tags) -> dict:
+        versions = self._read_versions()
+        return {tag: versions.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        with open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                versions = self._read_versions()
+                for tag in tags:
+                    versions[tag] = versions.get(tag, 0) + 1
+                with NamedTemporaryFile('w', dir=self.directory, suffix='.tmp', delete=False, encoding='utf-8') as tmp:
+                    json.dump(versions, tmp)
+                os.replace(tmp.name, self._tags_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class RedisResponseCache:
+    """Entries and tag counters in a Redis-compatible store; Redis expires and evicts entries."""
+
+    def __init__(self, client, prefix: str = 'response-cache'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(f"{self.prefix}:entry:{key}")
+        return json.loads(raw) if raw else None
+
+    def put(self, key, entry: dict):
+        ttl = max(int(entry['expires_at'] - time.time()), 1)
+        self.client.set(f"{self.prefix}:entry:{key}", json.dumps(entry), ex=ttl)
+
+    def tag_versions(self, tags) -> dict:
+        tags = list(tags)
+        values = self.client.mget([f"{self.prefix}:tag:{tag}" for tag in tags]) if tags else []
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def bump(self, tags):
+        pipeline = self.client.pipeline()
+        for tag in tags:
+            pipeline.incr(f"{self.prefix}:tag:{tag}")
+        pipeline.execute()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Builds the configured backend once per process; returns None when caching is off."""
+    global _cache
+    backend = current_app.config['RESPONSE_CACHE_BACKEND']
+    if backend == 'none':
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            max_entries = current_app.config['RESPONSE_CACHE_MAX_ENTRIES']
+            if backend == 'redis':
+                try:
+                    import redis
+                    _cache = RedisResponseCache(redis.Redis.from_url(current_app.config['RESPONSE_CACHE_REDIS_URL']))
+                except Exception as e:
+                    print(f"Warning: Redis response cache unavailable, using the filesystem instead: {e}")
+            elif backend == 'local':
+                _cache = LocalResponseCache(max_entries)
+            if _cache is None:
+                _cache = FileResponseCache(current_app.config['RESPONSE_CACHE_DIR'], max_entries)
+        return _cache
+
+
+def invalidate_tags(tags):
+    """Makes every cached response depending on one of ``tags`` stale, in every worker sharing the backend."""
+    cache = get_response_cache()
+    if cache is None or not tags:
+        return
+    try:
+        cache.bump(sorted(_bumped(tags)))
+    except Exception as e:
+        print(f"Warning: failed to invalidate cached responses for {sorted(tags)}: {e}")
+
+
+def _scope() -> str:
+    """Callers with the same role, brands and outlets see the same responses."""
+    try:
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt()
+    except Exception:
+        claims = {}
+    if not claims:
+        return 'public'
+    return json.dumps([
+        claims.get('role'),
+        sorted(claims.get('brand_ids') or []),
+        sorted(claims.get('outlet_ids') or []),
+    ])
+
+
+def request_fingerprint() -> str:
+    """Identifies a request by endpoint, normalized query string and JSON body, and caller scope."""
+    body = request.get_json(silent=True) if request.method != 'GET' else None
+    raw = json.dumps([
+        request.endpoint,
+        sorted((name, sorted(values)) for name, values in request.args.lists()),
+        body,
+        _scope(),
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _entry_writer(cache, key: str, entry: dict, endpoint: str):
+    """Stores the body with ``entry``; needs no request context, so it can run after a stream ends."""
+    def store(body: str):
+        try:
+            cache.put(key, {**entry, 'body': body})
+        except Exception as e:
+            print(f"Warning: failed to cache response for {endpoint}: {e}")
+
+    return store
+
+
+def _store_when_complete(chunks, store, max_bytes: int):
+    """Passes a streamed body through and caches it once complete, unless it outgrows max_bytes."""
+    buffered, size = [], 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if buffered is not None:
+                size += len(chunk)
+                if size <= max_bytes:
+                    buffered.append(chunk)
+                else:
+                    buffered = None
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+    if buffered is not None:
+        store(b''.join(buffered).decode())
+
+
+def cached_response(tags, ttl_seconds: float | None = None):
+    """
+    Serves the view's 200 responses from the response cache until a tag it
+    depends on is invalidated or ``ttl_seconds`` (RESPONSE_CACHE_TTL_SECONDS)
+    pass. ``tags`` is called inside the request and returns the data tags.
+    ``Cache-Control: no-cache`` recomputes and stores a fresh response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None:
+                response = make_response(view(*args, **kwargs))
+                response.headers[CACHE_HEADER] = 'BYPASS'
+                return response
+
+            key = request_fingerprint()
+            dependencies = sorted(_dependencies(tags()))
+            try:
+                # Read before the view runs, so a write landing mid-request leaves the entry stale
+                versions = cache.tag_versions(dependencies)
+                entry = None if 'no-cache' in request.headers.get('Cache-Control', '') else cache.get(key)
+            except Exception as e:
+                print(f"Warning: response cache unavailable for {request.endpoint}: {e}")
+                return make_response(view(*args, **kwargs))
+
+            if entry is not None and entry['expires_at'] > time.time() and entry['tags'] == versions:
+                response = current_app.response_class(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+                response.headers[CACHE_HEADER] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                ttl = ttl_seconds if ttl_seconds is not None else current_app.config['RESPONSE_CACHE_TTL_SECONDS']
+                entry = {
+                    'status': response.status_code,
+                    'mimetype': response.mimetype,
+                    'tags': versions,
+                    'expires_at': time.time() + ttl,
+                }
+                store = _entry_writer(cache, key, entry, request.endpoint)
+                if response.is_streamed:
+                    response.response = _store_when_complete(
+                        response.response, store, current_app.config['RESPONSE_CACHE_MAX_BODY_BYTES']
+                    )
+                else:
+                    store(response.get_data(as_text=True))
+            response.headers[CACHE_HEADER] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _invalidate_after_write(response):
+    tags = INVALIDATED_BY_ENDPOINT.get(request.endpoint)
+    if tags and response.status_code < 400:
+        invalidate_tags(tags)
+    return response
+
+
+def init_response_cache(app):
+    app.after_request(_invalidate_after_write)
@@ -0,0 +1,138 @@
+"""
+Single-flight coalescing of identical heavy computations across workers.
+
+The first request for a key takes an exclusive file lock and computes; the
+same key arriving in any gunicorn worker while that runs waits on the lock
+and is answered from the result the first one leaves next to it. Results are
+only shared with requests that were already waiting, so nothing is served
+from a computation that finished before the request arrived.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+from tempfile import NamedTemporaryFile
+
+from flask import current_app
+
+from app.extensions import db
+from app.utils.admission import claim_run_slot
+
+LEADER = 'LEADER'
+SHARED = 'SHARED'
+# Results are kept this long for waiters that are slow to wake up
+RESULT_RETENTION_SECONDS = 10 * 60
+LOCK_POLL_SECONDS = 0.1
+
+
+def _paths(key: str):
+    directory = current_app.config['SINGLE_FLIGHT_DIR']
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, hashlib.sha256(key.encode()).hexdigest())
+    return f"{base}.lock", f"{base}.bin", f"{base}.json"
+
+
+def _acquire(lock_file, wait_seconds: float) -> bool:
+    """Returns False if the lock was free, True once it was released by another holder."""
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        pass
+
+    # Waiters give their connection back instead of sitting idle in a transaction
+    db.session.rollback()
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError
+            time.sleep(LOCK_POLL_SECONDS)
+
+
+def _read_result(body_path: str, meta_path: str, since: float):
+    try:
+        with open(meta_path, encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('completed_at', 0) < since:
+        return None
+    if not meta.get('has_body'):
+        return None, meta['meta']
+    try:
+        return open(body_path, 'rb'), meta['meta']
+    except OSError:
+        return None
+
+
+def _write_result(body_path: str, meta_path: str, fileobj, meta: dict):
+    directory = os.path.dirname(body_path)
+    if fileobj is not None:
+        with NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as tmp:
+            shutil.copyfileobj(fileobj, tmp, 1024 * 1024)
+        os.replace(tmp.name, body_path)
+        fileobj.seek(0)
+    with NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False, encoding='utf-8') as tmp:
+        json.dump({'completed_at': time.time(), 'has_body': fileobj is not None, 'meta': meta}, tmp)
+    # Written last: the metadata marks the result complete
+    os.replace(tmp.name, meta_path)
+
+
+def _sweep(directory: str):
+    cutoff = time.time() - RESULT_RETENTION_SECONDS
+    for name in os.listdir(directory):
+        if not name.endswith(('.bin', '.json')):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def coalesce(key: str, compute, wait_seconds: float | None = None):
+    """
+    Returns (file object or None, meta dict, LEADER or SHARED). ``compute``
+    returns the same (file object or None, JSON-serializable meta) pair and is
+    only called when no identical computation was running, after the request
+    has claimed its admission run slot. A waiter that times out, or whose
+    leader failed, computes on its own. Waiters hold no run slot while waiting.
+    """
+    if wait_seconds is None:
+        wait_seconds = current_app.config['SINGLE_FLIGHT_WAIT_SECONDS']
+    lock_path, body_path, meta_path = _paths(key)
+    waiting_since = time.time()
+
+    with open(lock_path, 'a') as lock_file:
+        try:
+            waited = _acquire(lock_file, wait_seconds)
+        except TimeoutError:
+            print(f"Warning: gave up waiting {wait_seconds}s for an identical computation, computing again")
+            claim_run_slot()
+            fileobj, meta = compute()
+            return fileobj, meta, LEADER
+
+        try:
+            if waited:
+                shared = _read_result(body_path, meta_path, waiting_since)
+                if shared is not None:
+                    fileobj, meta = shared
+                    return fileobj, meta, SHARED
+
+            claim_run_slot()
+            fileobj, meta = compute()
+            try:
+                _write_result(body_path, meta_path, fileobj, meta)
+                _sweep(os.path.dirname(lock_path))
+            except Exception as e:
+                print(f"Warning: could not share result for waiting requests: {e}")
+            return fileobj, meta, LEADER
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,263 @@
+"""
+Slow query log.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are appended to a JSON-lines
+log shared by all workers (SLOW_QUERY_LOG_PATH) with their normalized SQL, redacted parameters,
+route, duration and an EXPLAIN (FORMAT JSON) plan. The plan is taken on the
+same connection inside a savepoint, so it sees the request's snapshot and a
+failing EXPLAIN cannot abort the request's transaction. Each statement shape
+is explained at most once per SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS per worker.
+Once the log passes SLOW_QUERY_LOG_MAX_BYTES it is rotated to ``<path>.1``,
+so appends never re-read it; readers see the last SLOW_QUERY_LOG_MAX_ENTRIES
+entries of both files.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.sql_stats import normalize_statement
+
+EXPLAIN_MODES = ('off', 'plan', 'analyze')
+EXPLAIN_SAVEPOINT = 'slow_query_explain'
+# Keep at most this much plan JSON per entry
+MAX_PLAN_CHARS = 200_000
+
+_settings = {}
+_explained_at = {}
+_explained_lock = threading.Lock()
+_listeners_installed = False
+_install_lock = threading.Lock()
+
+
+def _redact(value):
+    """Keeps numbers, dates and flags (useful to reproduce a plan); hides text."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_redact(item) for item in value]
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def _redact_parameters(parameters, executemany: bool):
+    if executemany:
+        return {'executemany_rows': len(parameters or [])}
+    if isinstance(parameters, dict):
+        return {key: _redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(value) for value in parameters]
+    return None
+
+
+def _fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _should_explain(fingerprint: str) -> bool:
+    now = time.monotonic()
+    with _explained_lock:
+        if now - _explained_at.get(fingerprint, float('-inf')) < _settings['explain_interval_seconds']:
+            return False
+        _explained_at[fingerprint] = now
+        return True
+
+
+def _explain(conn, cursor, statement, parameters):
+    """Returns (plan, error) from EXPLAIN run on the statement's own connection."""
+    mode = _settings['explain']
+    is_select = statement.lstrip().lower().startswith(('select', 'with'))
+    if mode == 'analyze' and is_select:
+        # ANALYZE runs the query again, so it is never used for writes
+        options = 'ANALYZE, BUFFERS, FORMAT JSON'
+    else:
+        options = 'FORMAT JSON'
+
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            explain_cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+            plan = explain_cursor.fetchone()[0]
+            explain_cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        except Exception as e:
+            explain_cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            return None, str(e)
+    except Exception as e:
+        return None, str(e)
+    finally:
+        explain_cursor.close()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    if len(json.dumps(plan)) > MAX_PLAN_CHARS:
+        return None, 'plan too large to store'
+    return plan, None
+
+
+def _lock_path() -> str:
+    return _settings['path'] + '.lock'
+
+
+def _rotated_path() -> str:
+    return _settings['path'] + '.1'
+
+
+def _append(entry: dict):
+    path = _settings['path']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = json.dumps(entry, default=str) + '\n'
+
+    # Rotation renames the log, so writers serialize on a separate lock file
+    with open(_lock_path(), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(path, 'a', encoding='utf-8') as log_file:
+                log_file.write(line)
+                size = log_file.tell()
+            if size > _settings['max_bytes']:
+                os.replace(path, _rotated_path())
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _settings and context is not None:
+        context.slow_query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, 'slow_query_started_at', None)
+    if started_at is None:
+        return
+    duration_ms = (time.perf_counter() - started_at) * 1000
+    if duration_ms < _settings['threshold_ms']:
+        return
+
+    try:
+        normalized = normalize_statement(statement)
+        fingerprint = _fingerprint(normalized)
+        plan, explain_error = None, None
+        if (
+            _settings['explain'] != 'off'
+            and not executemany
+            and conn.dialect.name == 'postgresql'
+            and _should_explain(fingerprint)
+        ):
+            plan, explain_error = _explain(conn, cursor, statement, parameters)
+
+        _append({
+            'captured_at': datetime.now(timezone.utc).isoformat(),
+            'fingerprint': fingerprint,
+            'statement': normalized,
+            'parameters': _redact_parameters(parameters, executemany),
+            'route': request.endpoint if has_request_context() else 'background',
+            'duration_ms': round(duration_ms, 1),
+            'plan': plan,
+            'explain_error': explain_error,
+        })
+    except Exception as e:
+        print(f"Warning: could not record slow query: {e}")
+
+
+def read_slow_queries() -> list:
+    path = _settings.get('path')
+    if not path or not os.path.exists(os.path.dirname(path)):
+        return []
+    lines = []
+    with open(_lock_path(), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH)
+        try:
+            for log_path in (_rotated_path(), path):
+                try:
+                    with open(log_path, encoding='utf-8') as log_file:
+                        lines.extend(log_file.readlines())
+                except FileNotFoundError:
+                    continue
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    entries = []
+    for line in lines[-_settings['max_entries']:]:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def top_slow_queries(limit: int = 20, include_plans: bool = False) -> list:
+    """Statement shapes from the ring buffer, by total time spent, slowest first."""
+    groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'routes': set()})
+    for entry in read_slow_queries():
+        group = groups[entry['fingerprint']]
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['routes'].add(entry['route'])
+        group['statement'] = entry['statement']
+        group['last_seen'] = entry['captured_at']
+        group['last_parameters'] = entry['parameters']
+        if entry.get('plan') is not None:
+            group['plan'] = entry['plan']
+            group['plan_captured_at'] = entry['captured_at']
+
+    offenders = []
+    for fingerprint, group in groups.items():
+        plan = group.pop('plan', None)
+        offender = {
+            **group,
+            'fingerprint': fingerprint,
+            'routes': sorted(group['routes']),
+            'total_ms': round(group['total_ms'], 1),
+            'avg_ms': round(group['total_ms'] / group['count'], 1),
+        }
+        if plan is not None:
+            root = plan[0].get('Plan', {}) if isinstance(plan, list) and plan else {}
+            offender['plan_summary'] = {
+                'node_type': root.get('Node Type'),
+                'total_cost': root.get('Total Cost'),
+                'plan_rows': root.get('Plan Rows'),
+                'actual_total_time': root.get('Actual Total Time'),
+            }
+            if include_plans:
+                offender['plan'] = plan
+        offenders.append(offender)
+
+    offenders.sort(key=lambda item: item['total_ms'], reverse=True)
+    return offenders[:limit]
+
+
+def init_slow_query_log(app):
+    global _listeners_installed
+    explain = app.config['SLOW_QUERY_EXPLAIN']
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"SLOW_QUERY_EXPLAIN must be one of {', '.join(EXPLAIN_MODES)}")
+    _settings.update(
+        threshold_ms=app.config['SLOW_QUERY_THRESHOLD_MS'],
+        path=app.config['SLOW_QUERY_LOG_PATH'],
+        max_entries=app.config['SLOW_QUERY_LOG_MAX_ENTRIES'],
+        max_bytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+        explain=explain,
+        explain_interval_seconds=app.config['SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS'],
+    )
+
+    with _install_lock:
+        if not _listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners_installed = True
@@ -0,0 +1,143 @@
+import json
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Literals and bound parameters collapse to "?" so per-row queries share one shape
+_PARAM_PATTERN = re.compile(r"%\(\w+\)s|\?|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+TOP_STATEMENTS = 3
+
+_listeners_installed = False
+_install_lock = threading.Lock()
+
+
+class NPlusOneError(RuntimeError):
+    """Raised in 'raise' mode when one statement shape repeats past the threshold."""
+
+
+def normalize_statement(statement: str) -> str:
+    statement = _PARAM_PATTERN.sub('?', statement)
+    statement = _IN_LIST_PATTERN.sub('(?+)', statement)
+    return _WHITESPACE_PATTERN.sub(' ', statement).strip()
+
+
+class SqlStats:
+    """Queries issued within one app context (a request or a background job)."""
+
+    def __init__(self, threshold: int, mode: str):
+        self.threshold = threshold
+        self.mode = mode
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.flagged = set()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        shape = normalize_statement(statement)
+        self.shapes[shape] += 1
+
+        repeats = self.shapes[shape]
+        if self.mode == 'off' or repeats <= self.threshold or shape in self.flagged:
+            return
+        self.flagged.add(shape)
+        message = f"Possible N+1: statement repeated {repeats} times in one request: {shape[:300]}"
+        if self.mode == 'raise':
+            raise NPlusOneError(message)
+        print(f"Warning: {message}")
+
+    def top_statements(self):
+        return [
+            {'count': count, 'statement': shape[:300]}
+            for shape, count in self.shapes.most_common(TOP_STATEMENTS)
+        ]
+
+
+def current_sql_stats():
+    return g.get('sql_stats') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context so a failed statement leaves nothing behind
+    if context is not None and current_sql_stats() is not None:
+        context.sql_stats_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_sql_stats()
+    started_at = getattr(context, 'sql_stats_started_at', None)
+    if stats is None or started_at is None:
+        return
+    stats.record(statement, time.perf_counter() - started_at)
+
+
+def _start_request_stats():
+    g.request_started_at = time.perf_counter()
+    g.sql_stats = SqlStats(
+        current_app.config['SQL_N_PLUS_ONE_THRESHOLD'],
+        current_app.config['SQL_N_PLUS_ONE_MODE'],
+    )
+
+
+def _log_request_stats(stats, method, path, status, started_at):
+    if not stats.count:
+        return
+    print('sql_stats ' + json.dumps({
+        'method': method,
+        'path': path,
+        'status': status,
+        'queries': stats.count,
+        'db_ms': round(stats.seconds * 1000, 1),
+        'total_ms': round((time.perf_counter() - started_at) * 1000, 1),
+        'top_statements': stats.top_statements(),
+    }))
+
+
+def _report_request_stats(response):
+    # A streamed body runs its queries after this hook, so its stats stay on g
+    # (keeping the N+1 check active) and are logged once the stream is closed
+    stats = g.get('sql_stats') if response.is_streamed else g.pop('sql_stats', None)
+    if stats is None:
+        return response
+
+    started_at = g.get('request_started_at', time.perf_counter())
+    db_ms = stats.seconds * 1000
+    total_ms = (time.perf_counter() - started_at) * 1000
+    # For streamed responses these only cover the queries run before the first byte
+    response.headers['X-DB-Queries'] = str(stats.count)
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={db_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}',
+    )
+
+    log_args = (stats, request.method, request.path, response.status_code, started_at)
+    if response.is_streamed:
+        response.call_on_close(lambda: _log_request_stats(*log_args))
+    else:
+        _log_request_stats(*log_args)
+    return response
+
+
+def init_sql_stats(app):
+    """
+    Counts and times every statement per request via cursor execute events
+    on all engines (primary and replica), adds Server-Timing / X-DB-Queries
+    headers and prints one sql_stats JSON line per request that hit the DB.
+    """
+    global _listeners_installed
+    with _install_lock:
+        if not _listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners_installed = True
+
+    app.before_request(_start_request_stats)
+    app.after_request(_report_request_stats)
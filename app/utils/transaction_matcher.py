@@ -1,13 +1,16 @@
 from datetime import timedelta
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import multiprocessing
 import time
 from app.models.daily_merchant_totals import DailyMerchantTotal
 from app.models.bank_mutations import BankMutation
 from app.models.outlet import Outlet
 from app.models.transaction_match import TransactionMatch
 from app.extensions import db
+from app.utils.metrics import mark_process_dead_on_exit, observe_matcher_batch, observe_matcher_persist
 from sqlalchemy import and_, or_
 
 logger = logging.getLogger(__name__)
@@ -91,26 +94,29 @@ class TransactionMatcher:
         )
 
         if platform_code:
-            # For platform code filtering, we need to handle each platform differently
-            outlets = db.session.query(Outlet)
-            if self.platform == 'shopee' or self.platform == 'shopeepay':
-                # For Shopee, match the last 5 digits
-                outlets = outlets.filter(
-                    db.func.right(getattr(Outlet, self.config['store_id_field']), 5) == 
-                    db.func.right(platform_code, 5)
-                )
-            else:
-                # For other platforms, exact match
-                outlets = outlets.filter(
-                    getattr(Outlet, self.config['store_id_field']) == platform_code
-                )
-            
-            outlet_codes = [o.outlet_code for o in outlets.all()]
+            outlet_codes = self.outlet_codes_for_platform_code(platform_code)
             if outlet_codes:
                 query = query.filter(DailyMerchantTotal.outlet_id.in_(outlet_codes))
 
         return query
 
+    def outlet_codes_for_platform_code(self, platform_code: str) -> List[str]:
+        """Outlet codes whose store id for this platform matches platform_code"""
+        # For platform code filtering, we need to handle each platform differently
+        outlets = db.session.query(Outlet.outlet_code)
+        if self.platform == 'shopee' or self.platform == 'shopeepay':
+            # For Shopee, match the last 5 digits via the indexed suffix column
+            outlets = outlets.filter(
+                Outlet.store_id_shopee_suffix5 == platform_code.strip()[-5:]
+            )
+        else:
+            # For other platforms, exact match
+            outlets = outlets.filter(
+                getattr(Outlet, self.config['store_id_field']) == platform_code
+            )
+
+        return [row.outlet_code for row in outlets.all()]
+
     def get_mutations_query(self, start_date: str, end_date: str) -> db.Query:
         date_offset = timedelta(days=self.config['days_offset'])
         return db.session.query(BankMutation).filter(
@@ -119,12 +125,35 @@ class TransactionMatcher:
             BankMutation.tanggal <= end_date + date_offset
         )
 
+    def get_outlet_mutations_query(self, outlet: Outlet, report_dates) -> db.Query:
+        """
+        Mutations that can match the outlet on the given report dates.
+
+        Code-matched platforms are narrowed to the outlet's platform codes;
+        Grab mutations carry no outlet code, so only the dates narrow them.
+        """
+        date_offset = timedelta(days=self.config['days_offset'])
+        query = db.session.query(BankMutation).filter(
+            BankMutation.platform_name == self.config['platform_name'],
+            BankMutation.tanggal.in_(sorted({report_date + date_offset for report_date in report_dates})),
+        )
+        if self.platform != 'grab':
+            query = query.filter(BankMutation.platform_code.in_(self._outlet_platform_codes(outlet)))
+        return query
+
     def build_match_context(
         self,
         daily_totals: List[DailyMerchantTotal] = None,
         mutations: List[BankMutation] = None,
         outlet_codes: List[str] = None,
+        outlets_by_code: Dict[str, Outlet] = None,
     ) -> Dict:
+        """
+        Index mutations and outlets for matching.
+
+        Pass outlets_by_code to reuse outlets that were already loaded; the
+        context is then built without touching the database.
+        """
         daily_totals = daily_totals or []
         mutations = mutations or []
         outlet_codes_set = {str(code) for code in (outlet_codes or []) if code}
@@ -134,11 +163,19 @@ class TransactionMatcher:
             if getattr(total, 'outlet_id', None)
         )
 
-        outlets = []
-        if outlet_codes_set:
-            outlets = db.session.query(Outlet).filter(
-                Outlet.outlet_code.in_(sorted(outlet_codes_set))
-            ).all()
+        if outlets_by_code is None:
+            outlets = []
+            if outlet_codes_set:
+                outlets = db.session.query(Outlet).filter(
+                    Outlet.outlet_code.in_(sorted(outlet_codes_set))
+                ).all()
+            outlets_by_code = {outlet.outlet_code: outlet for outlet in outlets}
+        else:
+            outlets_by_code = {
+                code: outlets_by_code[code]
+                for code in outlet_codes_set
+                if code in outlets_by_code
+            }
 
         mutations_by_date_code = defaultdict(list)
         mutations_by_date = defaultdict(list)
@@ -150,7 +187,11 @@ class TransactionMatcher:
             mutations_by_data[self._mutation_data_identity(mutation)] = mutation
 
         return {
-            'outlets_by_code': {outlet.outlet_code: outlet for outlet in outlets},
+            'outlets_by_code': outlets_by_code,
+            'platform_codes_by_outlet': {
+                code: self._outlet_platform_codes(outlet)
+                for code, outlet in outlets_by_code.items()
+            },
             'mutations_by_date_code': mutations_by_date_code,
             'mutations_by_date': mutations_by_date,
             'mutations_by_data': mutations_by_data,
@@ -172,20 +213,17 @@ class TransactionMatcher:
             'transaction_amount': float(mutation.transaction_amount or 0.0)
         }
 
-    def _find_code_match(self, context: Dict, match_date, store_id: str):
-        if not store_id:
-            return None
-
+    def _outlet_platform_codes(self, outlet: Outlet) -> Tuple[str, ...]:
         if self.platform in ('shopee', 'shopeepay'):
-            store_id = store_id.strip()
-            platform_codes = [store_id[-4:], store_id[-5:]]
-        else:
-            platform_codes = [store_id]
+            return tuple(code for code in outlet.shopee_platform_codes() if code)
+
+        store_id = (getattr(outlet, self.config['store_id_field']) or '').strip()
+        return (store_id,) if store_id else ()
 
+    def _find_code_match(self, context: Dict, match_date, outlet_code: str):
+        platform_codes = context['platform_codes_by_outlet'].get(outlet_code, ())
         for platform_code in platform_codes:
-            if not platform_code:
-                continue
-            mutations = context['mutations_by_date_code'].get((match_date, platform_code.strip()))
+            mutations = context['mutations_by_date_code'].get((match_date, platform_code))
             if mutations:
                 return mutations[0]
         return None
@@ -200,7 +238,6 @@ class TransactionMatcher:
         if not outlet:
             return None, None
 
-        store_id = getattr(outlet, self.config['store_id_field'])
         outlet_name = getattr(outlet, self.config['outlet_name_field'])
         
         platform_data = {
@@ -226,7 +263,7 @@ class TransactionMatcher:
                 return platform_data, self._mutation_data(mutation)
         else:
             # Platform-specific logic for Shopee/Gojek
-            mutation = self._find_code_match(context, match_date, store_id)
+            mutation = self._find_code_match(context, match_date, str(daily_total.outlet_id))
             # print(f"[DEBUG] Gojek match trial: store_id={store_id}, match_date={match_date}")
             # for m in mutations:
             #     if m.tanggal == match_date:
@@ -246,7 +283,17 @@ class TransactionMatcher:
         ).all()
         mutations = self.get_mutations_query(start_date, end_date).all()
         context = self.build_match_context(daily_totals, mutations)
+        return self.match_preloaded(daily_totals, mutations, context, start_date, end_date, platform_code)
+
+    def match_preloaded(self, daily_totals, mutations, context: Dict, start_date=None, end_date=None,
+        platform_code: str = None) -> Dict:
+        """
+        Match already loaded daily totals and mutations.
 
+        Runs without database access once the context is built, so several
+        platforms can be matched from the same loads before anything is persisted.
+        """
+        started_at = time.perf_counter()
         results = []
         matched_mutation_ids = set()
         matched_mutation_keys = set()
@@ -291,6 +338,7 @@ class TransactionMatcher:
             unmatched_platform_count,
             unmatched_mutation_count,
         )
+        observe_matcher_batch(self.platform, time.perf_counter() - started_at)
 
         return {
             'daily_totals': daily_totals,
@@ -298,6 +346,7 @@ class TransactionMatcher:
             'results': results,
             'matched_mutation_ids': matched_mutation_ids,
             'matched_mutation_keys': matched_mutation_keys,
+            'unmatched_mutation_count': unmatched_mutation_count,
         }
 
     def _manual_match_scope(self, batch_result: Dict) -> Dict:
@@ -334,7 +383,13 @@ class TransactionMatcher:
                 mutation_ids.add(row.mutation_id)
         return {'daily_keys': daily_keys, 'mutation_ids': mutation_ids}
 
-    def persist_matches(self, batch_result: Dict, start_date=None, end_date=None, include_unmatched_mutations: bool = True) -> Dict:
+    def persist_matches(self, batch_result: Dict, start_date=None, end_date=None, include_unmatched_mutations: bool = True,
+        commit: bool = True) -> Dict:
+        """
+        Replace the automatic match rows for the batch's range. With commit=False
+        the caller commits, so mutations loaded for other platforms are not
+        expired (and reloaded row by row) between platforms.
+        """
         started_at = time.perf_counter()
         daily_totals = batch_result['daily_totals']
         mutations = batch_result['mutations']
@@ -430,7 +485,8 @@ class TransactionMatcher:
 
         if matches:
             db.session.bulk_save_objects(matches)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         duration_seconds = time.perf_counter() - started_at
         logger.info(
             "transaction_matcher.persist platform=%s inserted=%s preserved_manual_daily=%s "
@@ -442,6 +498,7 @@ class TransactionMatcher:
             include_unmatched_mutations,
             duration_seconds,
         )
+        observe_matcher_persist(self.platform, duration_seconds)
         return {
             'inserted': len(matches),
             'preserved_manual': len(manual_scope['daily_keys']) + len(manual_scope['mutation_ids']),
@@ -518,10 +575,276 @@ class TransactionMatcher:
         if not outlet:
             return None
 
-        store_id = getattr(outlet, self.config['store_id_field'])
         match_date = transaction_date + timedelta(days=self.config['days_offset'])
-        mutation = self._find_code_match(context, match_date, store_id)
+        mutation = self._find_code_match(context, match_date, str(outlet_code))
         if not mutation:
             return None
 
         return self._mutation_data(mutation)
+
+
+def load_platform_batch_inputs(platforms: List[str], start_date, end_date, platform_codes: Dict[str, str] = None) -> Dict:
+    """
+    Load daily totals and mutations for several platforms with one query each.
+
+    Daily totals are partitioned by report_type and mutations by platform_name,
+    so every platform gets the same rows match_batch would have loaded.
+    """
+    platform_codes = platform_codes or {}
+    matchers = {platform: TransactionMatcher(platform) for platform in platforms}
+
+    daily_totals_query = db.session.query(
+        DailyMerchantTotal.outlet_id,
+        DailyMerchantTotal.date,
+        DailyMerchantTotal.report_type,
+        DailyMerchantTotal.total_gross,
+        DailyMerchantTotal.total_net
+    ).filter(
+        DailyMerchantTotal.date >= start_date,
+        DailyMerchantTotal.date <= end_date,
+    )
+    report_type_filters = []
+    for platform, matcher in matchers.items():
+        outlet_codes = None
+        if platform_codes.get(platform):
+            outlet_codes = matcher.outlet_codes_for_platform_code(platform_codes[platform])
+        if outlet_codes:
+            report_type_filters.append(and_(
+                DailyMerchantTotal.report_type == platform,
+                DailyMerchantTotal.outlet_id.in_(outlet_codes),
+            ))
+        else:
+            report_type_filters.append(DailyMerchantTotal.report_type == platform)
+    daily_totals = daily_totals_query.filter(or_(*report_type_filters)).order_by(DailyMerchantTotal.date).all()
+
+    platforms_by_name = {matcher.config['platform_name']: platform for platform, matcher in matchers.items()}
+    mutation_filters = []
+    for matcher in matchers.values():
+        date_offset = timedelta(days=matcher.config['days_offset'])
+        mutation_filters.append(and_(
+            BankMutation.platform_name == matcher.config['platform_name'],
+            BankMutation.tanggal >= start_date + date_offset,
+            BankMutation.tanggal <= end_date + date_offset,
+        ))
+    mutations = db.session.query(BankMutation).filter(or_(*mutation_filters)).all()
+
+    daily_totals_by_platform = {platform: [] for platform in platforms}
+    for total in daily_totals:
+        daily_totals_by_platform[total.report_type].append(total)
+
+    mutations_by_platform = {platform: [] for platform in platforms}
+    for mutation in mutations:
+        mutations_by_platform[platforms_by_name[mutation.platform_name]].append(mutation)
+
+    outlet_codes = sorted({str(total.outlet_id) for total in daily_totals if total.outlet_id})
+    outlets_by_code = {}
+    if outlet_codes:
+        outlets_by_code = {
+            outlet.outlet_code: outlet
+            for outlet in db.session.query(Outlet).filter(Outlet.outlet_code.in_(outlet_codes)).all()
+        }
+
+    return {
+        'matchers': matchers,
+        'daily_totals': daily_totals_by_platform,
+        'mutations': mutations_by_platform,
+        'outlets_by_code': outlets_by_code,
+    }
+
+
+# Plain copies of the preloaded rows that are sent to the matching processes
+_PlainDailyTotal = namedtuple('_PlainDailyTotal', ['outlet_id', 'date', 'report_type', 'total_gross', 'total_net'])
+_PlainMutation = namedtuple('_PlainMutation', ['id', 'transaction_id', 'platform_code', 'tanggal', 'transaction_amount'])
+
+
+class _PlainOutlet:
+    """The Outlet fields read while matching, detached from the session."""
+
+    __slots__ = (
+        'outlet_code', 'outlet_name_gojek', 'outlet_name_grab',
+        'store_id_gojek', 'store_id_grab', 'store_id_shopee', '_shopee_platform_codes',
+    )
+
+    def __init__(self, outlet: Outlet):
+        for field in self.__slots__[:-1]:
+            setattr(self, field, getattr(outlet, field))
+        self._shopee_platform_codes = outlet.shopee_platform_codes()
+
+    def __getstate__(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
+    def shopee_platform_codes(self):
+        return self._shopee_platform_codes
+
+
+def _match_plain_platform(platform: str, daily_totals, mutations, outlets_by_code, start_date, end_date,
+    platform_code: str = None) -> Dict:
+    """
+    Runs match_preloaded in a matching process. Results come back as
+    (platform_data, mutation_data, mutation id) per daily total, in order.
+    """
+    matcher = TransactionMatcher(platform)
+    started_at = time.perf_counter()
+    context = matcher.build_match_context(daily_totals, mutations, outlets_by_code=outlets_by_code)
+    batch_result = matcher.match_preloaded(daily_totals, mutations, context, start_date, end_date, platform_code)
+    return {
+        'results': [
+            (result['platform_data'], result['mutation_data'], result['mutation'].id if result['mutation'] else None)
+            for result in batch_result['results']
+        ],
+        'unmatched_mutation_count': batch_result['unmatched_mutation_count'],
+        'match_seconds': time.perf_counter() - started_at,
+    }
+
+
+def _submit_plain_match(executor, platform: str, inputs: Dict, start_date, end_date, platform_code: str = None):
+    daily_totals = [_PlainDailyTotal._make(total) for total in inputs['daily_totals'][platform]]
+    mutations = [
+        _PlainMutation(m.id, m.transaction_id, m.platform_code, m.tanggal, m.transaction_amount)
+        for m in inputs['mutations'][platform]
+    ]
+    outlet_codes = {str(total.outlet_id) for total in daily_totals if total.outlet_id}
+    outlets_by_code = {
+        code: _PlainOutlet(outlet)
+        for code, outlet in inputs['outlets_by_code'].items()
+        if code in outlet_codes
+    }
+    return executor.submit(
+        _match_plain_platform, platform, daily_totals, mutations, outlets_by_code, start_date, end_date, platform_code
+    )
+
+
+def _batch_result_from_plain(platform_inputs: Tuple[List, List], plain_result: Dict) -> Dict:
+    """Rebuilds match_preloaded's result for the session's rows from a matching process's result."""
+    daily_totals, mutations = platform_inputs
+    mutations_by_id = {mutation.id: mutation for mutation in mutations}
+    results = []
+    matched_mutation_ids = set()
+    matched_mutation_keys = set()
+    for daily_total, (platform_data, mutation_data, mutation_id) in zip(daily_totals, plain_result['results']):
+        mutation = mutations_by_id.get(mutation_id)
+        if mutation:
+            matched_mutation_ids.add(mutation.id)
+            matched_mutation_keys.add((mutation.platform_code, mutation.tanggal))
+        results.append({
+            'daily_total': daily_total,
+            'platform_data': platform_data,
+            'mutation_data': mutation_data,
+            'mutation': mutation,
+        })
+    return {
+        'daily_totals': daily_totals,
+        'mutations': mutations,
+        'results': results,
+        'matched_mutation_ids': matched_mutation_ids,
+        'matched_mutation_keys': matched_mutation_keys,
+        'unmatched_mutation_count': plain_result['unmatched_mutation_count'],
+    }
+
+
+def rebuild_matches_batched(platforms: List[str], start_date, end_date, platform_codes: Dict[str, str] = None) -> Dict:
+    """
+    Run safe_rebuild_matches for several platforms from shared loads.
+
+    Inputs are loaded with one daily totals query and one mutations query.
+    Matching is CPU-bound Python, so with more than one platform each is
+    matched in its own process, on plain copies of the loaded rows, and the
+    rebuild takes about as long as the slowest platform. The processes never
+    touch the database; their results are persisted here in a single
+    transaction, so the preloaded mutations stay loaded until the end.
+    Results only carry counts and plain match data, so reading them after
+    the commit does not touch the database.
+    """
+    platform_codes = platform_codes or {}
+    started_at = time.perf_counter()
+    inputs = load_platform_batch_inputs(platforms, start_date, end_date, platform_codes)
+    load_seconds = time.perf_counter() - started_at
+
+    match_results = {}
+    if len(platforms) > 1:
+        # Forked rather than spawned: the processes only run in-memory matching
+        # and would otherwise import the whole app again before starting
+        with ProcessPoolExecutor(
+            max_workers=len(platforms),
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=mark_process_dead_on_exit,
+        ) as executor:
+            futures = {
+                platform: _submit_plain_match(
+                    executor, platform, inputs, start_date, end_date, platform_codes.get(platform)
+                )
+                for platform in platforms
+            }
+            for platform, future in futures.items():
+                plain_result = future.result()
+                match_results[platform] = (
+                    _batch_result_from_plain(
+                        (inputs['daily_totals'][platform], inputs['mutations'][platform]), plain_result
+                    ),
+                    plain_result['match_seconds'],
+                )
+    else:
+        for platform in platforms:
+            matcher = inputs['matchers'][platform]
+            match_started_at = time.perf_counter()
+            context = matcher.build_match_context(
+                inputs['daily_totals'][platform],
+                inputs['mutations'][platform],
+                outlets_by_code=inputs['outlets_by_code'],
+            )
+            batch_result = matcher.match_preloaded(
+                inputs['daily_totals'][platform],
+                inputs['mutations'][platform],
+                context,
+                start_date,
+                end_date,
+                platform_codes.get(platform),
+            )
+            match_results[platform] = (batch_result, time.perf_counter() - match_started_at)
+    match_wall_seconds = time.perf_counter() - started_at - load_seconds
+
+    results = {}
+    try:
+        for platform in platforms:
+            batch_result, match_seconds = match_results[platform]
+            persist_result = inputs['matchers'][platform].persist_matches(
+                batch_result,
+                start_date,
+                end_date,
+                include_unmatched_mutations=not platform_codes.get(platform),
+                commit=False,
+            )
+            batch_result['persist_result'] = persist_result
+            batch_result['timings'] = {
+                'match_seconds': round(match_seconds, 4),
+                'persist_seconds': round(persist_result['duration_seconds'], 4),
+            }
+            results[platform] = batch_result
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    total_seconds = time.perf_counter() - started_at
+    logger.info(
+        "transaction_matcher.batched platforms=%s start_date=%s end_date=%s "
+        "load_seconds=%.4f match_seconds=%.4f total_seconds=%.4f",
+        ",".join(platforms),
+        start_date,
+        end_date,
+        load_seconds,
+        match_wall_seconds,
+        total_seconds,
+    )
+    return {
+        'results': results,
+        'timings': {
+            'load_seconds': round(load_seconds, 4),
+            'match_seconds': round(match_wall_seconds, 4),
+            'total_seconds': round(total_seconds, 4),
+        },
+    }
@@ -0,0 +1,56 @@
+from flask import g, has_app_context, request
+
+INTERACTIVE = 'interactive'
+INGESTION = 'ingestion'
+EXPORT = 'export'
+WORKLOADS = (INTERACTIVE, INGESTION, EXPORT)
+
+# Spreadsheet/PDF builds; export job status, submit and download stay interactive
+EXPORT_ENDPOINTS = {
+    'export.export_reports',
+    'export.export_reports_bulk',
+    'export.preview_daily_report',
+    'reports.monthly_income_report',
+    'reports.monthly_management_commission_report',
+    'reports.monthly_management_commission_report_custom',
+    'reports.monthly_mpr_commission_report',
+    'reports.get_top_outlets_pdf',
+}
+# File imports and match rebuilds, besides every /upload/ route
+INGESTION_ENDPOINTS = {
+    'manual_entries.import_adm_expenses',
+    'admin_tools.apply_outlet_codes_from_excel',
+    'admin_tools.backfill_shopee_store_id_suffixes',
+    'mutations.match_gojek_transactions',
+    'mutations.match_grab_transactions',
+    'mutations.match_shopee_transactions',
+    'mutations.match_shopeepay_transactions',
+    'mutations.match_summary',
+}
+
+
+def classify_request() -> str:
+    if request.endpoint in EXPORT_ENDPOINTS:
+        return EXPORT
+    if request.endpoint in INGESTION_ENDPOINTS or (request.url_rule and '/upload/' in request.url_rule.rule):
+        return INGESTION
+    return INTERACTIVE
+
+
+def set_workload(workload: str):
+    """Tags the current app context, e.g. a background export, with its workload."""
+    g.workload = workload
+
+
+def current_workload() -> str:
+    if not has_app_context():
+        return INTERACTIVE
+    return g.get('workload', INTERACTIVE)
+
+
+def assign_request_workload():
+    g.workload = classify_request()
+
+
+def init_workloads(app):
+    app.before_request(assign_request_workload)
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+SYNTHETIC_DAYS = 365
+SYNTHETIC_MANUAL_ENTRIES = 200
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def time_sheet(sheet_class, report_data, repeats):
+    from openpyxl import Workbook
+
+    timings = []
+    for _ in range(repeats):
+        wb = Workbook()
+        wb.remove(wb.active)
+        started_at = time.perf_counter()
+        sheet_class(wb, report_data).generate()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def synthetic_report_data():
+    """
+    A year of daily totals for every platform and SYNTHETIC_MANUAL_ENTRIES
+    manual entries, without a database. Rekening lookups and the MPR mapping
+    are stubbed out, since they would query it.
+    """
+    from app.services.excel_export import data_service
+    from app.services.excel_export.sheets.closing_sheet import ClosingSheet
+    from app.services.rekening_info_service import OutletRekeningInfo, RekeningInfoService
+
+    RekeningInfoService.get_outlet_rekenings = classmethod(
+        lambda cls, outlet: [OutletRekeningInfo('MP78 - Synthetic', 'Gojek', 'Synthetic', '1234567890')]
+    )
+    ClosingSheet._get_mapped_mpr_outlet = lambda self: None
+    # Older trees name it _calculate_grand_totals
+    calculate_grand_totals = getattr(data_service, 'calculate_grand_totals', None) or data_service._calculate_grand_totals
+
+    all_dates = [date(2025, 1, 1) + timedelta(days=offset) for offset in range(SYNTHETIC_DAYS)]
+    daily_totals = {}
+    for index, day in enumerate(all_dates):
+        totals = data_service._init_daily_total()
+        totals.update(
+            Gojek_Net=1000.5 * index, Gojek_Gross=1200 * index, Grab_Net=500 * index, Shopee_Net=300 * index,
+            Cash_Income=100 * index, Cash_Expense=10 * index, Gojek_Mutation=1000 * index if index % 2 else None,
+            Tiktok_Settlement_Time={day}, Tiktok_Net=50 * index, Qpon_Net=5 * index,
+        )
+        daily_totals[day] = totals
+
+    def manual_entry(entry_type, amount, description):
+        entry = SimpleNamespace(
+            entry_type=entry_type, amount=amount, description=description,
+            start_date=all_dates[0], end_date=all_dates[-1], category_id=1,
+        )
+        return entry, SimpleNamespace(name='Income'), SimpleNamespace(name='Expense')
+
+    outlet = SimpleNamespace(
+        outlet_code='SYNTH', outlet_name_gojek='Synthetic Outlet', brand='MP78', store_id_gojek='G1',
+        store_id_grab='GR1', store_id_shopee='S1', disabled_closing_platforms=None,
+    )
+    return {
+        'outlet': outlet,
+        'start_date': datetime(2025, 1, 1),
+        'end_date': datetime.combine(all_dates[-1], datetime.min.time()),
+        'all_dates': all_dates,
+        'daily_totals': daily_totals,
+        'grand_totals': calculate_grand_totals(daily_totals),
+        'manual_entries': [
+            manual_entry('income', 1000, '5 Jan') if index % 2 == 0 else manual_entry('expense', 250, '3-Feb')
+            for index in range(SYNTHETIC_MANUAL_ENTRIES)
+        ],
+        'mp78_mutations': [
+            SimpleNamespace(tanggal=all_dates[2], transaction_type='DB', transaksi='fee', transaction_amount=77)
+        ],
+        'pukis_reports': [
+            SimpleNamespace(tanggal=datetime(2025, 1, 2), amount=10, pukis_inventory_type='terjual', pukis_product_type='jumbo'),
+            SimpleNamespace(tanggal=datetime(2025, 1, 2), amount=30, pukis_inventory_type='produksi', pukis_product_type='jumbo'),
+        ],
+        'minusan_by_date': {},
+        'user_role': 'admin',
+        'mpr_report_data': None,
+        'grabfood_gross_total': 0,
+        'grabovo_gross_total': 0,
+        'grabfood_net_total': 0,
+        'grabovo_net_total': 0,
+    }
+
+
+def time_sheets(args):
+    """Seconds per sheet class name, for the app package that is first on sys.path."""
+    from app import create_app
+    from app.services.excel_export.generator import ExcelReportGenerator
+    from app.services.excel_export.sheets.closing_sheet import ClosingSheet
+    from app.services.excel_export.sheets.daily_sheet import DailySheet
+    from app.services.excel_export.sheets.pukis_closing_sheet import PukisClosingSheet
+    from app.services.excel_export.sheets.pukis_sheet import PukisSheet
+    from app.services.excel_export.sheets.summary_sheet import SummarySheet
+
+    app = create_app()
+    with app.app_context():
+        if args.synthetic:
+            report_data = synthetic_report_data()
+        else:
+            generator = ExcelReportGenerator(args.outlet_code, args.start_date, args.end_date, args.user_role)
+            report_data = generator._build_report_data(args.outlet_code)
+            report_data['mpr_report_data'] = generator._get_mpr_report_data(report_data)
+
+        sheet_classes = [DailySheet, SummarySheet]
+        if args.synthetic:
+            # Both closing layouts render from the same data
+            sheet_classes += [ClosingSheet, PukisClosingSheet]
+        elif report_data['outlet'].brand == "Pukis & Martabak Kota Baru":
+            sheet_classes += [PukisClosingSheet, PukisSheet]
+        else:
+            sheet_classes.append(ClosingSheet)
+
+        return {
+            sheet_class.__name__: time_sheet(sheet_class, report_data, args.repeats)
+            for sheet_class in sheet_classes
+        }
+
+
+def time_tree(tree, argv):
+    """Runs this script against the app package in ``tree`` and returns its timings."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *argv, '--tree', tree, '--json'],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time each Excel export sheet, optionally against the sheet code of another git revision.'
+    )
+    parser.add_argument('outlet_code', nargs='?')
+    parser.add_argument('start_date', nargs='?')
+    parser.add_argument('end_date', nargs='?')
+    parser.add_argument('--user-role', default='admin')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per sheet; the fastest is reported.')
+    parser.add_argument(
+        '--synthetic', action='store_true',
+        help=f'Use {SYNTHETIC_DAYS} days of generated data with {SYNTHETIC_MANUAL_ENTRIES} manual entries instead of a real outlet.',
+    )
+    parser.add_argument(
+        '--compare-ref',
+        help='Also time the sheets of this git revision, checked out in a temporary worktree, as "before".',
+    )
+    parser.add_argument('--tree', help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if not args.synthetic and not (args.outlet_code and args.start_date and args.end_date):
+        parser.error('outlet_code, start_date and end_date are required without --synthetic')
+
+    if args.tree:
+        sys.path.insert(0, args.tree)
+    if not args.compare_ref:
+        if not args.synthetic:
+            args.start_date, args.end_date = parse_date(args.start_date), parse_date(args.end_date)
+        timings = time_sheets(args)
+        if args.json:
+            print(json.dumps(timings))
+            return
+        print(f"{'sheet':<20}{'ms':>12}")
+        for name, seconds in timings.items():
+            print(f"{name:<20}{seconds * 1000:>12.1f}")
+        return
+
+    argv = [value for value in (args.outlet_code, args.start_date, args.end_date) if value]
+    argv += ['--user-role', args.user_role, '--repeats', str(args.repeats)]
+    if args.synthetic:
+        argv.append('--synthetic')
+    repo = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as parent:
+        worktree = os.path.join(parent, 'tree')
+        subprocess.run(['git', '-C', repo, 'worktree', 'add', '--detach', worktree, args.compare_ref], check=True,
+                       capture_output=True)
+        try:
+            before = time_tree(worktree, argv)
+        finally:
+            subprocess.run(['git', '-C', repo, 'worktree', 'remove', '--force', worktree], check=True)
+    after = time_tree(repo, argv)
+
+    print(f"{'sheet':<20}{args.compare_ref[:12] + ' (ms)':>20}{'current (ms)':>14}{'speedup':>10}")
+    for name, seconds in after.items():
+        if name not in before:
+            continue
+        speedup = before[name] / seconds if seconds else 0
+        print(f"{name:<20}{before[name] * 1000:>20.1f}{seconds * 1000:>14.1f}{speedup:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
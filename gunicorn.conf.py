@@ -0,0 +1,19 @@
+import os
+import shutil
+
+# Workers write metric samples here and /metrics merges them (see app/utils/metrics.py).
+# Must be set before a worker imports prometheus_client, so it lives in the gunicorn config.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/crm_mp78_metrics')
+
+
+def on_starting(server):
+    # Samples left by a previous run would otherwise be merged into the new totals
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
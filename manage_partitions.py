@@ -0,0 +1,80 @@
+import argparse
+import json
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Manage monthly partitions of the large transaction tables.'
+    )
+    parser.add_argument(
+        '--table',
+        action='append',
+        help='Limit to this table (repeatable). Defaults to every partitioned table.',
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('status', help='Show partitioning state per table.')
+
+    convert_parser = subparsers.add_parser(
+        'convert',
+        help='Rebuild plain tables as partitioned tables (locks each table while its rows are copied).',
+    )
+    convert_parser.add_argument('--months-ahead', type=int, default=None)
+
+    ensure_parser = subparsers.add_parser(
+        'ensure',
+        help='Pre-create partitions for the current and upcoming months. Run monthly, e.g. from cron.',
+    )
+    ensure_parser.add_argument('--months-ahead', type=int, default=None)
+
+    detach_parser = subparsers.add_parser(
+        'detach',
+        help='Detach monthly partitions older than --keep-months; they remain as standalone tables.',
+    )
+    detach_parser.add_argument('--keep-months', type=int, required=True)
+
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.extensions import db
+    from app.services import partition_manager as pm
+
+    tables = args.table or list(pm.PARTITIONED_TABLES)
+    unknown = [table for table in tables if table not in pm.PARTITIONED_TABLES]
+    if unknown:
+        parser.error(f"not a partitioned table: {', '.join(unknown)}")
+    months_ahead = getattr(args, 'months_ahead', None)
+    if months_ahead is None:
+        months_ahead = pm.DEFAULT_MONTHS_AHEAD
+
+    app = create_app()
+    with app.app_context():
+        for table in tables:
+            # One transaction per table so a failure leaves the others untouched
+            with db.engine.begin() as connection:
+                partitioned = pm.is_partitioned(connection, table)
+
+                if args.command == 'status':
+                    print(json.dumps(pm.partition_status(connection, table)))
+                elif args.command == 'convert':
+                    if partitioned:
+                        print(f"{table}: already partitioned")
+                        continue
+                    try:
+                        pm.convert_to_partitioned(connection, table, months_ahead=months_ahead)
+                    except ValueError as e:
+                        print(f"{table}: not converted, {e}")
+                        continue
+                    print(f"{table}: converted, {json.dumps(pm.partition_status(connection, table))}")
+                elif not partitioned:
+                    print(f"{table}: not partitioned, run 'convert' first")
+                elif args.command == 'ensure':
+                    created = pm.ensure_partitions(connection, table, months_ahead=months_ahead)
+                    print(f"{table}: created {', '.join(created) if created else 'nothing'}")
+                elif args.command == 'detach':
+                    detached = pm.detach_partitions(connection, table, keep_months=args.keep_months)
+                    print(f"{table}: detached {', '.join(detached) if detached else 'nothing'}")
+
+
+if __name__ == '__main__':
+    main()
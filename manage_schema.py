@@ -0,0 +1,37 @@
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Bring an existing database up to the current models (columns create_all() does not add).'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='Show which schema upgrades are applied.')
+    subparsers.add_parser('apply', help='Apply pending schema upgrades. Run before deploying new code.')
+
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.extensions import db
+    from app.services import schema_upgrades as su
+
+    app = create_app()
+    with app.app_context():
+        for upgrade in su.SCHEMA_UPGRADES:
+            name = upgrade['name']
+            # One transaction per upgrade so a failure leaves the earlier ones applied
+            with db.engine.begin() as connection:
+                applied = su.upgrade_applied(connection, upgrade)
+                if args.command == 'status':
+                    print(f"{name}: {'applied' if applied else 'pending'}")
+                elif applied:
+                    print(f"{name}: already applied")
+                else:
+                    su.apply_upgrade(connection, upgrade)
+                    print(f"{name}: applied")
+                    if upgrade.get('follow_up'):
+                        print(f"{name}: next, {upgrade['follow_up']}")
+
+
+if __name__ == '__main__':
+    main()